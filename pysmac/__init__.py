@@ -1,2 +1,4 @@
+__version__ = '0.9.1'
+
 from .optimizer import *
 from .utils import *
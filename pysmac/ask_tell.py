@@ -0,0 +1,244 @@
+"""
+Ask/tell interface to SMAC for users who evaluate configurations themselves.
+
+Instead of passing a function to
+:py:meth:`pysmac.optimizer.SMAC_optimizer.minimize`, the user asks for a
+configuration, evaluates it in any way (e.g. in an existing job system),
+and tells the result. The session is created by
+:py:meth:`pysmac.optimizer.SMAC_optimizer.ask_tell_session`:
+
+.. code-block:: python
+
+    session = opt.ask_tell_session(100, parameters, num_slots=4)
+    while not session.finished:
+        config = session.ask()
+        if config is not None:
+            session.tell(config, func(**config))
+    value, incumbent = session.close()
+
+Every slot is an independent SMAC run (with its own seed) which proposes
+one configuration at a time, so up to num_slots configurations can be
+outstanding at the same time. They can be told in any order.
+"""
+from __future__ import print_function, division, absolute_import
+
+import os
+import time
+import select
+import operator
+import multiprocessing
+
+from pysmac.remote_smac import remote_smac, make_result_dict
+from pysmac.utils.smac_output_readers import read_trajectory_file
+
+
+class Configuration(dict):
+    """
+    A configuration proposed by SMAC.
+
+    It is a dict mapping the parameter names to their values (with the
+    proper types), so the function can be called as ``func(**config)``.
+    Like in minimize, it also contains the keys 'instance' (if training
+    instances are used) and 'seed' (for non-deterministic functions).
+    """
+    def __init__(self, values, config_id, run_seed, cutoff_time):
+        dict.__init__(self, values)
+        self.config_id = config_id
+        """ Unique id of this configuration within the session."""
+        self.run_seed = run_seed
+        """ The seed of the SMAC run that proposed this configuration."""
+        self.cutoff_time = cutoff_time
+        """ The cutoff time (in seconds) SMAC chose for this evaluation."""
+
+
+def strip_configuration(config_dict, num_instances, deterministic):
+    """ Removes the entries of a parsed SMAC message that are not arguments of the function.
+
+    Like in minimize, 'instance' is only kept if training instances are
+    used, and 'seed' only for non-deterministic functions.
+
+    :param config_dict: the configuration returned by :py:meth:`pysmac.remote_smac.remote_smac.parse_configuration`, modified in place
+    :type config_dict: dict
+    :returns: float -- the cutoff time SMAC chose for the evaluation
+    """
+    if num_instances is None:
+        del config_dict['instance']
+    del config_dict['instance_info']
+    del config_dict['cutoff_length']
+    if deterministic:
+        del config_dict['seed']
+    return(config_dict.pop('cutoff_time'))
+
+
+def best_incumbent(scenario_dir, seeds, parser_dict):
+    """ Finds the best final incumbent among the trajectories of several SMAC runs.
+
+    :param scenario_dir: SMAC's output directory for the scenario
+    :type scenario_dir: str
+    :param seeds: the seeds of the runs
+    :type seeds: list of ints
+    :param parser_dict: maps every parameter to its type, see :py:func:`pysmac.remote_smac.process_parameter_definitions`
+    :type parser_dict: dict
+    :returns: tuple -- (estimated function value, corresponding configuration as a dict with the proper types)
+    """
+    run_incumbents = []
+    for seed in seeds:
+        fn = os.path.join(scenario_dir, 'traj-run-%i.txt'%seed)
+        if os.path.exists(fn):
+            trajectory = read_trajectory_file(fn)
+            if len(trajectory) > 0:
+                run_incumbents.append(trajectory[-1])
+    if len(run_incumbents) == 0:
+        raise RuntimeError('No SMAC run has written an incumbent yet!')
+
+    incumbent = min(run_incumbents, key = operator.itemgetter("Estimated Training Performance"))
+    # SMAC stores all values as strings
+    config = dict([(k, parser_dict[k](v)) if k in parser_dict else (k, v)
+                   for k, v in list(incumbent['Configuration'].items())])
+    return(incumbent["Estimated Training Performance"], config)
+
+
+class AskTellSession(object):
+    """
+    Drives several SMAC runs, handing their configurations to the user.
+
+    Every SMAC run is a Java process in IPC mode that waits for the result
+    of its last configuration before it proposes the next one. The session
+    watches all of them and returns the next configuration of whichever
+    run sends one first.
+    """
+
+    def __init__(self, scenario_fn, additional_options_fn, seeds, parser_dict,
+                 class_path, memory_limit_smac_mb, java_executable, timeout_quality,
+                 num_instances, deterministic, scenario_dir, wallclock_limit=None, smac_command=None):
+        """
+        Use :py:meth:`pysmac.optimizer.SMAC_optimizer.ask_tell_session` to create a session.
+        """
+        self.__logger = multiprocessing.get_logger()
+        self.__scenario_fn = scenario_fn
+        self.__additional_options_fn = additional_options_fn
+        self.__seeds = list(seeds)
+        self.__parser = parser_dict
+        self.__class_path = class_path
+        self.__memory_limit_smac_mb = memory_limit_smac_mb
+        self.__java_executable = java_executable
+        self.__timeout_quality = timeout_quality
+        self.__num_instances = num_instances
+        self.__deterministic = deterministic
+        self.__scenario_dir = scenario_dir
+        self.__wallclock_limit = wallclock_limit
+        self.__smac_command = smac_command
+
+        self.__smacs = []
+        # maps the id of every configuration without a result to its SMAC run and the time it was asked for
+        self.__outstanding = {}
+        self.__next_id = 0
+        self.num_evaluations = 0
+        """ The number of results told to SMAC so far."""
+
+    def start(self):
+        """ Starts one SMAC process for every seed. """
+        for seed in self.__seeds:
+            smac = remote_smac(self.__scenario_fn, self.__additional_options_fn, seed,
+                               self.__class_path, self.__memory_limit_smac_mb, self.__parser,
+                               self.__java_executable, self.__wallclock_limit,
+                               smac_command=self.__smac_command)
+            smac.seed = seed
+            self.__smacs.append(smac)
+        self.__logger.debug('Started %i SMAC processes for the ask/tell session', len(self.__smacs))
+        return(self)
+
+    @property
+    def num_outstanding(self):
+        """ The number of configurations that were asked for, but have no result yet."""
+        return(len(self.__outstanding))
+
+    @property
+    def finished(self):
+        """ True if all SMAC runs terminated and every configuration has a result."""
+        return(len(self.__outstanding) == 0 and not any([smac.is_alive() for smac in self.__smacs]))
+
+    def ask(self, timeout_s=None):
+        """ Returns the next configuration to evaluate.
+
+        Blocks until one of the SMAC runs without an outstanding
+        configuration proposes a new one.
+
+        :param timeout_s: maximum time (in seconds) to wait. None means no limit.
+        :type timeout_s: float
+        :returns: :py:class:`Configuration` -- or None if no configuration is available in time, every run waits for a result, or all runs have finished
+        """
+        deadline = None if timeout_s is None else time.time() + timeout_s
+        while True:
+            busy = [smac for smac, _ in list(self.__outstanding.values())]
+            waiting = [smac for smac in self.__smacs if (smac not in busy) and smac.is_alive()]
+            if len(waiting) == 0:
+                return(None)
+
+            poll_interval = remote_smac.udp_timeout
+            if deadline is not None:
+                poll_interval = min(poll_interval, deadline - time.time())
+                if poll_interval <= 0:
+                    return(None)
+
+            readable, _, _ = select.select(waiting, [], [], poll_interval)
+            for smac in readable:
+                config_dict = smac.next_configuration()
+                # SMAC terminated in the meantime
+                if config_dict is None:
+                    continue
+                return(self.__make_configuration(smac, config_dict))
+
+    def __make_configuration(self, smac, config_dict):
+        cutoff_time = strip_configuration(config_dict, self.__num_instances, self.__deterministic)
+
+        config = Configuration(config_dict, self.__next_id, smac.seed, cutoff_time)
+        self.__next_id += 1
+        self.__outstanding[config.config_id] = (smac, time.time())
+        return(config)
+
+    def tell(self, config, result, runtime=None):
+        """ Reports the result of a configuration obtained from ask back to SMAC.
+
+        :param config: the configuration returned by ask
+        :type config: :py:class:`Configuration`
+        :param result: the function value, or a dict with the keys 'value', 'status' ('SAT', 'TIMEOUT', 'CRASHED') and 'runtime' like the return value of a function passed to minimize. None means the evaluation crashed.
+        :type result: float/dict
+        :param runtime: the time (in seconds) the evaluation took. None means the time since the configuration was asked for.
+        :type runtime: float
+        """
+        try:
+            smac, ask_time = self.__outstanding.pop(config.config_id)
+        except KeyError:
+            raise ValueError('Configuration {} is unknown or its result was already reported!'.format(config.config_id))
+
+        result_dict = make_result_dict(result, time.time() - ask_time if runtime is None else runtime,
+                                       self.__timeout_quality)
+        smac.report_result(result_dict)
+        self.num_evaluations += 1
+
+    def incumbent(self):
+        """ The best configuration found by any of the SMAC runs so far.
+
+        :returns: tuple -- (estimated function value, corresponding configuration as a dict)
+        """
+        return(best_incumbent(self.__scenario_dir, self.__seeds, self.__parser))
+
+    def close(self):
+        """ Stops all SMAC runs and returns the best configuration found.
+
+        Outstanding configurations are discarded.
+
+        :returns: tuple -- see :py:meth:`incumbent`
+        """
+        for smac in self.__smacs:
+            smac.stop()
+        self.__outstanding = {}
+        return(self.incumbent())
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for smac in self.__smacs:
+            smac.stop()
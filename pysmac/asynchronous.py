@@ -0,0 +1,126 @@
+"""
+Optimization of coroutine functions with asyncio (Python 3.5 or newer).
+
+For I/O bound functions (e.g. requests to a remote model server), running
+every evaluation in its own process like
+:py:meth:`pysmac.optimizer.SMAC_optimizer.minimize` does wastes most of
+the time waiting. Here, all SMAC runs are driven from a single event loop,
+and their evaluations are awaited concurrently:
+
+.. code-block:: python
+
+    async def func(x1, x2):
+        return await client.evaluate(x1, x2)
+
+    value, config = asyncio.run(
+        opt.minimize_async(func, 100, parameters, num_runs=16, max_concurrency=8))
+
+Every SMAC run proposes one configuration at a time, so num_runs bounds
+the number of evaluations in flight. The evaluations are executed in the
+main process without any memory or CPU time limits; t_limit_function_s is
+enforced as a wall clock timeout.
+"""
+import asyncio
+import inspect
+import time
+import multiprocessing
+
+from pysmac.remote_smac import remote_smac, make_result_dict
+from pysmac.ask_tell import strip_configuration, best_incumbent
+
+
+def _running_loop():
+    # asyncio.get_running_loop was added in Python 3.7
+    if hasattr(asyncio, 'get_running_loop'):
+        return(asyncio.get_running_loop())
+    return(asyncio.get_event_loop())
+
+
+async def _receive_line(loop, conn):
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = await loop.sock_recv(conn, 4096)
+        if not chunk:
+            break
+        data += chunk
+    return(data.decode())
+
+
+async def _evaluate(func, config_dict, timeout, timeout_quality):
+    logger = multiprocessing.get_logger()
+    start = time.time()
+    try:
+        res = func(**config_dict)
+        if inspect.isawaitable(res):
+            res = await asyncio.wait_for(res, timeout)
+    except asyncio.TimeoutError:
+        logger.debug('Evaluation of %s timed out', config_dict)
+        return(make_result_dict({'status': 'TIMEOUT'}, time.time() - start, timeout_quality))
+    except Exception:
+        logger.exception('Evaluation of %s crashed', config_dict)
+        res = None
+    return(make_result_dict(res, time.time() - start, timeout_quality))
+
+
+async def _drive_run(smac, func, semaphore, num_instances, deterministic, t_limit_function_s, timeout_quality):
+    """ Answers all requests of one SMAC run until it terminates.
+
+    :returns: int -- the number of evaluations
+    """
+    loop = _running_loop()
+    sock = smac.listening_socket
+    sock.setblocking(False)
+    num_evaluations = 0
+    while True:
+        try:
+            conn, _ = await asyncio.wait_for(loop.sock_accept(sock), remote_smac.udp_timeout)
+        except asyncio.TimeoutError:
+            if not smac.is_alive():
+                break
+            continue
+        conn.setblocking(False)
+        try:
+            config_dict = smac.parse_configuration(await _receive_line(loop, conn))
+            cutoff_time = strip_configuration(config_dict, num_instances, deterministic)
+            timeout = None if t_limit_function_s is None else cutoff_time
+
+            async with semaphore:
+                result_dict = await _evaluate(func, config_dict, timeout, timeout_quality)
+
+            await loop.sock_sendall(conn, smac.format_result(result_dict))
+            num_evaluations += 1
+        finally:
+            conn.close()
+    return(num_evaluations)
+
+
+async def minimize_coroutine(func, seeds, max_concurrency, scenario_fn, additional_options_fn,
+                             parser_dict, class_path, memory_limit_smac_mb, java_executable,
+                             timeout_quality, num_instances, deterministic, t_limit_function_s,
+                             scenario_dir, wallclock_limit=None, smac_command=None):
+    """
+    Runs SMAC for every seed and evaluates all configurations on the current event loop.
+
+    Use :py:meth:`pysmac.optimizer.SMAC_optimizer.minimize_async` which
+    writes the scenario and returns this coroutine.
+
+    :returns: tuple -- (lowest function value found, corresponding configuration as a dict)
+    """
+    logger = multiprocessing.get_logger()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    smacs = []
+    try:
+        for seed in seeds:
+            smacs.append(remote_smac(scenario_fn, additional_options_fn, seed, class_path,
+                                     memory_limit_smac_mb, parser_dict, java_executable, wallclock_limit,
+                                     smac_command=smac_command))
+        num_evaluations = await asyncio.gather(*[
+            _drive_run(smac, func, semaphore, num_instances, deterministic, t_limit_function_s, timeout_quality)
+            for smac in smacs])
+        logger.debug('Evaluations per run: %s', num_evaluations)
+    finally:
+        for smac in smacs:
+            smac.stop()
+
+    return(best_incumbent(scenario_dir, seeds, parser_dict))
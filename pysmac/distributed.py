@@ -0,0 +1,356 @@
+"""
+Distributed function evaluation for pySMAC.
+
+The SMAC runs themselves stay on the local machine, but every function
+evaluation is sent over TCP to a broker which hands it to one of
+possibly many worker processes on other nodes. A worker can be started
+with::
+
+    PYSMAC_BROKER_AUTHKEY=<broker.authkey> python -m pysmac.distributed --host <broker host> --port <broker port>
+
+The broker is created by the user, and passed to
+:py:meth:`pysmac.optimizer.SMAC_optimizer.minimize`:
+
+.. code-block:: python
+
+    broker = pysmac.distributed.EvaluationBroker(host='0.0.0.0', port=5555)
+    broker.start()
+    print(broker.authkey)  # the workers need this key
+    opt.minimize(func, 1000, parameters, evaluation_broker=broker)
+    broker.stop()
+
+Workers send heartbeats while they evaluate the function. If a worker
+dies or stops sending heartbeats, its evaluation is requeued and given
+to another worker. Note that the function and its arguments are pickled,
+so the function has to be importable on the worker nodes.
+
+All connections use :py:mod:`multiprocessing.connection`, which
+authenticates both sides with the broker's key before any message is
+unpickled. The handshake runs in the thread serving the connection and
+has to finish within handshake_timeout seconds, so a client that never
+authenticates can not block the broker. Everybody who knows the key can
+run code on the broker and the workers, so keep it secret. The messages
+themselves are not encrypted.
+"""
+from __future__ import print_function, division, absolute_import
+
+import os
+import time
+import socket
+import binascii
+import threading
+import multiprocessing
+import multiprocessing.connection
+
+try:
+    import Queue as queue # Python 2 backward compatibility
+except ImportError:
+    import queue
+
+
+AUTHKEY_VARIABLE = 'PYSMAC_BROKER_AUTHKEY'
+""" The environment variable the workers read the broker's key (as a hex string) from."""
+
+
+def crashed_evaluation():
+    """ The evaluation dict reported if no worker could evaluate the function."""
+    return {'result': None, 'wall_time': 0.,
+            'spawn_time': None, 'function_wall_time': None,
+            'function_cpu_time': 0., 'peak_rss_mb': None}
+
+
+def expired_evaluation():
+    """ The evaluation dict reported if no worker returned a result before the deadline."""
+    return dict(crashed_evaluation(), result={'status': 'TIMEOUT'})
+
+
+def _shutdown_connection(conn):
+    # wakes up a thread blocked in conn.recv(), closing the file descriptor would not
+    try:
+        sock = socket.fromfd(conn.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+        sock.shutdown(socket.SHUT_RDWR)
+        sock.close()
+    except (OSError, IOError, ValueError):
+        pass
+
+
+class EvaluationBroker(object):
+    """
+    Hands out function evaluations from the SMAC runs to remote workers.
+
+    The broker listens on a single port. Both the SMAC runs (clients) and
+    the workers connect to it, authenticate with the key, and identify
+    themselves with their first message. Every connection is served by its
+    own thread.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, heartbeat_timeout=30, max_retries=3, authkey=None, handshake_timeout=10):
+        """
+        :param host: interface to listen on. The default only accepts connections from this machine; use '0.0.0.0' for workers on other nodes.
+        :type host: str
+        :param port: port to listen on. 0 picks a free port, see attribute address.
+        :type port: int
+        :param heartbeat_timeout: time (in seconds) without a heartbeat after which a worker is considered lost.
+        :type heartbeat_timeout: float
+        :param max_retries: how often an evaluation is requeued after its worker was lost before it is reported as crashed.
+        :type max_retries: int
+        :param authkey: the key every connection has to authenticate with, as a hex string. None creates a random key, see attribute authkey.
+        :type authkey: str
+        :param handshake_timeout: time (in seconds) a new connection has to authenticate and identify itself, otherwise it is closed.
+        :type handshake_timeout: float
+        """
+        self.heartbeat_timeout = heartbeat_timeout
+        self.handshake_timeout = handshake_timeout
+        self.max_retries = max_retries
+        self.__logger = multiprocessing.get_logger()
+
+        self.authkey = binascii.hexlify(os.urandom(32)).decode() if authkey is None else authkey
+        """ The key of the broker as a hex string, which the workers need."""
+        # the listener does not authenticate, otherwise accept would block on the handshake of a single client
+        self.__authkey = binascii.unhexlify(self.authkey)
+        self.__listener = multiprocessing.connection.Listener((host, port), 'AF_INET', backlog=64)
+
+        self.address = (host if host not in ('', '0.0.0.0') else '127.0.0.1', self.__listener.address[1])
+        """ The (host, port) tuple the SMAC runs connect to."""
+
+        self.__jobs = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.num_workers = 0
+        """ The number of currently connected workers."""
+        self.num_requeued = 0
+        """ The number of evaluations that were requeued because a worker was lost."""
+
+    def start(self):
+        """ Starts accepting connections in a background thread."""
+        self.__thread = threading.Thread(target=self.__accept_loop)
+        self.__thread.daemon = True
+        self.__thread.start()
+        self.__logger.debug('Evaluation broker listening on port %i', self.address[1])
+        return(self)
+
+    def stop(self):
+        """ Stops the broker and tells all idle workers to shut down."""
+        self.__stopped.set()
+        self.__listener.close()
+        with self.__lock:
+            num_workers = self.num_workers
+        for i in range(num_workers):
+            self.__jobs.put(None)
+
+    def __accept_loop(self):
+        while not self.__stopped.is_set():
+            try:
+                conn = self.__listener.accept()
+            except (EOFError, OSError, IOError):
+                if self.__stopped.is_set():
+                    break
+                continue
+            thread = threading.Thread(target=self.__serve, args=(conn, self.__listener.last_accepted))
+            thread.daemon = True
+            thread.start()
+
+    def __handshake(self, conn, addr):
+        # a connection that does not finish the handshake in time is shut down, which ends the blocking calls
+        done = threading.Event()
+        def expire():
+            if not done.is_set():
+                self.__logger.warning('Closing connection %s, it did not authenticate within %s seconds.', addr, self.handshake_timeout)
+                _shutdown_connection(conn)
+        timer = threading.Timer(self.handshake_timeout, expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            multiprocessing.connection.deliver_challenge(conn, self.__authkey)
+            multiprocessing.connection.answer_challenge(conn, self.__authkey)
+            return(conn.recv())
+        finally:
+            done.set()
+            timer.cancel()
+
+    def __serve(self, conn, addr):
+        try:
+            hello = self.__handshake(conn, addr)
+            if hello.get('type') == 'worker':
+                self.__serve_worker(conn, addr)
+            elif hello.get('type') == 'client':
+                self.__serve_client(conn)
+        except multiprocessing.AuthenticationError:
+            self.__logger.warning('Rejected connection %s, it failed to authenticate.', addr)
+        except (EOFError, OSError, IOError):
+            pass
+        finally:
+            conn.close()
+
+    def __serve_client(self, conn):
+        # every message of a client is a single evaluation request
+        while True:
+            job = conn.recv()
+            result_queue = queue.Queue()
+            item = [job, result_queue, 0, False]
+            self.__jobs.put(item)
+            while True:
+                try:
+                    evaluation = result_queue.get(timeout=1)
+                    break
+                except queue.Empty:
+                    # a client waiting for its result sends nothing, so a readable
+                    # connection was closed by a client that gave up on the evaluation
+                    if conn.poll(0):
+                        item[3] = True
+                        raise EOFError('The client closed the connection.')
+            conn.send(evaluation)
+
+    def __serve_worker(self, conn, addr):
+        with self.__lock:
+            self.num_workers += 1
+        self.__logger.debug('Worker %s connected', addr)
+        item = None
+        try:
+            while True:
+                item = self.__jobs.get()
+                if item is None:
+                    conn.send({'type': 'shutdown'})
+                    return
+                if item[3]:
+                    # the client no longer waits for the result
+                    item = None
+                    continue
+                conn.send({'type': 'job', 'job': item[0]})
+                while True:
+                    if not conn.poll(self.heartbeat_timeout):
+                        raise EOFError('No heartbeat within {} seconds.'.format(self.heartbeat_timeout))
+                    message = conn.recv()
+                    if message['type'] == 'result':
+                        item[1].put(message['evaluation'])
+                        item = None
+                        break
+                    # everything else is a heartbeat
+        except (EOFError, OSError, IOError):
+            self.__logger.warning('Lost worker %s', addr)
+            if item is not None:
+                self.__requeue(item)
+        finally:
+            with self.__lock:
+                self.num_workers -= 1
+
+    def __requeue(self, item):
+        item[2] += 1
+        if item[2] > self.max_retries:
+            self.__logger.warning('Evaluation failed on %i workers, reporting it as crashed.', item[2])
+            item[1].put(crashed_evaluation())
+        else:
+            with self.__lock:
+                self.num_requeued += 1
+            self.__jobs.put(item)
+
+
+class BrokerClient(object):
+    """
+    The connection of a single SMAC run to the broker.
+
+    Its method evaluate mirrors :py:func:`pysmac.remote_smac.evaluate_with_limits`.
+    If no worker returns a result before the deadline, the connection is
+    closed (which cancels the evaluation) and a new one is opened for the
+    next evaluation.
+    """
+
+    def __init__(self, address, authkey):
+        """
+        :param address: the address of the broker
+        :type address: tuple
+        :param authkey: the key of the broker as a hex string
+        :type authkey: str
+        """
+        self.__address = tuple(address)
+        self.__authkey = binascii.unhexlify(authkey)
+        self.__conn = None
+        self.__connect()
+
+    def __connect(self):
+        self.__conn = multiprocessing.connection.Client(self.__address, 'AF_INET', authkey=self.__authkey)
+        self.__conn.send({'type': 'client'})
+
+    def evaluate(self, function, config_dict, mem_limit_function, t_limit, wall_time_limit, deadline=None):
+        """ Evaluates the function on one of the workers and blocks until the result is available or the deadline has passed.
+
+        :param deadline: the time (as time.time()) after which the evaluation is given up, None waits for the result forever
+        :type deadline: float
+        :returns: dict -- see :py:func:`pysmac.remote_smac.evaluate_with_limits`. After the deadline, the result has the status 'TIMEOUT'.
+        """
+        if self.__conn is None:
+            self.__connect()
+        self.__conn.send({'function': function,
+                          'config_dict': config_dict,
+                          'limits': (mem_limit_function, t_limit, wall_time_limit)})
+        if (deadline is not None) and (not self.__conn.poll(max(deadline - time.time(), 0))):
+            multiprocessing.get_logger().warning('No worker returned a result before the deadline.')
+            self.close()
+            return(expired_evaluation())
+        return(self.__conn.recv())
+
+    def close(self):
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+
+def run_worker(host, port, heartbeat_interval=5, authkey=None):
+    """
+    Connects to a broker and evaluates functions until the broker shuts down.
+
+    :param host: host name of the broker
+    :type host: str
+    :param port: port of the broker
+    :type port: int
+    :param authkey: the key of the broker as a hex string. None reads it from the environment variable :py:data:`AUTHKEY_VARIABLE`.
+    :type authkey: str
+    :param heartbeat_interval: time (in seconds) between two heartbeats during an evaluation. Has to be smaller than the heartbeat_timeout of the broker.
+    :type heartbeat_interval: float
+    """
+    # imported here, because pysmac.remote_smac imports this module lazily
+    from pysmac.remote_smac import evaluate_with_limits
+
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_VARIABLE)
+        if authkey is None:
+            raise ValueError('The key of the broker is required, set {}!'.format(AUTHKEY_VARIABLE))
+    conn = multiprocessing.connection.Client((host, port), 'AF_INET', authkey=binascii.unhexlify(authkey))
+    send_lock = threading.Lock()
+    conn.send({'type': 'worker'})
+
+    while True:
+        message = conn.recv()
+        if message['type'] == 'shutdown':
+            break
+        job = message['job']
+
+        done = threading.Event()
+        def heartbeat():
+            while not done.wait(heartbeat_interval):
+                with send_lock:
+                    conn.send({'type': 'heartbeat'})
+        heartbeat_thread = threading.Thread(target=heartbeat)
+        heartbeat_thread.daemon = True
+        heartbeat_thread.start()
+
+        try:
+            evaluation = evaluate_with_limits(job['function'], job['config_dict'], *job['limits'])
+        finally:
+            done.set()
+            heartbeat_thread.join()
+        with send_lock:
+            conn.send({'type': 'result', 'evaluation': evaluation})
+    conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='pySMAC worker evaluating functions for a remote broker.')
+    parser.add_argument('--host', required=True, help='host name of the broker')
+    parser.add_argument('--port', required=True, type=int, help='port of the broker')
+    parser.add_argument('--heartbeat-interval', type=float, default=5, help='seconds between two heartbeats')
+    parser.add_argument('--authkey', default=None, help='key of the broker (visible to other users of this machine, prefer the environment variable {})'.format(AUTHKEY_VARIABLE))
+    args = parser.parse_args()
+    run_worker(args.host, args.port, args.heartbeat_interval, args.authkey)
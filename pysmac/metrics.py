@@ -0,0 +1,339 @@
+"""
+Live metrics of running optimizations for pySMAC.
+
+A :py:class:`MetricsServer` serves the current state of all SMAC runs
+reporting to it over HTTP in the text exposition format of Prometheus.
+The server is created by the user and can be shared by many concurrent
+calls of :py:meth:`pysmac.optimizer.SMAC_optimizer.minimize`, which are
+distinguished by their study name:
+
+.. code-block:: python
+
+    server = pysmac.metrics.MetricsServer(port=9100)
+    server.start()
+    opt.minimize(func, 1000, parameters, metrics_server=server, study='branin')
+    server.stop()
+
+While the optimization runs, ``curl http://127.0.0.1:9100/metrics`` shows
+per study and run:
+
+    +-------------------------------------+-------------------------------------------+
+    | Metric                              | Meaning                                   |
+    +=====================================+===========================================+
+    | pysmac_evaluations_total            | number of function evaluations            |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_replayed_evaluations_total   | evaluations replayed from the checkpoint  |
+    |                                     | of an interrupted call (included above)   |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_evaluations_per_second       | evaluations per second over the last      |
+    |                                     | minute                                    |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_smac_think_time_seconds      | quantiles of the time SMAC needed to      |
+    |                                     | propose a configuration                   |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_function_time_seconds        | quantiles of the function's wall clock    |
+    |                                     | time                                      |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_timeouts_total               | evaluations that timed out                |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_crashes_total                | evaluations that crashed                  |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_incumbent_value              | lowest successful function value          |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_worker_rss_mb                | resident memory of the run's worker       |
+    |                                     | process                                   |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_function_peak_rss_mb         | peak memory of the latest evaluation      |
+    +-------------------------------------+-------------------------------------------+
+    | pysmac_smac_up                      | 1 while the run's JVM is alive, else 0    |
+    +-------------------------------------+-------------------------------------------+
+
+The SMAC runs send their updates as UDP datagrams to the server. They
+never wait for it, and collect the evaluations of up to a second into a
+single datagram, so reporting adds no noticeable overhead. Updates lost
+while the server is busy only affect the metrics, never the optimization.
+"""
+from __future__ import print_function, division, absolute_import
+
+import json
+import time
+import socket
+import threading
+import collections
+import multiprocessing
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler # Python 2 backward compatibility
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from .utils.resource_accounting import current_rss_mb
+
+
+QUANTILES = (0.5, 0.9, 0.99)
+""" The quantiles reported for the think time of SMAC and the function time."""
+
+
+def worker_rss_mb():
+    """ The current resident set size of the calling process in MB (the peak if the current value is unknown)."""
+    return(current_rss_mb())
+
+
+def _escape(value):
+    return(str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+
+
+def _format_value(value):
+    value = float(value)
+    if value != value:
+        return('NaN')
+    if value in (float('inf'), float('-inf')):
+        return('+Inf' if value > 0 else '-Inf')
+    return(repr(value))
+
+
+def _quantile(sorted_values, q):
+    # nearest rank on the sorted samples
+    return(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))])
+
+
+class MetricsReporter(object):
+    """
+    Sends the evaluations of one SMAC run to a :py:class:`MetricsServer`.
+
+    Used inside every SMAC run. The evaluations are buffered and sent
+    at most every interval_s seconds (or when max_batch_size of them were
+    collected).
+    """
+
+    def __init__(self, address, study, seed, interval_s=1., max_batch_size=50):
+        """
+        :param address: the (host, port) tuple of the server's UDP socket
+        :type address: tuple
+        :param study: the name of the study
+        :type study: str
+        :param seed: the seed of the SMAC run
+        :type seed: int
+        """
+        self.address = tuple(address)
+        self.study = study
+        self.seed = seed
+        self.interval_s = interval_s
+        self.max_batch_size = max_batch_size
+        self.__sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__buffer = []
+        self.__last_send = 0.
+
+    def add(self, timings, result_dict, smac_alive=True):
+        """ Records the evaluation of a configuration.
+
+        :param timings: the timings of the evaluation, see :py:data:`pysmac.utils.timing_statistics.TIMING_KEYS`
+        :type timings: dict
+        :param result_dict: the result reported to SMAC
+        :type result_dict: dict
+        :param smac_alive: whether SMAC's JVM is still running
+        :type smac_alive: bool
+        """
+        self.__buffer.append([timings.get('smac_think_time'), timings.get('function_wall_time'), result_dict['status'],
+                              result_dict['value'], timings.get('peak_rss_mb'), result_dict.get('replayed', False)])
+        if (len(self.__buffer) >= self.max_batch_size) or (time.time() - self.__last_send >= self.interval_s):
+            self.send(smac_alive)
+
+    def send(self, smac_alive=True, finished=False):
+        """ Sends all buffered evaluations together with the current state of the run."""
+        message = {'study': self.study, 'run': self.seed, 'time': time.time(),
+                   'evaluations': self.__buffer, 'worker_rss_mb': worker_rss_mb(),
+                   'smac_alive': smac_alive, 'finished': finished}
+        try:
+            self.__sock.sendto(json.dumps(message).encode(), self.address)
+        except (socket.error, ValueError):
+            multiprocessing.get_logger().debug('Could not send metrics to %s', self.address)
+        self.__buffer = []
+        self.__last_send = time.time()
+
+    def close(self):
+        """ Sends the remaining evaluations and marks the run as finished."""
+        self.send(smac_alive=False, finished=True)
+        self.__sock.close()
+
+
+class _RunMetrics(object):
+    # the state of one SMAC run as seen by the server
+
+    def __init__(self, num_samples):
+        self.evaluations = 0
+        self.replayed = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.incumbent = None
+        # recent samples for the quantiles, and (sum, count) of all samples
+        self.think_times = collections.deque(maxlen=num_samples)
+        self.function_times = collections.deque(maxlen=num_samples)
+        self.totals = {'think': [0., 0], 'function': [0., 0]}
+        self.recent = collections.deque()
+        self.worker_rss_mb = None
+        self.function_peak_rss_mb = None
+        self.smac_alive = True
+        self.first_update = None
+
+    def update(self, message):
+        now = message['time']
+        if self.first_update is None:
+            self.first_update = now
+        for think_time, function_time, status, value, peak, replayed in message['evaluations']:
+            self.evaluations += 1
+            if replayed:
+                self.replayed += 1
+            for key, samples, t in [('think', self.think_times, think_time), ('function', self.function_times, function_time)]:
+                if t is not None:
+                    samples.append(t)
+                    self.totals[key][0] += t
+                    self.totals[key][1] += 1
+            if status == 'TIMEOUT':
+                self.timeouts += 1
+            elif status in ('CRASHED', 'ABORT'):
+                self.crashes += 1
+            elif (value is not None) and (self.incumbent is None or value < self.incumbent):
+                self.incumbent = value
+            if peak is not None:
+                self.function_peak_rss_mb = peak
+        self.recent.append((now, len(message['evaluations'])))
+        self.worker_rss_mb = message['worker_rss_mb']
+        self.smac_alive = message['smac_alive'] and not message['finished']
+
+    def evaluations_per_second(self, now, window_s):
+        while self.recent and (self.recent[0][0] < now - window_s):
+            self.recent.popleft()
+        if self.first_update is None:
+            return(0.)
+        duration = min(window_s, max(now - self.first_update, 1.))
+        return(sum([n for t, n in self.recent]) / duration)
+
+
+class MetricsServer(object):
+    """
+    Collects the updates of the SMAC runs and serves them over HTTP.
+
+    Two daemon threads are used: one receives the UDP datagrams of the
+    runs, the other one answers the HTTP requests on /metrics.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, num_samples=1000, window_s=60):
+        """
+        :param host: interface of the HTTP endpoint. The default only accepts connections from the local machine.
+        :type host: str
+        :param port: port of the HTTP endpoint. 0 picks a free port, see attribute url.
+        :type port: int
+        :param num_samples: number of recent evaluations per run the quantiles are computed from
+        :type num_samples: int
+        :param window_s: the time window (in seconds) for the evaluations per second
+        :type window_s: float
+        """
+        self.num_samples = num_samples
+        self.window_s = window_s
+        self.__logger = multiprocessing.get_logger()
+        self.__lock = threading.Lock()
+        self.__runs = collections.OrderedDict()
+        self.__stopped = threading.Event()
+        self.__threads = []
+
+        self.__udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__udp.bind(('127.0.0.1', 0))
+        self.__udp.settimeout(0.5)
+        self.address = self.__udp.getsockname()
+        """ The (host, port) tuple of the UDP socket the SMAC runs report to."""
+
+        server, logger = self, self.__logger
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = server.exposition().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug('Metrics request: ' + format, *args)
+
+        self.__http = HTTPServer((host, port), Handler)
+        self.url = 'http://%s:%i/metrics' % (host, self.__http.server_address[1])
+        """ The URL of the metrics endpoint."""
+
+    def start(self):
+        """ Starts receiving updates and serving requests in background threads."""
+        for target in (self.__receive_loop, self.__http.serve_forever):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            self.__threads.append(thread)
+        self.__logger.debug('Serving metrics on %s', self.url)
+        return(self)
+
+    def stop(self):
+        """ Stops both threads and closes the sockets."""
+        self.__stopped.set()
+        self.__http.shutdown()
+        self.__http.server_close()
+        for thread in self.__threads:
+            thread.join()
+        self.__udp.close()
+
+    def __receive_loop(self):
+        while not self.__stopped.is_set():
+            try:
+                data = self.__udp.recv(65536)
+            except socket.timeout:
+                continue
+            except socket.error:
+                break
+            try:
+                message = json.loads(data.decode())
+            except ValueError:
+                self.__logger.debug('Ignoring an invalid metrics message')
+                continue
+            key = (message['study'], message['run'])
+            with self.__lock:
+                if key not in self.__runs:
+                    self.__runs[key] = _RunMetrics(self.num_samples)
+                self.__runs[key].update(message)
+
+    def exposition(self):
+        """ :returns: str -- the current metrics of all runs in the text exposition format"""
+        now = time.time()
+        families = collections.OrderedDict()
+        def sample(name, kind, help_text, labels, value, suffix=''):
+            if name not in families:
+                families[name] = ['# HELP %s %s' % (name, help_text), '# TYPE %s %s' % (name, kind)]
+            label_str = ','.join(['%s="%s"' % (k, _escape(v)) for k, v in labels])
+            families[name].append('%s%s{%s} %s' % (name, suffix, label_str, _format_value(value)))
+
+        with self.__lock:
+            for (study, run), m in list(self.__runs.items()):
+                labels = [('study', study), ('run', run)]
+                sample('pysmac_evaluations_total', 'counter', 'Number of function evaluations.', labels, m.evaluations)
+                sample('pysmac_replayed_evaluations_total', 'counter', 'Number of evaluations replayed from a checkpoint.', labels, m.replayed)
+                sample('pysmac_evaluations_per_second', 'gauge', 'Function evaluations per second over the last %g seconds.' % self.window_s,
+                       labels, m.evaluations_per_second(now, self.window_s))
+                for name, key, samples, help_text in [
+                        ('pysmac_smac_think_time_seconds', 'think', m.think_times, 'Time SMAC needed to propose a configuration.'),
+                        ('pysmac_function_time_seconds', 'function', m.function_times, 'Wall clock time of the function.')]:
+                    ordered = sorted(samples)
+                    for q in QUANTILES:
+                        sample(name, 'summary', help_text, labels + [('quantile', q)],
+                               _quantile(ordered, q) if ordered else float('nan'))
+                    sample(name, 'summary', help_text, labels, m.totals[key][0], '_sum')
+                    sample(name, 'summary', help_text, labels, m.totals[key][1], '_count')
+                sample('pysmac_timeouts_total', 'counter', 'Number of evaluations that timed out.', labels, m.timeouts)
+                sample('pysmac_crashes_total', 'counter', 'Number of evaluations that crashed.', labels, m.crashes)
+                if m.incumbent is not None:
+                    sample('pysmac_incumbent_value', 'gauge', 'Lowest successful function value.', labels, m.incumbent)
+                if m.worker_rss_mb is not None:
+                    sample('pysmac_worker_rss_mb', 'gauge', 'Resident memory of the worker process in MB.', labels, m.worker_rss_mb)
+                if m.function_peak_rss_mb is not None:
+                    sample('pysmac_function_peak_rss_mb', 'gauge', 'Peak memory of the latest evaluation in MB.', labels, m.function_peak_rss_mb)
+                sample('pysmac_smac_up', 'gauge', 'Whether the JVM of the SMAC run is alive.', labels, 1 if m.smac_alive else 0)
+        return('\n'.join(['\n'.join(lines) for lines in list(families.values())]) + '\n')
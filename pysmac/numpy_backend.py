@@ -0,0 +1,444 @@
+"""
+A lightweight Bayesian optimization backend that runs without Java.
+
+For cheap functions with only a few parameters, starting a Java process
+and talking to it over TCP can take longer than the whole optimization.
+This backend implements a Gaussian process surrogate with expected
+improvement in NumPy and runs in the Python process. It is selected by
+
+.. code-block:: python
+
+    opt.smac_options['backend'] = 'numpy'
+
+and then used by :py:meth:`pysmac.optimizer.SMAC_optimizer.minimize`
+with the same parameter definitions, conditional clauses and (classic)
+forbidden clauses. The cost of fitting the Gaussian process grows cubically
+with the number of evaluations, so it is meant for small problems with at
+most a few hundred evaluations.
+"""
+from __future__ import print_function, division, absolute_import
+
+import re
+import time
+import math
+import multiprocessing
+
+import numpy as np
+
+from pysmac.remote_smac import evaluate_with_limits, make_result_dict, add_to_history
+from pysmac.utils.callbacks import call_hooks
+from pysmac.utils.timing_statistics import TimingStatistics
+
+
+class SearchSpace(object):
+    """
+    Encodes configurations as vectors in the unit hypercube.
+
+    Real and integer parameters are scaled linearly (or logarithmically) to
+    [0, 1], ordinal parameters are mapped to the relative position of their
+    value, and categorical parameters are represented by the index of their
+    value. Inactive parameters take their default's encoding, so the
+    surrogate model sees a constant for them.
+    """
+
+    def __init__(self, parameter_dict, conditional_clauses=[], forbidden_clauses=[]):
+        """
+        :param parameter_dict: parameter definitions, see :doc:`pcs`
+        :type parameter_dict: dict
+        :param conditional_clauses: conditions in SMAC's syntax, see :doc:`pcs`
+        :type conditional_clauses: list of str
+        :param forbidden_clauses: forbidden combinations in SMAC's classic syntax ('{a = 1, b = 2}')
+        :type forbidden_clauses: list of str
+        """
+        self.names = sorted(parameter_dict.keys())
+        self.specifications = [parameter_dict[n] for n in self.names]
+        self.index = dict([(n, i) for i, n in enumerate(self.names)])
+
+        self.categorical = np.array([s[0] == 'categorical' for s in self.specifications])
+        """ Mask of the categorical dimensions."""
+        # number of possible values for discrete dimensions (0 for reals)
+        self.num_values = np.array([(s[1][1] - s[1][0] + 1) if s[0] == 'integer' else
+                                    (len(s[1]) if s[0] in ('ordinal', 'categorical') else 0)
+                                    for s in self.specifications])
+
+        self.default = np.array([self.encode_value(i, s[2]) for i, s in enumerate(self.specifications)])
+
+        self.conditions = [self.__parse_condition(c) for c in conditional_clauses]
+        self.forbidden = [self.__parse_forbidden(f) for f in forbidden_clauses]
+
+    def encode_value(self, i, value):
+        """ Encodes the value of the i-th parameter."""
+        spec = self.specifications[i]
+        if spec[0] in ('real', 'integer'):
+            lower, upper = float(spec[1][0]), float(spec[1][1])
+            if (len(spec) == 4) and spec[3] == 'log':
+                return((math.log(value) - math.log(lower)) / (math.log(upper) - math.log(lower)))
+            return((value - lower) / (upper - lower))
+        index = list(spec[1]).index(value)
+        if spec[0] == 'ordinal':
+            return(index / max(1, len(spec[1]) - 1))
+        return(float(index))
+
+    def __parse_value(self, name, token):
+        """ Encodes a value given as a string in a clause."""
+        if name not in self.index:
+            raise ValueError('Unknown parameter {} in clause!'.format(name))
+        i = self.index[name]
+        spec = self.specifications[i]
+        token = token.strip().strip('\'"')
+        if spec[0] in ('real', 'integer'):
+            return(self.encode_value(i, float(token)))
+        for value in spec[1]:
+            if str(value) == token:
+                return(self.encode_value(i, value))
+        raise ValueError('Value {} is not valid for parameter {}!'.format(token, name))
+
+    def __parse_condition(self, clause):
+        """ Parses 'child | a in {x, y} && b == z || ...' into (child, list of and-groups)."""
+        child, expression = clause.split('|', 1)
+        child = child.strip()
+        if child not in self.index:
+            raise ValueError('Unknown parameter {} in conditional clause!'.format(child))
+
+        or_groups = []
+        # && has the higher precedence, and there are no parenthesis
+        for or_part in re.split(r'\|\|', expression):
+            group = []
+            for term in or_part.split('&&'):
+                match = re.match(r'\s*(\w+)\s+in\s*\{(.*)\}\s*$', term)
+                if match is not None:
+                    name = match.group(1)
+                    values = [self.__parse_value(name, v) for v in match.group(2).split(',')]
+                    group.append((self.index[name], 'in', values))
+                    continue
+                match = re.match(r'\s*(\w+)\s*(==|!=|<|>)\s*(\S+)\s*$', term)
+                if match is None:
+                    raise ValueError('The numpy backend does not understand the condition \'{}\'!'.format(term.strip()))
+                name = match.group(1)
+                group.append((self.index[name], match.group(2), [self.__parse_value(name, match.group(3))]))
+            or_groups.append(group)
+        return(self.index[child], or_groups)
+
+    def __parse_forbidden(self, clause):
+        """ Parses '{a = 1, b = 2}' into a list of (index, encoded value)."""
+        match = re.match(r'\s*\{(.*)\}\s*$', clause)
+        if (match is None) or re.search(r'==|!=|<|>|&&|\|\|', clause):
+            raise ValueError('The numpy backend only supports the classic syntax for forbidden clauses, not \'{}\'!'.format(clause))
+        pairs = []
+        for assignment in match.group(1).split(','):
+            name, value = assignment.split('=')
+            pairs.append((self.index[name.strip()], self.__parse_value(name.strip(), value)))
+        return(pairs)
+
+    def snap(self, X):
+        """ Clips X (in place) to the unit cube and rounds the discrete dimensions to valid values. """
+        X[:, ~self.categorical] = np.clip(X[:, ~self.categorical], 0, 1)
+        for i, n in enumerate(self.num_values):
+            if n == 0:
+                continue
+            if self.categorical[i]:
+                X[:, i] = np.clip(np.round(X[:, i]), 0, n - 1)
+            elif self.specifications[i][0] == 'ordinal':
+                X[:, i] = np.round(X[:, i] * (n - 1)) / max(1, n - 1)
+            else:
+                # integers, possibly on a log scale: round in the original space
+                X[:, i] = self.encode_column(i, np.round(self.decode_column(i, X[:, i])))
+        return(X)
+
+    def encode_column(self, i, column):
+        """ Vectorized version of encode_value for numerical parameters."""
+        spec = self.specifications[i]
+        lower, upper = float(spec[1][0]), float(spec[1][1])
+        if (len(spec) == 4) and spec[3] == 'log':
+            return((np.log(column) - math.log(lower)) / (math.log(upper) - math.log(lower)))
+        return((column - lower) / (upper - lower))
+
+    def decode_column(self, i, column):
+        """ Converts the encoded values of a numerical parameter back into the original space."""
+        spec = self.specifications[i]
+        lower, upper = float(spec[1][0]), float(spec[1][1])
+        if (len(spec) == 4) and spec[3] == 'log':
+            return(np.exp(math.log(lower) + column * (math.log(upper) - math.log(lower))))
+        return(lower + column * (upper - lower))
+
+    def active(self, X):
+        """ Evaluates the conditional clauses for every row of X.
+
+        :returns: numpy.ndarray -- boolean mask with the shape of X
+        """
+        active = np.ones(X.shape, dtype=bool)
+        # conditions can depend on conditional parameters, so propagate
+        # until nothing changes
+        for _ in range(len(self.conditions) + 1):
+            previous = active.copy()
+            for child, or_groups in self.conditions:
+                satisfied = np.zeros(X.shape[0], dtype=bool)
+                for group in or_groups:
+                    group_satisfied = np.ones(X.shape[0], dtype=bool)
+                    for parent, op, values in group:
+                        column = X[:, parent]
+                        if op == 'in':
+                            test = np.any([np.isclose(column, v) for v in values], axis=0)
+                        elif op == '==':
+                            test = np.isclose(column, values[0])
+                        elif op == '!=':
+                            test = ~np.isclose(column, values[0])
+                        elif op == '<':
+                            test = (column < values[0]) & ~np.isclose(column, values[0])
+                        else:
+                            test = (column > values[0]) & ~np.isclose(column, values[0])
+                        group_satisfied &= test & active[:, parent]
+                    satisfied |= group_satisfied
+                active[:, child] = satisfied
+            if np.all(previous == active):
+                break
+        return(active)
+
+    def impute(self, X):
+        """ Sets inactive parameters (in place) to their default's encoding and returns the activity mask."""
+        active = self.active(X)
+        X[~active] = np.broadcast_to(self.default, X.shape)[~active]
+        return(active)
+
+    def forbidden_mask(self, X, active):
+        """ :returns: numpy.ndarray -- True for the rows of X that match a forbidden clause"""
+        mask = np.zeros(X.shape[0], dtype=bool)
+        for pairs in self.forbidden:
+            match = np.ones(X.shape[0], dtype=bool)
+            for i, value in pairs:
+                match &= np.isclose(X[:, i], value) & active[:, i]
+            mask |= match
+        return(mask)
+
+    def sample(self, rng, num_samples):
+        """ Draws uniformly distributed, valid configurations (forbidden ones are removed)."""
+        X = rng.uniform(size=(num_samples, len(self.names)))
+        X[:, self.categorical] *= self.num_values[self.categorical]
+        X[:, self.categorical] -= 0.5
+        self.snap(X)
+        active = self.impute(X)
+        return(X[~self.forbidden_mask(X, active)])
+
+    def neighbors(self, rng, X, scale=0.1):
+        """ Random neighbors of every row: Gaussian steps for ordered parameters, resampled categoricals."""
+        Y = X.copy()
+        ordered = ~self.categorical
+        Y[:, ordered] += scale * rng.normal(size=(X.shape[0], int(ordered.sum())))
+        for i in np.nonzero(self.categorical)[0]:
+            change = rng.uniform(size=X.shape[0]) < 1. / len(self.names)
+            Y[change, i] = rng.randint(0, self.num_values[i], size=int(change.sum()))
+        self.snap(Y)
+        active = self.impute(Y)
+        return(Y, self.forbidden_mask(Y, active))
+
+    def decode(self, x):
+        """ Converts a single encoded configuration into the dict of active parameters with the proper types."""
+        X = x.reshape(1, -1).copy()
+        active = self.active(X)[0]
+        config = {}
+        for i, name in enumerate(self.names):
+            if not active[i]:
+                continue
+            spec = self.specifications[i]
+            if spec[0] == 'real':
+                config[name] = float(self.decode_column(i, X[:, i])[0])
+            elif spec[0] == 'integer':
+                config[name] = int(round(self.decode_column(i, X[:, i])[0]))
+            elif spec[0] == 'ordinal':
+                config[name] = spec[1][int(round(X[0, i] * max(1, len(spec[1]) - 1)))]
+            else:
+                config[name] = spec[1][int(round(X[0, i]))]
+        return(config)
+
+
+def normal_cdf(z):
+    """ Vectorized standard normal CDF (Abramowitz & Stegun 7.1.26, error below 1.5e-7)."""
+    x = np.abs(z) / math.sqrt(2.)
+    t = 1. / (1. + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1. - poly * np.exp(-x * x)
+    return(0.5 * (1. + np.sign(z) * erf))
+
+
+def expected_improvement(mean, std, best):
+    """ Expected improvement over the lowest observed value (for minimization)."""
+    std = np.maximum(std, 1e-12)
+    z = (best - mean) / std
+    pdf = np.exp(-0.5 * z * z) / math.sqrt(2 * math.pi)
+    return((best - mean) * normal_cdf(z) + std * pdf)
+
+
+class GaussianProcess(object):
+    """
+    Gaussian process regression with a Matern 5/2 kernel.
+
+    Categorical dimensions contribute a mismatch indicator to the distance.
+    The length scale and noise level are chosen from a small grid by
+    maximizing the marginal likelihood.
+    """
+
+    length_scales = (0.05, 0.1, 0.2, 0.4, 0.8, 1.6)
+    noise_levels = (1e-6, 1e-3, 1e-1)
+
+    def __init__(self, categorical):
+        self.categorical = categorical
+
+    def __distances(self, A, B, length_scale):
+        diff = A[:, None, :] - B[None, :, :]
+        diff[:, :, self.categorical] = (diff[:, :, self.categorical] != 0)
+        return(np.sqrt(np.sum(diff ** 2, axis=2)) / length_scale)
+
+    @staticmethod
+    def __matern(r):
+        s = math.sqrt(5.) * r
+        return((1. + s + s * s / 3.) * np.exp(-s))
+
+    def fit(self, X, y):
+        """ Fits the model to the encoded configurations X and their values y."""
+        self.X = X
+        self.y_mean, self.y_std = y.mean(), max(y.std(), 1e-12)
+        y = (y - self.y_mean) / self.y_std
+        best = None
+        for length_scale in self.length_scales:
+            K_base = self.__matern(self.__distances(X, X, length_scale))
+            for noise in self.noise_levels:
+                try:
+                    L = np.linalg.cholesky(K_base + noise * np.eye(len(y)))
+                except np.linalg.LinAlgError:
+                    continue
+                alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+                log_likelihood = -0.5 * y.dot(alpha) - np.log(np.diag(L)).sum()
+                if (best is None) or (log_likelihood > best[0]):
+                    best = (log_likelihood, length_scale, L, alpha)
+        _, self.length_scale, self.L, self.alpha = best
+        return(self)
+
+    def predict(self, X):
+        """ :returns: tuple -- (mean, standard deviation) for every row of X"""
+        K = self.__matern(self.__distances(X, self.X, self.length_scale))
+        mean = K.dot(self.alpha)
+        v = np.linalg.solve(self.L, K.T)
+        var = np.maximum(1. - np.sum(v * v, axis=0), 1e-12)
+        return(mean * self.y_std + self.y_mean, np.sqrt(var) * self.y_std)
+
+
+def propose(space, model, X, y, rng, num_samples=500, num_starts=10, num_steps=20):
+    """ Finds the configuration with the highest expected improvement by random sampling and local search.
+
+    :returns: numpy.ndarray -- the encoded configuration (None if no new one was found)
+    """
+    best = y.min()
+    candidates = np.vstack([space.sample(rng, num_samples), X[np.argsort(y)[:num_starts]]])
+    ei = expected_improvement(*(model.predict(candidates) + (best,)))
+
+    # start local searches from the most promising candidates
+    starts = np.argsort(-ei)[:num_starts]
+    current, current_ei = candidates[starts], ei[starts]
+    for step in range(num_steps):
+        scale = 0.1 * (1. - step / num_steps) + 0.01
+        neighbors, forbidden = space.neighbors(rng, current, scale)
+        neighbor_ei = expected_improvement(*(model.predict(neighbors) + (best,)))
+        better = (neighbor_ei > current_ei) & ~forbidden
+        current[better], current_ei[better] = neighbors[better], neighbor_ei[better]
+
+    candidates = np.vstack([candidates, current])
+    ei = np.concatenate([ei, current_ei])
+    # never propose a configuration twice
+    for i in np.argsort(-ei):
+        if not np.any(np.all(np.isclose(X, candidates[i]), axis=1)):
+            return(candidates[i])
+    return(None)
+
+
+def numpy_minimize(func, max_evaluations, space, seed, deterministic=True,
+                   mem_limit_function_mb=None, t_limit_function_s=None,
+                   timeout_quality=2.**127, callbacks=None, deadline=None, num_initial=None,
+                   history=None):
+    """
+    One optimization run of the numpy backend.
+
+    The first evaluation is the default configuration, followed by
+    num_initial random ones. Every further configuration maximizes the
+    expected improvement of a Gaussian process fitted to all results.
+    Crashed or timed out evaluations enter the model with the worst value
+    observed so far. If a :py:class:`pysmac.utils.run_history.RunHistory`
+    is given as history, every evaluation is added to it.
+
+    :returns: tuple -- (lowest function value, corresponding configuration, TimingStatistics of this run)
+    """
+    logger = multiprocessing.get_logger()
+    rng = np.random.RandomState(seed)
+    callbacks = callbacks or []
+    num_initial = min(max_evaluations, max(3, len(space.names) + 1)) if num_initial is None else num_initial
+
+    # only fork a subprocess for every evaluation if limits are requested
+    use_limits = (mem_limit_function_mb is not None) or (t_limit_function_s is not None)
+    wall_time_limit = None if t_limit_function_s is None else 10*t_limit_function_s
+
+    X, values, successful = [], [], []
+    incumbent = (None, None)
+    timing_statistics = TimingStatistics()
+    initial = np.vstack([space.default.reshape(1, -1), space.sample(rng, 10 * num_initial)])
+
+    for iteration in range(max_evaluations):
+        if (deadline is not None) and (time.time() >= deadline):
+            logger.debug('The total time budget is exhausted, stopping the run with seed %i', seed)
+            break
+
+        think_start = time.time()
+        x = None
+        if (iteration < num_initial) and (iteration < len(initial)):
+            x = initial[iteration]
+        elif any(successful):
+            y = np.array(values)
+            y[~np.array(successful)] = y[np.array(successful)].max()
+            model = GaussianProcess(space.categorical).fit(np.array(X), y)
+            x = propose(space, model, np.array(X), y, rng)
+        if x is None:
+            x = space.sample(rng, 1)[0]
+        config_dict = space.decode(x)
+        if not deterministic:
+            config_dict['seed'] = int(rng.randint(2**31 - 1))
+        timings = {'smac_think_time': time.time() - think_start}
+
+        if callbacks and call_hooks(callbacks, 'before_evaluation', seed, dict(config_dict)):
+            logger.debug('A callback stopped the run before iteration %i', iteration)
+            break
+
+        if use_limits:
+            evaluation = evaluate_with_limits(func, config_dict, mem_limit_function_mb,
+                                              t_limit_function_s, wall_time_limit)
+            for k in ['spawn_time', 'function_wall_time', 'function_cpu_time', 'peak_rss_mb']:
+                timings[k] = evaluation[k]
+            res, runtime, wall_time = evaluation['result'], evaluation['function_cpu_time'], evaluation['wall_time']
+        else:
+            start = time.time()
+            try:
+                res = func(**config_dict)
+            except Exception:
+                logger.exception('The evaluation of %s crashed', config_dict)
+                res = None
+            runtime = wall_time = time.time() - start
+            timings['function_wall_time'] = runtime
+
+        result_dict = make_result_dict(res, runtime, timeout_quality, t_limit_function_s, wall_time)
+        ok = result_dict['status'] in ('SAT', 'UNSAT')
+
+        X.append(x)
+        values.append(float(result_dict['value']))
+        successful.append(ok)
+        timing_statistics.add(timings)
+        if history is not None:
+            add_to_history(history, config_dict, result_dict, seed)
+
+        if ok and (incumbent[0] is None or result_dict['value'] < incumbent[0]):
+            incumbent = (result_dict['value'], config_dict)
+            if callbacks:
+                call_hooks(callbacks, 'on_incumbent_change', seed, dict(config_dict), dict(result_dict))
+        if callbacks and call_hooks(callbacks, 'after_evaluation', seed, dict(config_dict), dict(result_dict), timings):
+            logger.debug('A callback stopped the run after iteration %i', iteration)
+            break
+
+    if callbacks:
+        call_hooks(callbacks, 'on_run_end', seed, timing_statistics)
+    return(incumbent[0], incumbent[1], timing_statistics)
@@ -1,19 +1,31 @@
 from __future__ import print_function, division, absolute_import
 
 import sys
+import time
 import tempfile
 import os
 import shutil
 import errno
 import operator
+import random
 import multiprocessing
 import logging
 import csv
 
-from .utils.smac_output_readers import read_trajectory_file
+from .utils.smac_output_readers import read_trajectory_file, read_live_rundata_file
 import pysmac.remote_smac
-from .utils.multiprocessing_wrapper import MyPool
+from .utils.run_scheduler import RunScheduler
+from .utils.timing_statistics import TimingStatistics
+from .utils.run_history import RunHistory
+from .utils.successive_halving import SuccessiveHalving
+from .utils.memory_budget import MemoryBudget
+from .utils.cpu_allocation import CPUAllocator
+from .utils.executors import make_executor
+from .ask_tell import AskTellSession
+from .utils.checkpoint import read_checkpoint, write_checkpoint
+from .utils.working_directory import OUTPUT_LEVELS, ram_disk_directory, remove_in_background
 from pysmac.utils.java_helper import check_java_version, smac_classpath
+from pysmac.utils.fake_smac import command as fake_smac_command
 
 
 class SMAC_optimizer(object):
@@ -33,13 +45,53 @@ class SMAC_optimizer(object):
     mainly for SMAC
     """
 
+    timing_statistics = None
+    """ After minimize returned, this dict maps every run's seed to a
+    :py:class:`pysmac.utils.timing_statistics.TimingStatistics` object with
+    the timings of all its function evaluations. The key 'all' holds the
+    aggregate over all runs. Use its methods percentiles and histograms
+    to find out whether SMAC, the communication, or the function itself
+    dominates the overall runtime.
+    """
+
+    run_history = None
+    """ After minimize returned, a :py:class:`pysmac.utils.run_history.RunHistory`
+    with the results of all function evaluations of all runs, see
+    :ref:`run_history`.
+    """
+
+    validation_results = None
+    """ After minimize returned with parallel_validation, a dict with the
+    keys 'instances' (the indices of the test instances), 'seeds' (the
+    seed used on every test instance, None for deterministic functions),
+    'configurations' (the distinct final incumbents of all runs), 'values'
+    and 'statuses' (arrays with one row per test instance and one column
+    per configuration) and 'run_configurations' (the column of every run's
+    final incumbent).
+    """
+
+    shared_model_statistics = None
+    """ After minimize returned in shared model mode, this dict maps every
+    run's seed to a dict with the keys 'own_evaluations' (evaluations done
+    by this run), 'shared_evaluations' (evaluations of the other runs that
+    were available to its model), 'shared_fraction' (fraction of the
+    available data contributed by the other runs), 'incumbent_value'
+    (the estimated performance of the run's final incumbent),
+    'incumbent_time' (the wall clock time when the run found it) and
+    'time_to_best' (the wall clock time when the run's incumbent first
+    reached the best final value of all runs, None if it never did). The
+    first three only count the available data; whether sharing helped
+    shows in the last three compared to a call without shared model mode,
+    see :ref:`shared_model`.
+    """
+
 
 
     # collects smac specific data that go into the scenario file
-    def __init__(self, t_limit_total_s=None, mem_limit_smac_mb=None, working_directory = None, persistent_files=False, debug = False):
+    def __init__(self, t_limit_total_s=None, mem_limit_smac_mb=None, working_directory = None, persistent_files=False, debug = False, mem_limit_total_mb=None, in_memory=False, output_level='full', background_cleanup=True):
         """
         
-        :param t_limit_total_s: the total time budget (in seconds) for the optimization. None means that no wall clock time constraint is enforced.
+        :param t_limit_total_s: the total time budget (in seconds) for every call of minimize. None means that no wall clock time constraint is enforced. If the budget is exhausted, all runs are stopped, and minimize returns the best incumbent found so far.
         :type t_limit_total_s: float
         :param mem_limit_smac_mb: memory limit for the Java Runtime Environment in which SMAC will be executed. None means system default.
         :type mem_limit_smac_mb: int
@@ -49,6 +101,14 @@ class SMAC_optimizer(object):
         :type persistent_files: bool
         :param debug: set this to true for debug information (pysmac and SMAC itself) logged to standard-out. 
         :type debug: bool
+        :param mem_limit_total_mb: memory budget (in MB) for all parallel SMAC runs and their function evaluations together. Runs are only started while their reserved memory (mem_limit_smac_mb plus mem_limit_function_mb) and the measured memory of the running runs fit into it; the others are queued. Function evaluations also wait until mem_limit_function_mb fits into it, a run that waits longer than a minute is aborted. None means no limit.
+        :type mem_limit_total_mb: int
+        :param in_memory: whether the temporary working directory is created on a memory backed filesystem (like /dev/shm), which avoids slow disk or network I/O. Only used if working_directory is None.
+        :type in_memory: bool
+        :param output_level: how many files SMAC writes: 'full', 'reduced' or 'minimal', see :py:data:`pysmac.utils.working_directory.OUTPUT_LEVELS`. The trajectories are always written.
+        :type output_level: str
+        :param background_cleanup: whether the working directory (if not persistent) is removed by a separate process, so the destruction of the optimizer does not block.
+        :type background_cleanup: bool
         """
         
         self.__logger = multiprocessing.log_to_stderr()
@@ -59,8 +119,10 @@ class SMAC_optimizer(object):
         
         self.__t_limit_total_s = 0 if t_limit_total_s is None else int(t_limit_total_s)
         self.__mem_limit_smac_mb = None if (mem_limit_smac_mb is None) else int(mem_limit_smac_mb)
+        self.__mem_limit_total_mb = None if (mem_limit_total_mb is None) else int(mem_limit_total_mb)
             
         self.__persistent_files = persistent_files
+        self.__background_cleanup = background_cleanup
         
         # some basic consistency checks
 
@@ -68,11 +130,20 @@ class SMAC_optimizer(object):
             raise ValueError('The total time limit cannot be nagative!')
         if (( self.__mem_limit_smac_mb is not None) and (self.__mem_limit_smac_mb <= 0)):
             raise ValueError('SMAC\'s memory limit has to be either None (no limit) or positive!')
+        if (( self.__mem_limit_total_mb is not None) and (self.__mem_limit_total_mb <= 0)):
+            raise ValueError('The total memory limit has to be either None (no limit) or positive!')
+        if output_level not in OUTPUT_LEVELS:
+            raise ValueError('The output level has to be one of {}!'.format(', '.join(sorted(OUTPUT_LEVELS))))
 
         
         # create a temporary directory if none is specified
         if working_directory is None:
-            self.working_directory = tempfile.mkdtemp()
+            base_directory = None
+            if in_memory:
+                base_directory = ram_disk_directory()
+                if base_directory is None:
+                    self.__logger.warning('No memory backed filesystem found, using a regular temporary directory.')
+            self.working_directory = tempfile.mkdtemp(dir=base_directory)
         else:
             self.working_directory = working_directory
         
@@ -124,16 +195,30 @@ class SMAC_optimizer(object):
             'timeout_quality':2.**127,    # not a SMAC option either
                                           # custamize the quality reported
                                           # to SMAC in case of a timeout
+            'backend': 'smac',            # not a SMAC option; 'numpy'
+                                          # runs minimize without Java, see
+                                          # pysmac.numpy_backend, 'fake'
+                                          # replaces SMAC by
+                                          # pysmac.utils.fake_smac
+            'fake_replay_directory': None,# not a SMAC option; transcripts
+                                          # the fake backend replays
+            'transcript_directory': None, # not a SMAC option; records the
+                                          # messages of every run
             }
         if debug:
             self.smac_options['console-log-level']='INFO'
+        self.smac_options.update(OUTPUT_LEVELS[output_level])
 
     def __del__(self):
         """
         Destructor cleaning up after SMAC finishes depending on the persistent_files flag.
         """
-        if not self.__persistent_files:
-            shutil.rmtree(self.working_directory)
+        # nothing was created if the constructor raised an exception
+        if (not self.__persistent_files) and hasattr(self, 'working_directory'):
+            if self.__background_cleanup:
+                remove_in_background(self.working_directory)
+            else:
+                shutil.rmtree(self.working_directory)
 
     def minimize(self, func, max_evaluations, parameter_dict, 
             conditional_clauses = [], forbidden_clauses=[],
@@ -141,7 +226,16 @@ class SMAC_optimizer(object):
             num_train_instances = None, num_test_instances = None,
             train_instance_features = None,
             num_runs = 1, num_procs = 1, seed = 0,
-            mem_limit_function_mb=None, t_limit_function_s= None):
+            mem_limit_function_mb=None, t_limit_function_s= None,
+            callbacks = None, evaluation_broker = None,
+            shared_model = False, shared_model_frequency_s = 300,
+            racing = False, racing_threshold = 0.1, racing_grace_period_s = 60,
+            racing_max_new_runs = None,
+            min_budget = None, max_budget = None, eta = 3,
+            cpu_allocation = False, resume = False,
+            run_history_db = None, study = None, metrics_server = None,
+            event_log = None, parallel_validation = False, early_stopping = None,
+            executor = None):
         """
         Function invoked to perform the actual minimization given all necessary information.
         
@@ -170,13 +264,476 @@ class SMAC_optimizer(object):
         :param mem_limit_function_mb: sets the memory limit for your function (value in MB). ``None`` means no restriction. Be aware that this limit is enforced for each SMAC run separately. So if you have 2 parallel runs, pysmac could use twice that value (and twice the value of mem_limit_smac_mb) in total. Note that due to the creation of the subprocess, the amount of memory available to your function is less than the value specified here. This option exists mainly to prevent a memory usage of 100% which will at least slow the system down.
         :type  mem_limit_function_mb: int
         :param t_limit_function_s: cutoff time for a single function call. ``None`` means no restriction. If optimizing run time, SMAC can choose a shorter cutoff than the provided one for individual runs. If `None` was provided, then there is no cutoff ever!
+        :param callbacks: hooks called inside every SMAC run before and after each evaluation, on a new incumbent and at the end of the run. Their methods can also stop a run early. See :py:class:`pysmac.utils.callbacks.Callback`.
+        :type callbacks: list of :py:class:`pysmac.utils.callbacks.Callback`
+        :param evaluation_broker: a started broker that sends all function evaluations to remote workers instead of evaluating them locally. ``None`` evaluates the function in the process of the SMAC run. See :py:mod:`pysmac.distributed`.
+        :type evaluation_broker: :py:class:`pysmac.distributed.EvaluationBroker`
+        :param shared_model: whether the SMAC runs share their run data. Every run then periodically reads the evaluations of all other runs from the output directory and uses them for its model. This is most useful if num_procs equals num_runs, see :ref:`shared_model`.
+        :type shared_model: bool
+        :param shared_model_frequency_s: how often (in seconds) the runs look for new data of the other runs in shared model mode.
+        :type shared_model_frequency_s: int
+        :param racing: whether SMAC runs that are clearly worse than the others are stopped early and replaced by runs with fresh seeds, see :ref:`racing`.
+        :type racing: bool
+        :param racing_threshold: a run is stopped if its incumbent is worse than the best one of the other runs by more than this fraction (of the best value's absolute value).
+        :type racing_threshold: float
+        :param racing_grace_period_s: minimum time (in seconds) every run can run before it can be stopped.
+        :type racing_grace_period_s: float
+        :param racing_max_new_runs: the maximum number of runs with fresh seeds started to replace stopped runs. ``None`` means as many as num_runs.
+        :type racing_max_new_runs: int
+        :param min_budget: enables multi-fidelity optimization with successive halving. Your function then receives an additional argument called **budget**, and every configuration is first evaluated on this budget. SMAC receives the runtime summed over all budgets and the value on max_budget; configurations stopped on a smaller budget are reported with at least the worst value observed on max_budget, see :ref:`multi_fidelity`.
+        :type min_budget: float
+        :param max_budget: the largest budget used in multi-fidelity optimization, usually corresponding to a full function evaluation.
+        :type max_budget: float
+        :param eta: only the best 1/eta configurations on a budget are evaluated on the eta times larger budget.
+        :type eta: float
+        :param cpu_allocation: whether every parallel run is pinned to its own set of CPUs. The available CPUs are split evenly between the num_procs runs, and the threads of the JVM and of numerical libraries (OpenMP, MKL, OpenBLAS) in your function are limited to that number. Only supported on Linux.
+        :type cpu_allocation: bool
+        :param resume: whether to continue an interrupted call of minimize with the same arguments in the same working_directory, see :ref:`checkpoints`. Requires persistent_files=True and an output_level other than 'minimal'. If no checkpoint is found, the optimization starts from scratch.
+        :type resume: bool
+        :param run_history_db: an SQLite database file every evaluation is written to, see :ref:`run_history_db`. None means no database is used.
+        :type run_history_db: str
+        :param study: the name under which the evaluations are stored in the run history database and reported to the metrics server. None means the name of the working directory.
+        :type study: str
+        :param metrics_server: a started server that collects live metrics of all runs and serves them over HTTP. See :py:mod:`pysmac.metrics`.
+        :type metrics_server: :py:class:`pysmac.metrics.MetricsServer`
+        :param event_log: a JSON lines file every run appends one record per evaluation to, see :ref:`event_log`. None means no event log is written.
+        :type event_log: str
+        :param parallel_validation: whether pySMAC validates the final incumbents of all runs on the test instances itself, using num_procs processes, instead of SMAC validating them one after another at the end of each run, see :ref:`validation`.
+        :type parallel_validation: bool
+        :param early_stopping: a rule to stop evaluations early based on the intermediate values the function reports. Your function then receives an additional argument called **reporter**, see :ref:`early_stopping`. ``None`` means evaluations are never stopped.
+        :type early_stopping: :py:class:`pysmac.utils.early_stopping.StoppingRule`
+        :param executor: how the SMAC runs are started: 'process' (a pool of worker processes), 'fork', 'spawn' or 'forkserver' (the same with this start method), 'subprocess' (a new Python interpreter for every run), 'thread' (all runs in threads of this process), a :py:class:`pysmac.utils.executors.RunExecutor` or a concurrent.futures.Executor of your application, see :ref:`executors`. None means 'process'. Executors running the runs in threads of this process can not be combined with t_limit_function_s.
+        :type executor: str or executor
+        :returns: tuple -- (lowest function value found, corresponding configuration as a dict). The timings of all evaluations are stored in the attribute timing_statistics, and their results in the attribute run_history.
         """
+        
+        # the total time budget starts now and covers all runs
+        start_time = time.time()
+        deadline = None if self.__t_limit_total_s == 0 else start_time + self.__t_limit_total_s
 
-        self.smac_options['algo-deterministic'] = deterministic
+        backend = self.smac_options.get('backend', 'smac')
+        if backend == 'numpy':
+            unsupported = dict(num_train_instances=num_train_instances, num_test_instances=num_test_instances,
+                               evaluation_broker=evaluation_broker, min_budget=min_budget, max_budget=max_budget,
+                               metrics_server=metrics_server, event_log=event_log, early_stopping=early_stopping,
+                               executor=executor, run_history_db=run_history_db, study=study)
+            unsupported = [k for k, v in list(unsupported.items()) if v is not None]
+            unsupported += [k for k, v in [('shared_model', shared_model), ('racing', racing), ('cpu_allocation', cpu_allocation),
+                                           ('resume', resume)] if v]
+            if len(unsupported) > 0:
+                raise ValueError('The numpy backend does not support the options {}!'.format(', '.join(sorted(unsupported))))
+            return(self.__minimize_numpy(func, max_evaluations, parameter_dict, conditional_clauses,
+                                         forbidden_clauses, deterministic, self.__seed_list(seed, num_runs),
+                                         mem_limit_function_mb, t_limit_function_s, callbacks, deadline))
+        elif backend not in ('smac', 'fake'):
+            raise ValueError('Unknown backend {}!'.format(backend))
+        
+        # the CPU time of a killed evaluation is only known from the counters of
+        # this process, which also contain the evaluations of the other threads
+        executor = make_executor(executor)
+        if (t_limit_function_s is not None) and (not executor.separate_processes):
+            raise ValueError('The CPU time limit t_limit_function_s requires that every run has its own process!')
+        
+        # every run records its evaluations, so an interrupted call can be resumed
+        checkpoint_directory = None
+        previous = None
+        if self.__persistent_files:
+            checkpoint_directory = os.path.join(self.working_directory, 'checkpoint')
+            previous = read_checkpoint(checkpoint_directory) if resume else None
+            if previous is None:
+                if resume:
+                    self.__logger.warning('No checkpoint found in %s, starting from scratch.', checkpoint_directory)
+                shutil.rmtree(checkpoint_directory, ignore_errors=True)
+                os.makedirs(checkpoint_directory)
+        elif resume:
+            raise ValueError('Resuming requires persistent_files=True and the working_directory of the interrupted call!')
+        if resume and (self.smac_options.get('state-serializer') == 'NULL'):
+            raise ValueError("Resuming requires SMAC's state, which is not written with output_level='minimal'!")
+        
+        # the time spent before the interruption counts towards the total budget
+        elapsed_s = 0.
+        if previous is not None:
+            elapsed_s = previous['elapsed_s'] + max(0., previous['last_update'] - previous['start_time'])
+            if deadline is not None:
+                deadline -= elapsed_s
+
+        num_procs = int(num_procs)
+        
+        successive_halving = None
+        if (min_budget is not None) or (max_budget is not None):
+            if (min_budget is None) or (max_budget is None):
+                raise ValueError('Multi-fidelity optimization requires both, min_budget and max_budget!')
+            if 'budget' in parameter_dict:
+                raise ValueError('The name \'budget\' is reserved for multi-fidelity optimization!')
+            # checks the arguments before any SMAC run is started
+            SuccessiveHalving(min_budget, max_budget, eta)
+            successive_halving = (min_budget, max_budget, eta)
+        if (early_stopping is not None) and ('reporter' in parameter_dict):
+            raise ValueError('The name \'reporter\' is reserved for early stopping!')
+
+        seed = self.__seed_list(seed, num_runs)
+        if previous is not None:
+            # includes the runs started while racing
+            seed = sorted(set(previous['seeds']) | set(previous['recorded_seeds']))
+        
+        # SMAC options that only apply to this call
+        call_options = {}
+        if shared_model:
+            if int(shared_model_frequency_s) < 1:
+                raise ValueError('The frequency for the shared model mode has to be at least one second!')
+            if num_procs < num_runs:
+                self.__logger.warning('Only %i of %i runs can share their data at the same time in shared model mode.', num_procs, num_runs)
+            # all runs write into the same output directory where SMAC
+            # looks for the files of the other runs
+            call_options['shared-model-mode'] = True
+            call_options['shared-model-mode-frequency'] = int(shared_model_frequency_s)
         
-        # adjust the number of training instances
         num_train_instances = None if (num_train_instances is None) else int(num_train_instances)
         
+        # SMAC does not validate if pySMAC does it
+        parallel_validation = parallel_validation and (num_test_instances is not None)
+        if parallel_validation:
+            call_options['validation'] = False
+        scenario_fn, additional_options_fn, parser_dict, java_executable, timeout_quality, scenario_dir =\
+            self.__write_scenario(max_evaluations, parameter_dict, conditional_clauses, forbidden_clauses,
+                                  deterministic, num_train_instances,
+                                  None if parallel_validation else num_test_instances,
+                                  train_instance_features, t_limit_function_s, call_options)
+        
+        if checkpoint_directory is not None:
+            with open(self.smac_options['pcs-file'], 'r') as fh:
+                pcs = fh.read()
+            if (previous is not None) and ((previous['pcs'] != pcs) or (previous['max_evaluations'] != max_evaluations)):
+                raise ValueError('The checkpoint belongs to a different configuration space or number of evaluations!')
+            write_checkpoint(checkpoint_directory, {'seeds': seed, 'start_time': start_time, 'elapsed_s': elapsed_s,
+                                                    'pcs': pcs, 'max_evaluations': max_evaluations})
+        
+        if study is None:
+            study = os.path.basename(os.path.normpath(self.working_directory))
+        
+        # optional settings for the evaluation loop inside every run
+        run_options = {'callbacks': callbacks,
+                       'stop_directory': self.__exec_dir,
+                       'deadline': deadline,
+                       'successive_halving': successive_halving,
+                       'evaluation_memory': None if (self.__mem_limit_total_mb is None) or (mem_limit_function_mb is None) else
+                                            (mem_limit_function_mb, self.__mem_limit_total_mb, os.getpid()),
+                       'broker_address': None if evaluation_broker is None else evaluation_broker.address,
+                       'broker_authkey': None if evaluation_broker is None else evaluation_broker.authkey,
+                       'start_time': start_time,
+                       'checkpoint_directory': checkpoint_directory,
+                       'restore_directory': None if previous is None else scenario_dir,
+                       'run_history': None if run_history_db is None else (os.path.abspath(run_history_db), study),
+                       'metrics': None if metrics_server is None else (metrics_server.address, study),
+                       'event_log': None if event_log is None else os.path.abspath(event_log),
+                       'early_stopping': early_stopping,
+                       'smac_command': None if backend != 'fake' else fake_smac_command(self.smac_options.get('fake_replay_directory')),
+                       'transcript_directory': None}
+        if self.smac_options.get('transcript_directory') is not None:
+            run_options['transcript_directory'] = os.path.abspath(self.smac_options['transcript_directory'])
+            if not os.path.isdir(run_options['transcript_directory']):
+                os.makedirs(run_options['transcript_directory'])
+        
+        class_path = None if backend == 'fake' else smac_classpath()
+        def make_arguments(s, cpus):
+            options = dict(run_options, cpus=cpus)
+            return([scenario_fn, additional_options_fn, s, func, parser_dict, self.__mem_limit_smac_mb, class_path,  num_train_instances, mem_limit_function_mb, t_limit_function_s, self.smac_options['algo-deterministic'], java_executable, timeout_quality, options])
+        
+        memory_budget = None
+        if self.__mem_limit_total_mb is not None:
+            memory_budget = MemoryBudget(self.__mem_limit_total_mb, self.__mem_limit_smac_mb, mem_limit_function_mb)
+        
+        # create the workers and make'em work
+        scheduler = RunScheduler(num_procs, scenario_dir, self.__exec_dir,
+                                 racing=racing, racing_threshold=racing_threshold,
+                                 racing_grace_period_s=racing_grace_period_s,
+                                 racing_max_new_runs=racing_max_new_runs,
+                                 deadline=deadline, memory_budget=memory_budget,
+                                 cpu_allocator=CPUAllocator(num_procs) if cpu_allocation else None,
+                                 executor=executor)
+        # runs that finished before the interruption are not started again
+        finished_seeds = [] if previous is None else previous['finished_seeds']
+        unfinished_seeds = [s for s in seed if s not in finished_seeds]
+        
+        # collect the timings and results of the runs as they finish (failed runs return None)
+        self.timing_statistics = {'all': TimingStatistics()}
+        self.run_history = RunHistory()
+        # runs that ended before SMAC finished, e.g. stopped by a callback
+        stopped_seeds = set()
+        def collect(s, run_result):
+            self.__logger.debug('SMAC run with seed %i finished.', s)
+            if run_result is not None:
+                stats, history, stopped = run_result
+                if stopped:
+                    stopped_seeds.add(s)
+                self.timing_statistics[s] = stats
+                self.timing_statistics['all'].merge(stats)
+                self.run_history.merge(history)
+        run_statistics = {}
+        if len(unfinished_seeds) > 0:
+            run_statistics = scheduler.run(pysmac.remote_smac.remote_smac_function, make_arguments,
+                                           unfinished_seeds, max(seed) + 1, on_finished=collect)
+        
+        # runs with fresh seeds might have been started while racing
+        seed = sorted(set(run_statistics.keys()) | set(finished_seeds))
+        
+        # find overall incumbent and return it
+        run_incumbents = {}
+        
+        for s in seed:
+            fn = os.path.join(scenario_dir, 'traj-run-%i.txt'%s)
+            # runs stopped early might not have written a trajectory
+            if (s in stopped_seeds or s in scheduler.stopped_runs or deadline is not None) and not os.path.exists(fn):
+                continue
+            run_incumbents[s] = read_trajectory_file(fn)[-1]
+        
+        if len(run_incumbents) == 0:
+            raise RuntimeError('No SMAC run found an incumbent within the time budget!')
+        
+        if shared_model:
+            self.shared_model_statistics = self.__shared_model_statistics(scenario_dir, run_incumbents)
+
+        if parallel_validation:
+            self.validation_results = self.__validate(func, scenario_dir, sorted(run_incumbents.keys()), parser_dict,
+                                                      num_train_instances, int(num_test_instances), deterministic,
+                                                      num_procs, mem_limit_function_mb, t_limit_function_s,
+                                                      timeout_quality, seed)
+
+        incumbent = min(list(run_incumbents.values()), key = operator.itemgetter("Estimated Training Performance"))
+
+        return( incumbent["Estimated Training Performance"], incumbent['Configuration'])
+
+    def minimize_batched(self, func, max_evaluations, parameter_dict,
+            conditional_clauses = [], forbidden_clauses=[],
+            deterministic = True,
+            num_train_instances = None, train_instance_features = None,
+            num_runs = 8, seed = 0, max_batch_wait_s = 0.1):
+        """
+        Minimizes a vectorized function that evaluates many configurations in one call.
+        
+        For very cheap functions, the overhead of a separate call (and
+        process) per configuration dominates the runtime. Here, num_runs
+        SMAC runs are started, their proposals are collected into a batch
+        and evaluated with a single call of func in the main process. The
+        other arguments have the same meaning as for :py:meth:`minimize`.
+        
+        :param func: the batched function. It receives one NumPy array per parameter (and the arguments 'instance' and 'seed' like in minimize) with one entry per configuration, and returns a sequence with one function value per configuration. NaN marks a crashed evaluation. Inactive conditional parameters are None in an array of dtype object.
+        :type func: callable
+        :param max_evaluations: number of function evaluations for every SMAC run.
+        :type max_evaluations: int
+        :param num_runs: number of SMAC runs, and therefore the maximum batch size.
+        :type num_runs: int
+        :param max_batch_wait_s: how long (in seconds) to wait for more proposals once a batch contains a configuration.
+        :type max_batch_wait_s: float
+        :returns: tuple -- (lowest function value found, corresponding configuration as a dict)
+        """
+        from .utils.batching import configurations_to_columns, split_results
+        
+        # checked here, so the error names this method
+        self.__smac_command('minimize_batched')
+        session = self.ask_tell_session(max_evaluations, parameter_dict,
+                                        conditional_clauses, forbidden_clauses,
+                                        deterministic, num_train_instances, train_instance_features,
+                                        num_slots=num_runs, seed=seed)
+        with session:
+            while not session.finished:
+                # block for the first configuration, then collect the
+                # proposals of the other runs that arrive shortly after
+                batch = []
+                config = session.ask()
+                while config is not None:
+                    batch.append(config)
+                    config = session.ask(timeout_s=max_batch_wait_s)
+                if len(batch) == 0:
+                    continue
+                
+                start = time.time()
+                results = split_results(func(**configurations_to_columns(batch)), len(batch))
+                runtime = (time.time() - start)/len(batch)
+                self.__logger.debug('Evaluated a batch of %i configurations in %f seconds', len(batch), runtime*len(batch))
+                for config, result in zip(batch, results):
+                    session.tell(config, result, runtime)
+            return(session.close())
+
+    def minimize_async(self, func, max_evaluations, parameter_dict,
+            conditional_clauses = [], forbidden_clauses=[],
+            deterministic = True,
+            num_train_instances = None, train_instance_features = None,
+            num_runs = 1, max_concurrency = None, seed = 0, t_limit_function_s = None):
+        """
+        Asynchronous counterpart of :py:meth:`minimize` for coroutine functions (Python 3.5 or newer).
+        
+        The scenario is written immediately, and the returned coroutine
+        runs all SMAC runs on the current event loop, see
+        :py:mod:`pysmac.asynchronous`. The arguments have the same meaning
+        as for minimize.
+        
+        :param func: the coroutine function to be minimized. Plain functions are called directly in the event loop.
+        :type func: coroutine function
+        :param num_runs: number of SMAC runs executed concurrently. Every run has at most one evaluation in flight.
+        :type num_runs: int
+        :param max_concurrency: maximum number of evaluations awaited at the same time. None means num_runs.
+        :type max_concurrency: int
+        :param t_limit_function_s: wall clock timeout for a single evaluation. ``None`` means no restriction.
+        :type t_limit_function_s: float
+        :returns: coroutine -- which returns the tuple (lowest function value found, corresponding configuration as a dict)
+        """
+        if sys.version_info < (3, 5):
+            raise RuntimeError('minimize_async requires Python 3.5 or newer!')
+        from .asynchronous import minimize_coroutine
+        
+        class_path, smac_command = self.__smac_command('minimize_async')
+        seed = self.__seed_list(seed, int(num_runs))
+        max_concurrency = len(seed) if max_concurrency is None else int(max_concurrency)
+        if max_concurrency < 1:
+            raise ValueError('The maximum concurrency has to be positive!')
+        num_train_instances = None if (num_train_instances is None) else int(num_train_instances)
+        scenario_fn, additional_options_fn, parser_dict, java_executable, timeout_quality, scenario_dir =\
+            self.__write_scenario(max_evaluations, parameter_dict, conditional_clauses, forbidden_clauses,
+                                  deterministic, num_train_instances, None,
+                                  train_instance_features, t_limit_function_s)
+        
+        return(minimize_coroutine(func, seed, max_concurrency, scenario_fn, additional_options_fn,
+                                  parser_dict, class_path, self.__mem_limit_smac_mb, java_executable,
+                                  timeout_quality, num_train_instances, deterministic, t_limit_function_s,
+                                  scenario_dir, None if self.__t_limit_total_s == 0 else self.__t_limit_total_s,
+                                  smac_command))
+
+    def ask_tell_session(self, max_evaluations, parameter_dict,
+            conditional_clauses = [], forbidden_clauses=[],
+            deterministic = True,
+            num_train_instances = None, train_instance_features = None,
+            num_slots = 1, seed = 0, t_limit_function_s = None):
+        """
+        Starts SMAC without a function, so the user can evaluate the configurations.
+        
+        Instead of calling a function, SMAC's proposals are obtained with
+        the session's method ask, and the results are reported with tell.
+        See :py:mod:`pysmac.ask_tell`. The arguments have the same meaning
+        as for :py:meth:`minimize`.
+        
+        :param max_evaluations: number of function evaluations for every slot.
+        :type max_evaluations: int
+        :param num_slots: number of SMAC runs (each with its own seed) started in parallel. Each of them can have one configuration without a result at a time.
+        :type num_slots: int
+        :param seed: seed for the first slot, the others use consecutive numbers. If list, it specifies a seed for every slot.
+        :type seed: int/list of ints
+        :returns: :py:class:`pysmac.ask_tell.AskTellSession` -- the started session
+        """
+        class_path, smac_command = self.__smac_command('ask_tell_session')
+        seed = self.__seed_list(seed, int(num_slots))
+        num_train_instances = None if (num_train_instances is None) else int(num_train_instances)
+        scenario_fn, additional_options_fn, parser_dict, java_executable, timeout_quality, scenario_dir =\
+            self.__write_scenario(max_evaluations, parameter_dict, conditional_clauses, forbidden_clauses,
+                                  deterministic, num_train_instances, None,
+                                  train_instance_features, t_limit_function_s)
+        
+        session = AskTellSession(scenario_fn, additional_options_fn, seed, parser_dict,
+                                 class_path, self.__mem_limit_smac_mb, java_executable,
+                                 timeout_quality, num_train_instances, deterministic, scenario_dir,
+                                 None if self.__t_limit_total_s == 0 else self.__t_limit_total_s,
+                                 smac_command)
+        return(session.start())
+
+    def __smac_command(self, method_name):
+        """
+        How the SMAC runs are started for the backend in smac_options, for the methods without a numpy backend.
+        
+        :returns: tuple -- (SMAC's class path, the command replacing SMAC or None)
+        """
+        backend = self.smac_options.get('backend', 'smac')
+        if backend == 'smac':
+            return(smac_classpath(), None)
+        if backend == 'fake':
+            return(None, fake_smac_command(self.smac_options.get('fake_replay_directory')))
+        raise ValueError('{} does not support the backend {}!'.format(method_name, backend))
+
+    def __minimize_numpy(self, func, max_evaluations, parameter_dict, conditional_clauses,
+                         forbidden_clauses, deterministic, seeds, mem_limit_function_mb,
+                         t_limit_function_s, callbacks, deadline):
+        """
+        Runs minimize with the numpy backend, see :py:mod:`pysmac.numpy_backend`.
+        
+        The runs are executed one after another in this process.
+        """
+        from .numpy_backend import SearchSpace, numpy_minimize
+        
+        # checks the parameter definitions just like for SMAC
+        pysmac.remote_smac.process_parameter_definitions(parameter_dict)
+        space = SearchSpace(parameter_dict, conditional_clauses, forbidden_clauses)
+        
+        self.timing_statistics = {'all': TimingStatistics()}
+        self.run_history = RunHistory()
+        run_incumbents = {}
+        for s in seeds:
+            value, config, stats = numpy_minimize(func, max_evaluations, space, s, deterministic,
+                                                  mem_limit_function_mb, t_limit_function_s,
+                                                  self.smac_options['timeout_quality'], callbacks, deadline,
+                                                  history=self.run_history)
+            self.timing_statistics[s] = stats
+            self.timing_statistics['all'].merge(stats)
+            if value is not None:
+                run_incumbents[s] = (value, config)
+        
+        if len(run_incumbents) == 0:
+            raise RuntimeError('No run found an incumbent within the time budget!')
+        return(min(list(run_incumbents.values()), key = operator.itemgetter(0)))
+
+    def __validate(self, func, scenario_dir, seeds, parser_dict, num_train_instances, num_test_instances,
+                   deterministic, num_procs, mem_limit_function_mb, t_limit_function_s, timeout_quality,
+                   run_seeds):
+        """
+        Evaluates the final incumbents of all runs on all test instances, see :py:mod:`pysmac.utils.validation`.
+        
+        Runs with the same final incumbent share its evaluations.
+        """
+        from .utils.validation import final_incumbents, unique_configurations, validate, write_validation_matrix
+        
+        configurations, run_configurations = unique_configurations(final_incumbents(scenario_dir, seeds, parser_dict))
+        first = 1 if num_train_instances is None else num_train_instances
+        instances = list(range(first, first + num_test_instances))
+        # the same seed on an instance for all configurations makes them comparable
+        instance_seeds = None
+        if not deterministic:
+            rng = random.Random(min(run_seeds))
+            instance_seeds = [rng.randint(0, 2**31 - 1) for i in instances]
+        
+        self.__logger.debug('Validating %i configurations of %i runs on %i instances', len(configurations), len(seeds), len(instances))
+        values, statuses = validate(func, configurations, instances, num_procs, instance_seeds,
+                                    mem_limit_function_mb, t_limit_function_s, timeout_quality)
+        write_validation_matrix(os.path.join(scenario_dir, 'validationObjectiveMatrix-pysmac.csv'),
+                                instances, instance_seeds, values)
+        return({'instances': instances, 'seeds': instance_seeds, 'configurations': configurations,
+                'values': values, 'statuses': statuses, 'run_configurations': run_configurations})
+
+    def __seed_list(self, seed, num_runs):
+        """
+        Converts the seed argument into a list with one seed for every run.
+        """
+        if isinstance(seed, int):
+            return(list(range(seed, seed+num_runs)))
+        elif isinstance(seed, list) or isinstance(seed, tuple):
+            if len(seed) != num_runs:
+                raise ValueError("You have to specify a seed for every run!")
+            return(list(seed))
+        raise ValueError("The seed variable could not be properly processed!")
+
+    def __write_scenario(self, max_evaluations, parameter_dict, conditional_clauses,
+                          forbidden_clauses, deterministic, num_train_instances,
+                          num_test_instances, train_instance_features, t_limit_function_s,
+                          extra_options=None):
+        """
+        Writes all files SMAC needs to start into the working directory.
+        
+        This part is shared by :py:meth:`minimize`, :py:meth:`minimize_async` and :py:meth:`ask_tell_session`.
+        The arguments have the same meaning as for minimize.
+        
+        :param extra_options: SMAC options for this call only, they overwrite the ones in smac_options
+        :type extra_options: dict
+        :returns: tuple -- (scenario file, file with additional options, parser dict, java executable, timeout quality, SMAC's output directory for this scenario)
+        """
+        self.smac_options['algo-deterministic'] = deterministic
+        
         if (num_train_instances is not None):
             if (num_train_instances < 1):
                 raise ValueError('The number of training instances must be positive!')
@@ -191,27 +748,13 @@ class SMAC_optimizer(object):
                     if (len(train_instance_features) != nf):
                         raise ValueError("You have to specify the same number of features for every instance!")
                 self.smac_options['feature_file'] = os.path.join(self.working_directory ,'instances.dat')
-                
 
-
-        num_procs = int(num_procs)
         pcs_string, parser_dict = pysmac.remote_smac.process_parameter_definitions(parameter_dict)
-
-        # adjust the seed variable
-        if isinstance(seed, int):
-            seed = list(range(seed, seed+num_runs))
-        elif isinstance(seed, list) or isinstance(seed, tuple):
-            if len(seed) != num_runs:
-                raise ValueError("You have to specify a seed for every run!")
-        else:
-            raise ValueError("The seed variable could not be properly processed!")
-        
         
         self.smac_options['runcount-limit'] = max_evaluations
         if t_limit_function_s is not None:
             self.smac_options['cutoff_time'] = t_limit_function_s
         
-        
         # create and fill the pcs file
         with open(self.smac_options['pcs-file'], 'w') as fh:
             fh.write("\n".join(pcs_string + conditional_clauses + forbidden_clauses))
@@ -247,14 +790,21 @@ class SMAC_optimizer(object):
                     fh.write("id_%i\n"%i)
 
         # make sure the java executable is callable and up-to-date
-        java_executable = self.smac_options.pop('java_executable')
-        check_java_version(java_executable)
+        # the options that are not meant for SMAC are removed from a copy,
+        # so the settings are still present for the next call
+        smac_options = dict(self.smac_options)
+        smac_options.update(extra_options or {})
+        java_executable = smac_options.pop('java_executable')
+        if smac_options.get('backend') != 'fake':
+            check_java_version(java_executable)
 
-        timeout_quality = self.smac_options.pop('timeout_quality')
+        timeout_quality = smac_options.pop('timeout_quality')
+        for name in ['backend', 'fake_replay_directory', 'transcript_directory']:
+            smac_options.pop(name, None)
 
 
         # create and fill the scenario file
-        scenario_fn = os.path.join(self.working_directory,self.smac_options.pop('scenario_fn'))
+        scenario_fn = os.path.join(self.working_directory,smac_options.pop('scenario_fn'))
 
         
         scenario_options = {'algo', 'algo-exec', 'algoExec',
@@ -274,7 +824,7 @@ class SMAC_optimizer(object):
         
         additional_options_fn =scenario_fn[:-4]+'.advanced' 
         with open(scenario_fn,'w') as fh, open(additional_options_fn, 'w') as fg:
-            for name, value in list(self.smac_options.items()):
+            for name, value in list(smac_options.items()):
                 if name in scenario_options:
                     fh.write('%s %s\n'%(name, value))
                 else:
@@ -283,25 +833,34 @@ class SMAC_optimizer(object):
         # check that all files are actually present, so SMAC has everything to start
         assert all(map(os.path.exists, [additional_options_fn, scenario_fn, self.smac_options['pcs-file'], self.smac_options['instances']])), "Something went wrong creating files for SMAC! Try to specify a \'working_directory\' and set \'persistent_files=True\'."
 
-        # create a pool of workers and make'em work
-        pool = MyPool(num_procs)
-        argument_lists = [[scenario_fn, additional_options_fn, s, func, parser_dict, self.__mem_limit_smac_mb, smac_classpath(),  num_train_instances, mem_limit_function_mb, t_limit_function_s, self.smac_options['algo-deterministic'], java_executable, timeout_quality] for s in seed]
-        
-        pool.map(pysmac.remote_smac.remote_smac_function, argument_lists)
-        
-        pool.close()
-        pool.join()
-        
-        # find overall incumbent and return it
-        
         scenario_dir = os.path.join(self.__out_dir,'.'.join(scenario_fn.split('/')[-1].split('.')[:-1]))
         
-        run_incumbents = []
-        
-        for s in seed:
-            fn = os.path.join(scenario_dir, 'traj-run-%i.txt'%s)
-            run_incumbents.append(read_trajectory_file(fn)[-1])
+        return(scenario_fn, additional_options_fn, parser_dict, java_executable, timeout_quality, scenario_dir)
 
-        run_incumbents.sort(key = operator.itemgetter("Estimated Training Performance"))
-
-        return( run_incumbents[0]["Estimated Training Performance"], run_incumbents[0]['Configuration'])
+    def __shared_model_statistics(self, scenario_dir, run_incumbents):
+        """
+        Computes how much data every run could use from the other runs in shared model mode, and how fast it progressed.
+        """
+        own_evaluations = {}
+        trajectories = {}
+        for s in run_incumbents:
+            fn = os.path.join(scenario_dir, 'live-rundata-%i.json'%s)
+            own_evaluations[s] = len(read_live_rundata_file(fn)[1]) if os.path.exists(fn) else 0
+            trajectories[s] = read_trajectory_file(os.path.join(scenario_dir, 'traj-run-%i.txt'%s))
+        
+        # the best final incumbent of all runs
+        best = min([i["Estimated Training Performance"] for i in run_incumbents.values()])
+        tolerance = 1e-10 * max(abs(best), 1.)
+        
+        total = sum(own_evaluations.values())
+        statistics = {}
+        for s, incumbent in list(run_incumbents.items()):
+            shared = total - own_evaluations[s]
+            reached = [e['Wallclock Time'] for e in trajectories[s] if e['Estimated Training Performance'] <= best + tolerance]
+            statistics[s] = {'own_evaluations': own_evaluations[s],
+                             'shared_evaluations': shared,
+                             'shared_fraction': shared/total if total > 0 else 0.,
+                             'incumbent_value': incumbent["Estimated Training Performance"],
+                             'incumbent_time': incumbent['Wallclock Time'],
+                             'time_to_best': reached[0] if len(reached) > 0 else None}
+        return(statistics)
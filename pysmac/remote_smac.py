@@ -3,10 +3,9 @@ from __future__ import print_function, division, absolute_import
 import sys
 import os
 import traceback
+import json
 import socket
 import subprocess
-import resource
-from pkg_resources import resource_filename
 from math import ceil
 
 import logging
@@ -14,8 +13,16 @@ import multiprocessing
 
 import time
 
-import pynisher
-
+from pysmac.utils.timing_statistics import TimingStatistics, timed_function
+from pysmac.utils.run_history import RunHistory
+from pysmac.utils.early_stopping import LearningCurves
+from pysmac.utils.resource_accounting import child_usage
+from pysmac.utils.memory_budget import wait_for_memory
+from pysmac.utils.cpu_allocation import pin_to_cpus, jvm_thread_options
+from pysmac.utils.callbacks import call_hooks
+from pysmac.utils.run_scheduler import stop_file_name
+from pysmac.utils.successive_halving import SuccessiveHalving
+from pysmac.utils.checkpoint import EvaluationCache, evaluation_cache_filename, finished_marker_filename
 
 
 
@@ -118,13 +125,27 @@ class remote_smac(object):
     The default value for a timeout for the socket
     """
     
-    def __init__(self, scenario_fn, additional_options_fn, seed, class_path, memory_limit, parser_dict, java_executable):
+    def __init__(self, scenario_fn, additional_options_fn, seed, class_path, memory_limit, parser_dict, java_executable, wallclock_limit=None, num_cpus=None, extra_arguments=None, smac_command=None, transcript_fn=None):
         """
         Starts SMAC in IPC mode. SMAC will wait for udp messages to be sent.
+        
+        The optional wallclock_limit (in seconds) overwrites the one in the
+        scenario file, so every run only gets the part of the total budget
+        that is left when it starts. If num_cpus is given, the JVM's garbage
+        collector and compiler threads are sized accordingly. The list
+        extra_arguments is appended to SMAC's command line.
+        
+        The list smac_command replaces the command starting SMAC's JVM
+        (e.g. by :py:func:`pysmac.utils.fake_smac.command`). If transcript_fn
+        is given, every message and answer is recorded in this file.
         """
         self.__parser = parser_dict
         self.__subprocess = None
+        self.think_time = None
+        self.parse_time = None
         self.__logger = multiprocessing.get_logger()
+        self.__transcript = None if transcript_fn is None else open(transcript_fn, 'w')
+        self.__last_message = None
         
         # establish a socket
         self.__sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -134,29 +155,36 @@ class remote_smac(object):
         self.__sock.listen(1)
         
         self.__port = self.__sock.getsockname()[1]
-        self.__logger.debug('picked port %i'%self.__port)
+        self.__logger.debug('picked port %i', self.__port)
 
         # build the java command
-        cmds  = java_executable.split()
-        if memory_limit is not None:
-            cmds += ["-Xmx%im"%memory_limit]
-        cmds +=    ["-XX:ParallelGCThreads=4",
-                "-cp",
-                class_path,
-                "ca.ubc.cs.beta.smac.executors.SMACExecutor",
-                "--scenario-file", scenario_fn,
+        if smac_command is None:
+            cmds  = java_executable.split()
+            if memory_limit is not None:
+                cmds += ["-Xmx%im"%memory_limit]
+            cmds += ["-XX:ParallelGCThreads=4"] if num_cpus is None else jvm_thread_options(num_cpus)
+            cmds += ["-cp",
+                    class_path,
+                    "ca.ubc.cs.beta.smac.executors.SMACExecutor"]
+        else:
+            cmds = list(smac_command)
+        cmds +=    ["--scenario-file", scenario_fn,
                 "--tae", "IPC",
                 "--ipc-mechanism", "TCP",
                 "--ipc-remote-port", str(self.__port),
                 "--seed", str(seed)
                 ]
+        if wallclock_limit is not None:
+            cmds += ["--wallclock-limit", str(max(1, int(wallclock_limit)))]
         
         with open(additional_options_fn, 'r') as fh:
             for line in fh:
                 name, value = line.strip().split(' ')
                 cmds += ['--%s'%name, '%s'%value]
+        if extra_arguments is not None:
+            cmds += extra_arguments
         
-        self.__logger.debug("SMAC command: %s"%(' '.join(cmds)))
+        self.__logger.debug("SMAC command: %s", ' '.join(cmds))
         
         self.__logger.debug("Starting SMAC in ICP mode")
         
@@ -178,6 +206,43 @@ class remote_smac(object):
             else:    
                 self.__logger.debug('SMAC terminated with returncode %i', self.__subprocess.returncode)
 
+    def stop(self, grace_period_s=5):
+        """ Terminates the SMAC process before its budget is exhausted.
+        
+        SMAC receives a SIGTERM first, so it can write its output files.
+        If it is still alive after the grace period, it is killed.
+        
+        :param grace_period_s: time (in seconds) SMAC has to shut down
+        :type grace_period_s: float
+        """
+        if (self.__subprocess is None) or (self.__subprocess.poll() is not None):
+            return
+        self.__subprocess.terminate()
+        deadline = time.time() + grace_period_s
+        while (self.__subprocess.poll() is None) and (time.time() < deadline):
+            time.sleep(0.05)
+        if self.__subprocess.poll() is None:
+            self.__subprocess.kill()
+            self.__subprocess.wait()
+        self.__logger.debug('SMAC was stopped')
+
+
+    def fileno(self):
+        """ The file descriptor of the listening socket.
+        
+        It becomes readable as soon as SMAC connects to send the next
+        configuration, so several SMAC instances can be watched with select.
+        """
+        return(self.__sock.fileno())
+
+    @property
+    def listening_socket(self):
+        """ The socket SMAC connects to for every configuration (e.g. for asynchronous I/O)."""
+        return(self.__sock)
+
+    def is_alive(self):
+        """ :returns: bool -- whether the SMAC process is still running"""
+        return((self.__subprocess is not None) and (self.__subprocess.poll() is None))
 
     def next_configuration(self):
         """ Method that queries the next configuration from SMAC.
@@ -186,8 +251,12 @@ class remote_smac(object):
         converts into a proper Python representation (using the proper
         types). It also checks whether the SMAC subprocess is still alive.
         
+        The time spend waiting for SMAC and parsing its message are stored
+        in the attributes think_time and parse_time, respectively.
+        
         :returns: either a dictionary with a configuration, or None if SMAC has terminated 
         """
+        start = time.time()
         while True:
             try:
                 self.__logger.debug('trying to retrieve the next configuration from SMAC')
@@ -209,7 +278,21 @@ class remote_smac(object):
             except:
                 raise
 
-        self.__logger.debug("SMAC message: %s"%config_str)
+        parse_start = time.time()
+        self.think_time = parse_start - start
+        self.__last_message = config_str
+        config_dict = self.parse_configuration(config_str)
+        self.parse_time = time.time() - parse_start
+        return (config_dict)
+    
+    def parse_configuration(self, config_str):
+        """ Converts a message from SMAC into a configuration with the proper types.
+        
+        :param config_str: the line SMAC sent
+        :type config_str: str
+        :returns: dict -- the configuration including the keys 'instance', 'instance_info', 'cutoff_time', 'cutoff_length' and 'seed'
+        """
+        self.__logger.debug("SMAC message: %s", config_str)
         
         los = config_str.replace('\'','').split() # name is shorthand for 'list of strings'
         config_dict={}
@@ -225,9 +308,21 @@ class remote_smac(object):
         for i in range(5, len(los), 2):
             config_dict[ los[i][1:] ] = self.__parser[ los[i][1:] ]( los[i+1])
         
-        self.__logger.debug("Our interpretation: %s"%config_dict)
+        self.__logger.debug("Our interpretation: %s", config_dict)
         return (config_dict)
     
+    def format_result(self, result_dict):
+        """ Converts a result into the message SMAC expects.
+        
+        :param result_dict: dictionary with the keys 'value', 'status' (a str, see :py:func:`make_result_dict`), and 'runtime'.
+        :type result_dict: dict
+        :returns: bytes -- the encoded message
+        """
+        s = 'Result for SMAC: {0[status]}, {0[runtime]}, 0, {0[value]}, 0\
+            '.format(result_dict)
+        self.__logger.debug(s)
+        return(s.encode())
+    
     def report_result(self, result_dict):
         """Method to report the latest run results back to SMAC.
         
@@ -236,15 +331,142 @@ class remote_smac(object):
         :param result_dict: dictionary with the keys 'value', 'status', and 'runtime'.
         :type result_dic: dict
         """
+        message = self.format_result(result_dict)
+        self.__conn.sendall(message)
+        self.__conn.close();
+        if self.__transcript is not None:
+            self.__transcript.write(json.dumps({'message': self.__last_message.strip(), 'result': message.decode().strip()}) + '\n')
+    
+    def close_transcript(self):
+        """ Writes the recorded messages to disk."""
+        if self.__transcript is not None:
+            self.__transcript.close()
+            self.__transcript = None
+
+
 
-        # for propper printing, we have to convert the status into unicode
+def make_result_dict(result, runtime, timeout_quality, t_limit=None, wall_time=None):
+    """
+    Converts what the user reports for a configuration into the result for SMAC.
+    
+    An evaluation timed out if its runtime reached the CPU time limit, or
+    if it took ten times as long in wall clock time (the wall clock limit
+    pynisher enforces).
+    
+    :param result: the function value, or a dict with (some of) the keys 'value', 'status' and 'runtime' (further keys like 'stopped' for evaluations stopped early are passed on). None means the evaluation crashed.
+    :type result: float/dict
+    :param runtime: the time the evaluation took, unless the result contains it
+    :type runtime: float
+    :param timeout_quality: the value reported for crashes and timeouts
+    :type timeout_quality: float
+    :param t_limit: the CPU time limit of the evaluation in seconds (None means unlimited)
+    :type t_limit: float
+    :param wall_time: the wall clock time the evaluation took (None if unknown)
+    :type wall_time: float
+    :returns: dict -- with the keys 'value', 'status' and 'runtime'. The status is always a str ('SAT', 'UNSAT', 'TIMEOUT', 'CRASHED' or 'ABORT'), even if the function returned it as bytes, and every consumer of the result (callbacks, run history, event log, ...) relies on that.
+    """
+    result_dict = {'value': timeout_quality,
+                   'status': 'CRASHED' if result is None else 'SAT',
+                   'runtime': runtime}
+    if result is not None:
+        if isinstance(result, dict):
+            result_dict.update(result)
+        else:
+            result_dict['value'] = result
+    if isinstance(result_dict['status'], bytes):
         result_dict['status'] = result_dict['status'].decode()
-        s = 'Result for SMAC: {0[status]}, {0[runtime]}, 0, {0[value]}, 0\
-            '.format(result_dict)
-        self.__logger.debug(s)
-        self.__conn.sendall(s.encode())
-        self.__conn.close();
 
+    # account for timeouts
+    if t_limit is not None:
+        if (result_dict['runtime'] > t_limit - 2e-2) or ((wall_time is not None) and (wall_time >= 10*t_limit)):
+            result_dict['status'] = 'TIMEOUT'
+
+    # set returned quality to default in case of a timeout
+    if (result_dict['status'] == 'TIMEOUT') and (timeout_quality is not None):
+        result_dict['value'] = timeout_quality
+    return(result_dict)
+
+
+def evaluate_with_limits(function, config_dict, mem_limit_function, t_limit, wall_time_limit):
+    """
+    Evaluates the function in a subprocess while pynisher enforces the limits.
+    
+    This is the part of the evaluation loop that is independent of SMAC,
+    so it can be executed locally or by a remote worker
+    (see :py:mod:`pysmac.distributed`).
+    
+    :param function: the function to be evaluated
+    :type function: callable
+    :param config_dict: the arguments for the function
+    :type config_dict: dict
+    :param mem_limit_function: memory limit in MB (None means unlimited)
+    :type mem_limit_function: int
+    :param t_limit: CPU time limit in seconds (None means unlimited)
+    :type t_limit: int
+    :param wall_time_limit: wall clock time limit in seconds (None means unlimited)
+    :type wall_time_limit: int
+    :returns: dict -- with the keys 'result' (None if the function crashed or timed out), 'wall_time' (including the subprocess creation), 'function_cpu_time' (user + system time of the subprocess), 'spawn_time', 'function_wall_time' and 'peak_rss_mb' (the latter three are None if unknown)
+    """
+    # pynisher is imported on first use to keep 'import pysmac' fast
+    import pynisher
+    
+    logger = multiprocessing.get_logger()
+    
+    wrapped_function = pynisher.enforce_limits(
+        mem_in_mb=mem_limit_function,
+        cpu_time_in_s=t_limit,
+        wall_time_in_s=wall_time_limit,
+        grace_period_in_s = 1)(timed_function(function))
+
+    evaluation = {'result': None, 'wall_time': 0.,
+                  'spawn_time': None, 'function_wall_time': None,
+                  'function_cpu_time': 0., 'peak_rss_mb': None}
+
+    # workaround for the 'Resource temporarily not available' error on
+    # the BaWue cluster if to many processes were spawned in a short
+    # period. It now waits a second and tries again for 8 times.
+    num_try = 1
+    while num_try <= 8:
+        try:
+            usage = child_usage()
+            start = time.time()
+            res = wrapped_function(**config_dict)
+            evaluation['wall_time'] = time.time()-start
+            usage.stop()
+            evaluation['function_cpu_time'] = usage.cpu_time()
+            evaluation['peak_rss_mb'] = usage.peak_rss_mb()
+            break
+        except OSError as e:
+            if e.errno == 11:
+                logger.warning('Resource temporarily not available. Trail {} of 8'.format(num_try))
+                time.sleep(1)
+            else:
+                raise
+        except:
+            raise
+        finally:
+            num_try += 1
+    if num_try == 9:
+        logger.warning('Configuration {} crashed 8 times, giving up on it.'.format(config_dict))
+        res = None
+    
+    # the timed_function wrapper returns the start and end time of the
+    # actual function call, and the peak memory and CPU time of the
+    # subprocess. The latter replaces the difference of the counters,
+    # which also contains evaluations of other runs in threads of this
+    # process. Only evaluations that were killed are left with it.
+    if res is not None:
+        function_start, evaluation['result'], function_end, evaluation['peak_rss_mb'], evaluation['function_cpu_time'] = res
+        evaluation['spawn_time'] = function_start - start
+        evaluation['function_wall_time'] = function_end - function_start
+    return(evaluation)
+
+
+def add_to_history(history, config_dict, result_dict, run_seed):
+    """ Adds an evaluation (with the arguments 'instance', 'seed' and 'budget' if present) to a RunHistory."""
+    configuration = dict([(k, v) for k, v in list(config_dict.items()) if k not in ('instance', 'seed', 'budget')])
+    history.add(configuration, result_dict, config_dict.get('instance', 0), config_dict.get('seed', 0),
+                config_dict.get('budget', float('nan')), run_seed)
 
 
 def remote_smac_function(only_arg):
@@ -258,20 +480,114 @@ def remote_smac_function(only_arg):
     list containing important arguments in a very specific order. Check
     the source code if you want to learn more.
     
+    :returns: tuple -- (TimingStatistics with the timings, RunHistory with the results of every evaluation in this run, whether the run was stopped before SMAC finished), or None if the run failed
     """
     try:
         scenario_file, additional_options_fn, seed, function, parser_dict,\
           memory_limit_smac_mb, class_path, num_instances, mem_limit_function,\
-          t_limit_function, deterministic, java_executable, timeout_quality = only_arg
+          t_limit_function, deterministic, java_executable, timeout_quality,\
+          run_options = only_arg
     
         logger = multiprocessing.get_logger()
+        
+        callbacks = run_options.get('callbacks') or []
+        
+        # pin this run (SMAC and the function evaluations) to its CPUs
+        cpus = run_options.get('cpus')
+        if cpus is not None:
+            pin_to_cpus(cpus)
+        
+        successive_halving = None
+        if run_options.get('successive_halving') is not None:
+            successive_halving = SuccessiveHalving(*run_options['successive_halving'])
+        
+        # the global deadline (as time.time()) for all runs
+        deadline = run_options.get('deadline')
+        wallclock_limit = None
+        if deadline is not None:
+            wallclock_limit = deadline - time.time()
+            if wallclock_limit < 1:
+                logger.debug('No time left to start the run with seed %i', seed)
+                return(TimingStatistics(), RunHistory(), True)
+        
+        # the scheduler can ask this run to stop by creating this file
+        stop_file = None
+        if run_options.get('stop_directory') is not None:
+            stop_file = stop_file_name(run_options['stop_directory'], seed)
+        
+        # evaluate the function on remote workers if a broker is used
+        broker_client = None
+        if run_options.get('broker_address') is not None:
+            from pysmac.distributed import BrokerClient
+            broker_client = BrokerClient(run_options['broker_address'], run_options['broker_authkey'])
+        
+        # replay the evaluations recorded before an interruption, and record the new ones
+        evaluation_cache = None
+        checkpoint_directory = run_options.get('checkpoint_directory')
+        if checkpoint_directory is not None:
+            evaluation_cache = EvaluationCache(evaluation_cache_filename(checkpoint_directory, seed))
+            if successive_halving is not None:
+                for rung, result in evaluation_cache.rung_results():
+                    successive_halving.promote(rung, result)
+        
+        # record all evaluations in the run history database
+        run_history = None
+        if run_options.get('run_history') is not None:
+            from pysmac.utils.run_history_db import RunHistoryWriter
+            run_history = RunHistoryWriter(run_options['run_history'][0], run_options['run_history'][1], seed)
+        
+        # structured record of every evaluation
+        event_log = None
+        if run_options.get('event_log') is not None:
+            from pysmac.utils.event_log import EventLogWriter
+            event_log = EventLogWriter(run_options['event_log'], seed)
+        
+        # the function reports intermediate values and can be stopped early
+        learning_curves = None
+        if run_options.get('early_stopping') is not None:
+            learning_curves = LearningCurves(run_options['early_stopping'])
+        
+        # continue from SMAC's own saved state if it exists
+        extra_arguments = None
+        if run_options.get('restore_directory') is not None:
+            state_dir = os.path.join(run_options['restore_directory'], 'state-run%i'%seed)
+            if os.path.isdir(state_dir):
+                extra_arguments = ['--restore-state-from', state_dir, '--restore-iteration', 'AUTO']
+        
+        incumbent_value = None
     
+        # the messages of this run are recorded to replay them later
+        transcript_fn = None
+        if run_options.get('transcript_directory') is not None:
+            from pysmac.utils.fake_smac import transcript_filename
+            transcript_fn = transcript_filename(run_options['transcript_directory'], seed)
+        
         smac = remote_smac(scenario_file, additional_options_fn, seed, 
-                               class_path, memory_limit_smac_mb,parser_dict, java_executable)
+                               class_path, memory_limit_smac_mb,parser_dict, java_executable, wallclock_limit,
+                               None if cpus is None else len(cpus), extra_arguments,
+                               run_options.get('smac_command'), transcript_fn)
     
         logger.debug('Started SMAC subprocess')
+        
+        # live metrics for a MetricsServer
+        metrics = None
+        if run_options.get('metrics') is not None:
+            from pysmac.metrics import MetricsReporter
+            metrics = MetricsReporter(run_options['metrics'][0], run_options['metrics'][1], seed)
+            metrics.send(smac.is_alive())
     
         num_iterations = 0
+        timing_statistics = TimingStatistics()
+        history = RunHistory()
+        finished = False
+        
+        def record(config_dict, result_dict, timings):
+            """ Adds a function evaluation to the run's history, the event log and the database."""
+            add_to_history(history, config_dict, result_dict, seed)
+            if event_log is not None:
+                event_log.add(num_iterations, config_dict, result_dict, timings)
+            if run_history is not None:
+                run_history.add(config_dict, result_dict)
     
         while True:
             config_dict = smac.next_configuration()
@@ -279,6 +595,7 @@ def remote_smac_function(only_arg):
             # method next_configuration checks whether smac is still alive
             # if it is None, it means that SMAC has finished (for whatever reason)
             if config_dict is None:
+                finished = True
                 break
             
             # delete the unused variables from the dict
@@ -291,81 +608,167 @@ def remote_smac_function(only_arg):
                 del config_dict['seed']
         
             current_t_limit = int(ceil(config_dict.pop('cutoff_time')))
+            
+            if callbacks and call_hooks(callbacks, 'before_evaluation', seed, dict(config_dict)):
+                logger.debug('A callback stopped the run before iteration %i', num_iterations)
+                smac.stop()
+                break
+
             # only restrict the runtime if an initial cutoff was defined
             current_t_limit = None if t_limit_function is None else current_t_limit
             current_wall_time_limit =  None if current_t_limit is None else 10*current_t_limit
-
-            # execute the function and measure the time it takes to evaluate
-            wrapped_function = pynisher.enforce_limits(
-                mem_in_mb=mem_limit_function,
-                cpu_time_in_s=current_t_limit,
-                wall_time_in_s=current_wall_time_limit,
-                grace_period_in_s = 1)(function)
-
-            # workaround for the 'Resource temporarily not available' error on
-            # the BaWue cluster if to many processes were spawned in a short
-            # period. It now waits a second and tries again for 8 times.
-            num_try = 1
-            while num_try <= 8:
-                try:
-                    start = time.time()
-                    res = wrapped_function(**config_dict)
-                    wall_time = time.time()-start
-                    cpu_time = resource.getrusage(resource.RUSAGE_CHILDREN).ru_utime
+            
+            # wind down when the total time budget is exhausted, and
+            # make sure no evaluation runs beyond it
+            if deadline is not None:
+                remaining = int(ceil(deadline - time.time()))
+                if remaining < 1:
+                    logger.debug('The total time budget is exhausted, stopping the run with seed %i', seed)
+                    smac.stop()
                     break
-                except OSError as e:
-                    if e.errno == 11:
-                        logger.warning('Resource temporarily not available. Trail {} of 8'.format(num_try))
-                        time.sleep(1)
-                    else:
-                        raise
-                except:
-                    raise
-                finally:
-                    num_try += 1
-            if num_try == 9:
-                logger.warning('Configuration {} crashed 8 times, giving up on it.'.format(config_dict))
-                res = None
+                if (current_wall_time_limit is None) or (remaining < current_wall_time_limit):
+                    current_wall_time_limit = remaining
             
-            if res is not None:
-                try:
-                    logger.debug('iteration %i:function value %s, computed in %s seconds'%(num_iterations, str(res), str(res['runtime'])))
-                except (TypeError, AttributeError, KeyError, IndexError):
-                    logger.debug('iteration %i:function value %s, computed in %s seconds'%(num_iterations, str(res),cpu_time))
-                except:
-                    raise
+            # configurations evaluated before an interruption are not evaluated again,
+            # but their recorded results go through the same bookkeeping as new ones
+            cached_result = None if evaluation_cache is None else evaluation_cache.get(config_dict)
+            out_of_memory = False
+            if cached_result is not None:
+                logger.debug('iteration %i: replaying the recorded result %s', num_iterations, cached_result)
+                result_dict = dict(cached_result, replayed=True)
+                timings = {'smac_think_time': smac.think_time,
+                           'ipc_parse_time': smac.parse_time}
+                for rung, rung_result in evaluation_cache.rungs(config_dict):
+                    config_dict['budget'] = successive_halving.budgets[rung]
+                    record(config_dict, dict(rung_result, replayed=True), {})
+                cache_key_dict = None
+            # queue the evaluation until it fits into the memory budget, and
+            # abort the run if it does not (the abort is not checkpointed)
+            elif (run_options.get('evaluation_memory') is not None) and (not wait_for_memory(*run_options['evaluation_memory'])):
+                logger.warning('No memory for iteration %i, aborting the run with seed %i', num_iterations, seed)
+                out_of_memory = True
+                result_dict = make_result_dict({'status': 'ABORT'}, 0., timeout_quality)
+                timings = {'smac_think_time': smac.think_time,
+                           'ipc_parse_time': smac.parse_time}
+                if successive_halving is not None:
+                    config_dict['budget'] = successive_halving.budgets[0]
+                    record(config_dict, result_dict, {})
+                cache_key_dict = None
             else:
-                logger.debug('iteration %i: did not return in time, so it probably timed out'%(num_iterations))
-
-
-            # try to infere the status of the function call:
-            # if res['status'] exsists, it will be used in 'report_result'
-            # if there was no return value, it has either crashed or timed out
-            # for simple function, we just use 'SAT'
+                cache_key_dict = dict(config_dict)
+                rung_results = []
 
-            result_dict = {
-                        'value' : timeout_quality,
-                        'status': b'CRASHED' if res is None else b'SAT',
-                        'runtime': cpu_time
-                        }
-
-            if res is not None:
-                if isinstance(res, dict):
-                    result_dict.update(res)
-                else:
-                    result_dict['value'] = res
+                timings = {'smac_think_time': smac.think_time,
+                           'ipc_parse_time': smac.parse_time}
+            
+                # with successive halving, the configuration is evaluated on
+                # increasing budgets as long as it is among the best ones
+                rung = 0
+                while True:
+                    if successive_halving is not None:
+                        config_dict['budget'] = successive_halving.budgets[rung]
+                
+                    # execute the function and measure the time it takes to evaluate
+                    evaluated_function = function if learning_curves is None else learning_curves.wrap(function)
+                    if broker_client is None:
+                        evaluation = evaluate_with_limits(evaluated_function, config_dict,
+                                        mem_limit_function, current_t_limit, current_wall_time_limit)
+                    else:
+                        evaluation = broker_client.evaluate(evaluated_function, config_dict,
+                                        mem_limit_function, current_t_limit, current_wall_time_limit, deadline)
+            
+                    res = evaluation['result']
+                    if learning_curves is not None:
+                        res, curve = learning_curves.unwrap(res)
+                    wall_time = evaluation['wall_time']
+                    cpu_time = evaluation['function_cpu_time']
+            
+                    for k in ['spawn_time', 'function_wall_time', 'function_cpu_time']:
+                        if evaluation[k] is not None:
+                            timings[k] = evaluation[k] + (timings.get(k) or 0.)
+                    if evaluation['peak_rss_mb'] is not None:
+                        timings['peak_rss_mb'] = max(evaluation['peak_rss_mb'], timings.get('peak_rss_mb') or 0.)
+            
+                    # the messages are only formatted if debug logging is enabled
+                    if res is not None:
+                        logger.debug('iteration %i:function value %s, computed in %s seconds', num_iterations, res,
+                                     res['runtime'] if (isinstance(res, dict) and 'runtime' in res) else cpu_time)
+                    else:
+                        logger.debug('iteration %i: did not return in time, so it probably timed out', num_iterations)
 
-            # account for timeeouts
-            if not current_t_limit is None:
-                if ( (result_dict['runtime'] > current_t_limit-2e-2) or
-                        (wall_time >= 10*current_t_limit) ):
-                    result_dict['status']=b'TIMEOUT'
 
-            # set returned quality to default in case of a timeout
-            if result_dict['status'] == b'TIMEOUT':
-                result_dict['value'] = result_dict['value'] if timeout_quality is None else timeout_quality
+                    # if there was no return value, it has either crashed or timed out
+                    result_dict = make_result_dict(res, cpu_time, timeout_quality, current_t_limit, wall_time)
+                    if learning_curves is not None:
+                        learning_curves.add(curve, result_dict)
+                
+                    if successive_halving is None:
+                        break
+                    # every rung is recorded with its budget and the timings of its evaluation
+                    rung_timings = dict([(k, evaluation[k]) for k in ['spawn_time', 'function_wall_time', 'function_cpu_time', 'peak_rss_mb']
+                                         if evaluation[k] is not None])
+                    record(config_dict, result_dict, rung_timings)
+                    rung_results.append((rung, result_dict['value'], result_dict['status'], result_dict['runtime']))
+                    if not successive_halving.promote(rung, result_dict):
+                        break
+                    rung += 1
+                
+                # SMAC gets one result on the scale of the largest budget
+                if successive_halving is not None:
+                    result_dict = successive_halving.combine([{'value': v, 'status': st, 'runtime': t}
+                                                              for r, v, st, t in rung_results])
 
+            report_start = time.time()
             smac.report_result(result_dict)
+            timings['report_time'] = time.time() - report_start
+            timing_statistics.add(timings)
+            if (evaluation_cache is not None) and (cache_key_dict is not None):
+                evaluation_cache.add(cache_key_dict, result_dict, rung_results)
+            if successive_halving is None:
+                record(config_dict, result_dict, timings)
+            if metrics is not None:
+                metrics.add(timings, result_dict, smac.is_alive())
+            if (num_iterations == 0) and (run_options.get('start_time') is not None):
+                timing_statistics.time_to_first_evaluation = time.time() - run_options['start_time']
             num_iterations += 1
+            
+            if callbacks:
+                if (result_dict['status'] in ('SAT', 'UNSAT')) and (incumbent_value is None or result_dict['value'] < incumbent_value):
+                    incumbent_value = result_dict['value']
+                    call_hooks(callbacks, 'on_incumbent_change', seed, dict(config_dict), dict(result_dict))
+                if call_hooks(callbacks, 'after_evaluation', seed, dict(config_dict), dict(result_dict), timings):
+                    logger.debug('A callback stopped the run after iteration %i', num_iterations)
+                    smac.stop()
+                    break
+        
+            
+            if out_of_memory:
+                smac.stop()
+                break
+
+            if (stop_file is not None) and os.path.exists(stop_file):
+                logger.debug('Run with seed %i was asked to stop after iteration %i', seed, num_iterations)
+                smac.stop()
+                break
+        
+        if broker_client is not None:
+            broker_client.close()
+        if run_history is not None:
+            run_history.close()
+        if metrics is not None:
+            metrics.close()
+        if event_log is not None:
+            event_log.close()
+        smac.close_transcript()
+        if learning_curves is not None:
+            logger.debug('Run with seed %i stopped %i of %i evaluations early', seed, learning_curves.num_stopped, num_iterations)
+        if evaluation_cache is not None:
+            evaluation_cache.close()
+            # runs that ended by themselves are not restarted when resuming
+            if finished:
+                open(finished_marker_filename(checkpoint_directory, seed), 'w').close()
+        if callbacks:
+            call_hooks(callbacks, 'on_run_end', seed, timing_statistics)
+        return(timing_statistics, history, not finished)
     except:
         traceback.print_exc() # to see the traceback of subprocesses
@@ -0,0 +1,46 @@
+from __future__ import print_function, division, absolute_import
+
+import math
+
+
+def configurations_to_columns(configurations):
+    """ Converts a batch of configurations into one NumPy array per parameter.
+
+    Parameters missing in some configurations (inactive conditional
+    parameters) are None in an array of dtype object.
+
+    :param configurations: the configurations, e.g. from :py:meth:`pysmac.ask_tell.AskTellSession.ask`
+    :type configurations: list of dicts
+    :returns: dict -- mapping every parameter name to an array with one entry per configuration
+    """
+    import numpy as np
+    names = set()
+    for config in configurations:
+        names.update(config.keys())
+
+    columns = {}
+    for name in names:
+        values = [config.get(name) for config in configurations]
+        if any([v is None for v in values]):
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            columns[name] = column
+        else:
+            columns[name] = np.array(values)
+    return(columns)
+
+
+def split_results(results, batch_size):
+    """ Converts the return value of a batched function into one result per configuration.
+
+    :param results: the function values, one per configuration. NaN or None marks a crashed evaluation.
+    :type results: sequence of floats (e.g. a NumPy array)
+    :param batch_size: the number of configurations in the batch
+    :type batch_size: int
+    :returns: list -- the function values, with None for crashed evaluations
+    :raises: ValueError if the number of results does not match the batch size
+    """
+    results = list(results)
+    if len(results) != batch_size:
+        raise ValueError('The batched function returned {} values for {} configurations!'.format(len(results), batch_size))
+    return([None if (r is None or math.isnan(r)) else float(r) for r in results])
@@ -0,0 +1,100 @@
+from __future__ import print_function, division, absolute_import
+
+import multiprocessing
+import traceback
+
+
+class Callback(object):
+    """
+    Base class for hooks into the evaluation loop of every SMAC run.
+
+    Derive from this class and overwrite the methods you are interested
+    in. The hooks are called inside the worker processes that run SMAC,
+    so the callback objects have to be picklable, and any state collected
+    in them stays in that worker process. All methods receive the seed of
+    the SMAC run as the first argument to tell the runs apart.
+
+    If before_evaluation or after_evaluation return True, the SMAC run is
+    stopped. This allows to enforce custom budgets or to stop runs early.
+
+    When an interrupted call of minimize is resumed, the results recorded
+    before the interruption are replayed instead of evaluating the
+    function again. The hooks receive them like new results, with the
+    additional key 'replayed' set to True in the result_dict. Evaluations
+    stopped early (see :py:mod:`pysmac.utils.early_stopping`) are reported
+    with the status 'TIMEOUT' and the key 'stopped' set to True.
+    """
+
+    def before_evaluation(self, seed, config_dict):
+        """ Called right before the function is evaluated.
+
+        :param seed: the seed of the SMAC run
+        :type seed: int
+        :param config_dict: the (typed) arguments the function will be called with
+        :type config_dict: dict
+        :returns: bool -- True to stop the run before the evaluation
+        """
+        return(False)
+
+    def after_evaluation(self, seed, config_dict, result_dict, timings):
+        """ Called after the result was reported to SMAC.
+
+        :param seed: the seed of the SMAC run
+        :type seed: int
+        :param config_dict: the (typed) arguments the function was called with
+        :type config_dict: dict
+        :param result_dict: the result reported to SMAC with the keys 'value', 'status' (a str like 'SAT') and 'runtime'
+        :type result_dict: dict
+        :param timings: the timings of this evaluation, see :py:data:`pysmac.utils.timing_statistics.TIMING_KEYS`
+        :type timings: dict
+        :returns: bool -- True to stop the run
+        """
+        return(False)
+
+    def on_incumbent_change(self, seed, config_dict, result_dict):
+        """ Called when a successful evaluation returned a new lowest value in this run.
+
+        Note that this is pySMAC's view of the run: for non-deterministic
+        functions or multiple instances, SMAC's own incumbent is based on
+        aggregated values and can differ.
+
+        :param seed: the seed of the SMAC run
+        :type seed: int
+        :param config_dict: the (typed) arguments the function was called with
+        :type config_dict: dict
+        :param result_dict: the result reported to SMAC
+        :type result_dict: dict
+        """
+        pass
+
+    def on_run_end(self, seed, timing_statistics):
+        """ Called once the SMAC run has finished or was stopped.
+
+        :param seed: the seed of the SMAC run
+        :type seed: int
+        :param timing_statistics: timings of all evaluations of this run
+        :type timing_statistics: :py:class:`pysmac.utils.timing_statistics.TimingStatistics`
+        """
+        pass
+
+
+def call_hooks(callbacks, name, *args):
+    """
+    Calls the method 'name' of every callback with the given arguments.
+
+    Exceptions raised inside a hook are logged, but do not abort the SMAC run.
+
+    :param callbacks: the callbacks to call
+    :type callbacks: list of :py:class:`Callback`
+    :param name: name of the hook, e.g. 'after_evaluation'
+    :type name: str
+    :returns: bool -- True if any of the hooks requested to stop the run
+    """
+    stop = False
+    for callback in callbacks:
+        try:
+            stop = bool(getattr(callback, name)(*args)) or stop
+        except Exception:
+            multiprocessing.get_logger().warning('Callback %s.%s raised an exception:\n%s',
+                        type(callback).__name__, name, traceback.format_exc())
+    return(stop)
@@ -0,0 +1,123 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import glob
+import json
+import multiprocessing
+
+
+CHECKPOINT_FILENAME = 'checkpoint.json'
+""" Name of the file with pySMAC's bookkeeping inside the checkpoint directory."""
+
+
+def evaluation_cache_filename(directory, seed):
+    """ The file in which the SMAC run with the given seed records its evaluations."""
+    return(os.path.join(directory, 'evaluations-%i.jsonl' % seed))
+
+
+def finished_marker_filename(directory, seed):
+    """ The file marking that the SMAC run with the given seed terminated regularly."""
+    return(os.path.join(directory, 'run-%i.finished' % seed))
+
+
+def read_checkpoint(directory):
+    """ Reads pySMAC's bookkeeping of an interrupted call of minimize.
+
+    :param directory: the checkpoint directory
+    :type directory: str
+    :returns: dict -- the data passed to write_checkpoint with the additional keys 'recorded_seeds' (all runs with recorded evaluations), 'finished_seeds' and 'last_update' (time of the latest evaluation), or None if there is no checkpoint
+    """
+    fn = os.path.join(directory, CHECKPOINT_FILENAME)
+    if not os.path.exists(fn):
+        return(None)
+    with open(fn, 'r') as fh:
+        checkpoint = json.load(fh)
+
+    cache_files = glob.glob(evaluation_cache_filename(directory, 0).replace('-0.', '-*.'))
+    checkpoint['recorded_seeds'] = sorted([int(fn.rsplit('-', 1)[1].split('.')[0]) for fn in cache_files])
+    checkpoint['finished_seeds'] = [s for s in checkpoint['recorded_seeds'] if os.path.exists(finished_marker_filename(directory, s))]
+    checkpoint['last_update'] = max([os.path.getmtime(fn) for fn in cache_files + [os.path.join(directory, CHECKPOINT_FILENAME)]])
+    return(checkpoint)
+
+
+def write_checkpoint(directory, checkpoint):
+    """ Atomically writes pySMAC's bookkeeping (must be JSON serializable) into the checkpoint directory."""
+    fn = os.path.join(directory, CHECKPOINT_FILENAME)
+    with open(fn + '.tmp', 'w') as fh:
+        json.dump(checkpoint, fh)
+    os.rename(fn + '.tmp', fn)
+
+
+class EvaluationCache(object):
+    """
+    Records every evaluation of a SMAC run, so it can be replayed after an interruption.
+
+    Every result is appended as one JSON line and flushed immediately, so
+    at most the evaluation in progress is lost when the process is killed.
+    When the run is restarted with the same seed, SMAC proposes the same
+    configurations again (or restores its state), and their results are
+    reported from the cache instead of evaluating the function again.
+    """
+
+    def __init__(self, fn):
+        """
+        :param fn: the file to read previous evaluations from and to append new ones to
+        :type fn: str
+        """
+        self.fn = fn
+        self.entries = {}
+        if os.path.exists(fn):
+            with open(fn, 'r') as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # the last line can be incomplete if the process was killed
+                        multiprocessing.get_logger().debug('Ignoring an incomplete line in %s', fn)
+                        continue
+                    self.entries[entry['key']] = entry
+        self.__fh = open(fn, 'a')
+
+    @staticmethod
+    def key(config_dict):
+        """ A unique string for the arguments of the function (including instance and seed)."""
+        return(json.dumps(sorted(config_dict.items())))
+
+    def get(self, config_dict):
+        """ :returns: dict -- the result to report to SMAC, or None if the configuration was not evaluated before"""
+        entry = self.entries.get(self.key(config_dict))
+        if entry is None:
+            return(None)
+        return(dict(entry['result']))
+
+    def add(self, config_dict, result_dict, rungs=None):
+        """ Records an evaluation.
+
+        :param config_dict: the arguments of the function
+        :type config_dict: dict
+        :param result_dict: the result reported to SMAC
+        :type result_dict: dict
+        :param rungs: the (budget index, value, status, runtime) of every evaluation with successive halving
+        :type rungs: list of tuples
+        """
+        # the flag of evaluations stopped early is replayed as well
+        result = dict([(k, result_dict[k]) for k in ('value', 'status', 'runtime', 'stopped') if k in result_dict])
+        entry = {'key': self.key(config_dict), 'result': result, 'rungs': rungs or []}
+        self.entries[entry['key']] = entry
+        self.__fh.write(json.dumps(entry) + '\n')
+        self.__fh.flush()
+
+    def rungs(self, config_dict):
+        """ :returns: list -- the (budget index, result dict) of every evaluation of the configuration with successive halving"""
+        entry = self.entries.get(self.key(config_dict))
+        if entry is None:
+            return([])
+        return([(rung[0], {'value': rung[1], 'status': rung[2], 'runtime': rung[3]}) for rung in entry['rungs']])
+
+    def rung_results(self):
+        """ :returns: list -- the (budget index, result dict) of all recorded evaluations with successive halving"""
+        return([(rung[0], {'value': rung[1], 'status': rung[2]})
+                for entry in list(self.entries.values()) for rung in entry['rungs']])
+
+    def close(self):
+        self.__fh.close()
@@ -0,0 +1,110 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import multiprocessing
+
+
+THREAD_ENVIRONMENT_VARIABLES = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS',
+                                'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                                'VECLIB_MAXIMUM_THREADS']
+""" Environment variables controlling the number of threads of common numerical libraries."""
+
+
+def available_cpus():
+    """ The CPUs the calling process is allowed to run on.
+
+    :returns: list -- the ids of the CPUs
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return(sorted(os.sched_getaffinity(0)))
+    return(list(range(multiprocessing.cpu_count())))
+
+
+def cpu_topology_key(cpu):
+    """ Sort key grouping CPUs by socket and physical core (Linux only).
+
+    Hyperthreads of the same core and cores of the same socket end up next
+    to each other, so contiguous chunks of the sorted list share caches.
+    """
+    base = '/sys/devices/system/cpu/cpu%i/topology/' % cpu
+    try:
+        with open(base + 'physical_package_id') as fh:
+            package = int(fh.read())
+        with open(base + 'core_id') as fh:
+            core = int(fh.read())
+    except (IOError, OSError, ValueError):
+        return((0, cpu, cpu))
+    return((package, core, cpu))
+
+
+class CPUAllocator(object):
+    """
+    Hands out disjoint sets of CPUs to the parallel SMAC runs.
+
+    The available CPUs are split into one chunk per parallel run along the
+    machine's topology. Every run (its JVM and its function evaluations) is
+    pinned to its chunk, and the number of threads of the JVM and of common
+    numerical libraries is adjusted to the chunk's size. This avoids that
+    many runs with many threads each compete for the same cores.
+    """
+
+    def __init__(self, num_slots, cpus=None):
+        """
+        :param num_slots: number of runs executed in parallel
+        :type num_slots: int
+        :param cpus: the CPUs to distribute. None means all CPUs available to this process.
+        :type cpus: list of ints
+        """
+        cpus = available_cpus() if cpus is None else list(cpus)
+        cpus.sort(key=cpu_topology_key)
+        if num_slots > len(cpus):
+            multiprocessing.get_logger().warning('%i parallel runs have to share %i CPUs.', num_slots, len(cpus))
+            self.__free = [[cpus[i % len(cpus)]] for i in range(num_slots)]
+        else:
+            # distribute the remainder over the first chunks
+            size, remainder = divmod(len(cpus), num_slots)
+            self.__free = []
+            start = 0
+            for i in range(num_slots):
+                end = start + size + (1 if i < remainder else 0)
+                self.__free.append(cpus[start:end])
+                start = end
+
+    def acquire(self):
+        """ :returns: list -- a free set of CPUs, or None if all are in use."""
+        if len(self.__free) == 0:
+            return(None)
+        return(self.__free.pop(0))
+
+    def release(self, cpus):
+        """ Returns a set of CPUs obtained from acquire."""
+        self.__free.append(cpus)
+
+
+def pin_to_cpus(cpus):
+    """ Restricts the calling process (and all processes it creates) to the given CPUs.
+
+    The thread count variables of :py:data:`THREAD_ENVIRONMENT_VARIABLES`
+    are set to the number of CPUs, so numerical libraries in the function
+    evaluations do not start more threads than there are CPUs. Note that
+    libraries that were already loaded before might ignore these.
+
+    :param cpus: the CPUs to run on
+    :type cpus: list of ints
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    for name in THREAD_ENVIRONMENT_VARIABLES:
+        os.environ[name] = str(len(cpus))
+
+
+def jvm_thread_options(num_cpus):
+    """ The JVM options to size its garbage collector and compiler threads to the number of CPUs.
+
+    :param num_cpus: the number of CPUs the JVM can use
+    :type num_cpus: int
+    :returns: list -- the options for the java command
+    """
+    return(['-XX:ParallelGCThreads=%i' % num_cpus,
+            '-XX:ConcGCThreads=%i' % max(1, num_cpus // 4),
+            '-XX:CICompilerCount=%i' % max(2, num_cpus)])
@@ -0,0 +1,208 @@
+from __future__ import print_function, division, absolute_import
+
+
+class StopEvaluation(Exception):
+    """ Raised by :py:meth:`IntermediateReporter.report` when the evaluation should be stopped.
+
+    Do not catch it inside your function (or re-raise it).
+    """
+    pass
+
+
+class StoppingRule(object):
+    """
+    Base class for the rules that decide when an evaluation is stopped early.
+
+    Before every evaluation, the SMAC run computes a threshold for every
+    step from the learning curves of its previous evaluations. Inside the
+    function, every intermediate value is compared to the threshold of
+    its step, so no communication with the SMAC run is necessary.
+    """
+
+    def __init__(self, grace_steps=1):
+        """
+        :param grace_steps: number of intermediate values every evaluation reports before it can be stopped
+        :type grace_steps: int
+        """
+        self.grace_steps = grace_steps
+
+    def thresholds(self, curves, incumbent_curve):
+        """ Computes the threshold for every step.
+
+        :param curves: the intermediate values of all completed (not stopped) evaluations
+        :type curves: list of lists
+        :param incumbent_curve: the intermediate values of the completed evaluation with the lowest result, None if there is none
+        :type incumbent_curve: list
+        :returns: list -- one threshold (or None for no stopping) per step
+        """
+        raise NotImplementedError()
+
+    def should_stop(self, values, threshold):
+        """ Whether the evaluation with the intermediate values reported so far is stopped (given the threshold of the current step)."""
+        raise NotImplementedError()
+
+
+class MedianStoppingRule(StoppingRule):
+    """
+    Stops an evaluation if its best value so far is worse than the median
+    of the running averages of the completed evaluations at the same step.
+    """
+
+    def __init__(self, grace_steps=1, min_curves=3):
+        """
+        :param grace_steps: number of intermediate values every evaluation reports before it can be stopped
+        :type grace_steps: int
+        :param min_curves: number of completed evaluations that reached a step before it is used for stopping
+        :type min_curves: int
+        """
+        super(MedianStoppingRule, self).__init__(grace_steps)
+        self.min_curves = min_curves
+
+    def thresholds(self, curves, incumbent_curve):
+        import numpy as np
+        result = []
+        for step in range(max([len(c) for c in curves] + [0])):
+            averages = [np.mean(c[:step + 1]) for c in curves if len(c) > step]
+            if (step < self.grace_steps - 1) or (len(averages) < self.min_curves):
+                result.append(None)
+            else:
+                result.append(float(np.median(averages)))
+        return(result)
+
+    def should_stop(self, values, threshold):
+        return(min(values) > threshold)
+
+
+class IncumbentStoppingRule(StoppingRule):
+    """
+    Stops an evaluation if its current value is worse than the value of
+    the incumbent's learning curve at the same step (by more than the
+    tolerance times the absolute value of the latter).
+    """
+
+    def __init__(self, grace_steps=1, tolerance=0.):
+        """
+        :param grace_steps: number of intermediate values every evaluation reports before it can be stopped
+        :type grace_steps: int
+        :param tolerance: the relative amount by which an evaluation can be worse than the incumbent
+        :type tolerance: float
+        """
+        super(IncumbentStoppingRule, self).__init__(grace_steps)
+        self.tolerance = tolerance
+
+    def thresholds(self, curves, incumbent_curve):
+        if incumbent_curve is None:
+            return([])
+        return([None if step < self.grace_steps - 1 else v + self.tolerance * abs(v)
+                for step, v in enumerate(incumbent_curve)])
+
+    def should_stop(self, values, threshold):
+        return(values[-1] > threshold)
+
+
+class IntermediateReporter(object):
+    """
+    Passed to the function as the argument 'reporter' if early stopping is enabled.
+
+    Call :py:meth:`report` with every intermediate value, e.g. the
+    validation loss after every epoch. Lower values are better.
+    """
+
+    def __init__(self, rule, thresholds):
+        self.rule = rule
+        self.thresholds = thresholds
+        self.values = []
+        """ All intermediate values reported so far."""
+        self.stop_threshold = None
+        """ The threshold the evaluation exceeded, None if it was not stopped."""
+
+    def report(self, value):
+        """ Records an intermediate value.
+
+        :param value: the current value of the objective
+        :type value: float
+        :raises: :py:class:`StopEvaluation` if the evaluation should be stopped
+        """
+        self.values.append(float(value))
+        step = len(self.values) - 1
+        if (step < len(self.thresholds)) and (self.thresholds[step] is not None) and \
+                self.rule.should_stop(self.values, self.thresholds[step]):
+            self.stop_threshold = self.thresholds[step]
+            raise StopEvaluation()
+
+
+class reporting_function(object):
+    """
+    Small wrapper passing an :py:class:`IntermediateReporter` to the user's function.
+
+    Like :py:class:`pysmac.utils.timing_statistics.timed_function`, it is
+    executed inside the subprocess evaluating the function. A stopped
+    evaluation did not finish, so it is not reported as SAT with its last
+    intermediate value: its result has the status 'TIMEOUT', the key
+    'stopped' and the exceeded threshold as its value, which
+    :py:func:`pysmac.remote_smac.make_result_dict` replaces by the
+    timeout quality like for every other censored evaluation.
+    """
+    def __init__(self, function, rule, thresholds):
+        self.function = function
+        self.rule = rule
+        self.thresholds = thresholds
+
+    def __call__(self, **kwargs):
+        reporter = IntermediateReporter(self.rule, self.thresholds)
+        try:
+            res = self.function(reporter=reporter, **kwargs)
+            stopped = False
+        except StopEvaluation:
+            res = {'value': reporter.stop_threshold, 'status': 'TIMEOUT', 'stopped': True}
+            stopped = True
+        return({'result': res, 'curve': reporter.values, 'stopped': stopped})
+
+
+class LearningCurves(object):
+    """
+    The learning curves of the completed evaluations of one SMAC run.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.curves = []
+        self.incumbent = None
+        self.num_stopped = 0
+        """ The number of evaluations stopped early."""
+
+    def wrap(self, function):
+        """ :returns: callable -- the function wrapped with :py:class:`reporting_function` and the current thresholds"""
+        return(reporting_function(function, self.rule,
+                                  self.rule.thresholds(self.curves, None if self.incumbent is None else self.incumbent[1])))
+
+    @staticmethod
+    def unwrap(wrapped_result):
+        """ Unpacks the result of an evaluation.
+
+        :param wrapped_result: the return value of a reporting_function, or None if the function crashed or timed out
+        :type wrapped_result: dict
+        :returns: tuple -- (the return value of the user's function or None if it crashed or timed out, the intermediate values)
+        """
+        if wrapped_result is None:
+            return(None, [])
+        return(wrapped_result['result'], wrapped_result['curve'])
+
+    def add(self, curve, result_dict):
+        """ Records the curve of an evaluation once its final result is known.
+
+        Only evaluations that finished with the status SAT or UNSAT
+        contribute their curve, stopped, crashed or timed out ones do not.
+
+        :param curve: the intermediate values of the evaluation
+        :type curve: list
+        :param result_dict: the result reported to SMAC (see :py:func:`pysmac.remote_smac.make_result_dict`)
+        :type result_dict: dict
+        """
+        if result_dict.get('stopped', False):
+            self.num_stopped += 1
+        elif (result_dict['status'] in ('SAT', 'UNSAT')) and (len(curve) > 0):
+            self.curves.append(curve)
+            value = result_dict['value']
+            if (value is not None) and ((self.incumbent is None) or (value < self.incumbent[0])):
+                self.incumbent = (value, curve)
@@ -0,0 +1,113 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import json
+import time
+import multiprocessing
+
+from .timing_statistics import TIMING_KEYS, MEMORY_KEYS
+
+
+class EventLogWriter(object):
+    """
+    Writes one JSON record per function evaluation of a SMAC run.
+
+    The records are buffered and appended to the file in batches, every
+    batch with a single write on a file opened in append mode. All runs
+    of a call of minimize can therefore share the same file. Every line
+    is a dict with the keys 'run' (the seed of the SMAC run), 'iteration',
+    'time', 'config', 'instance', 'seed', 'budget', 'value', 'status',
+    'runtime', 'replayed' (whether the result was recorded before an
+    interruption and replayed when resuming) and 'timings'.
+    """
+
+    def __init__(self, fn, run_seed, buffer_size=1000, flush_interval_s=5):
+        """
+        :param fn: the JSON lines file
+        :type fn: str
+        :param run_seed: the seed of the SMAC run
+        :type run_seed: int
+        :param buffer_size: number of records written at once
+        :type buffer_size: int
+        :param flush_interval_s: maximum time (in seconds) a record stays in the buffer
+        :type flush_interval_s: float
+        """
+        self.fn = fn
+        self.run_seed = run_seed
+        self.buffer_size = buffer_size
+        self.flush_interval_s = flush_interval_s
+        self.__fd = os.open(fn, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.__buffer = []
+        self.__last_flush = time.time()
+
+    def add(self, iteration, config_dict, result_dict, timings):
+        """ Records the evaluation of a configuration.
+
+        :param iteration: the number of the evaluation within the run
+        :type iteration: int
+        :param config_dict: the arguments of the function, including 'instance', 'seed' and 'budget' if present
+        :type config_dict: dict
+        :param result_dict: the result reported to SMAC
+        :type result_dict: dict
+        :param timings: the timings of the evaluation, see :py:data:`pysmac.utils.timing_statistics.TIMING_KEYS`
+        :type timings: dict
+        """
+        self.__buffer.append({
+            'run': self.run_seed, 'iteration': iteration, 'time': time.time(),
+            'config': dict([(k, v) for k, v in list(config_dict.items()) if k not in ('instance', 'seed', 'budget')]),
+            'instance': config_dict.get('instance'), 'seed': config_dict.get('seed'),
+            'budget': config_dict.get('budget'),
+            'value': None if result_dict['value'] is None else float(result_dict['value']),
+            'status': result_dict['status'],
+            'runtime': result_dict['runtime'], 'replayed': result_dict.get('replayed', False), 'timings': timings})
+        if (len(self.__buffer) >= self.buffer_size) or (time.time() - self.__last_flush >= self.flush_interval_s):
+            self.flush()
+
+    def flush(self):
+        """ Appends all buffered records to the file."""
+        if len(self.__buffer) > 0:
+            data = ''.join([json.dumps(r, default=str) + '\n' for r in self.__buffer]).encode()
+            while len(data) > 0:
+                data = data[os.write(self.__fd, data):]
+            self.__buffer = []
+        self.__last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        os.close(self.__fd)
+
+
+def read_event_log(fn):
+    """ Reads an event log into one NumPy array per field.
+
+    :param fn: the JSON lines file written by :py:class:`EventLogWriter`
+    :type fn: str
+    :returns: dict -- with arrays for 'run', 'iteration', 'time', 'instance', 'seed', 'budget', 'value', 'runtime', 'status', 'replayed' and every timing key (missing numbers are NaN), 'configurations' (the list of configuration dicts) and 'parameters' (one array per parameter, see :py:func:`pysmac.utils.batching.configurations_to_columns`)
+    """
+    import numpy as np
+    from .batching import configurations_to_columns
+
+    records = []
+    with open(fn, 'r') as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # the last line can be incomplete if the process was killed
+                multiprocessing.get_logger().debug('Ignoring an incomplete line in %s', fn)
+
+    def column(values, dtype):
+        return(np.array([np.nan if v is None else v for v in values], dtype=dtype))
+
+    events = {}
+    for k in ('run', 'iteration'):
+        events[k] = np.array([r[k] for r in records], dtype=np.int64)
+    for k in ('time', 'instance', 'seed', 'budget', 'value', 'runtime'):
+        events[k] = column([r.get(k) for r in records], np.float64)
+    events['status'] = np.array([r['status'] for r in records], dtype=str)
+    events['replayed'] = np.array([r.get('replayed', False) for r in records], dtype=bool)
+    for k in TIMING_KEYS + MEMORY_KEYS:
+        events[k] = column([r['timings'].get(k) for r in records], np.float64)
+    events['configurations'] = [r['config'] for r in records]
+    events['parameters'] = configurations_to_columns(events['configurations'])
+    return(events)
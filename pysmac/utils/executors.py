@@ -0,0 +1,344 @@
+"""
+The executors that start the individual SMAC runs of a call of minimize.
+
+Every executor starts a run with :py:meth:`RunExecutor.submit` and returns
+a handle with the methods ``done()`` and ``result()``, like a
+``concurrent.futures.Future``. :py:meth:`RunExecutor.wait` returns the
+handles of the runs that have finished, so the results are processed in
+the order in which the runs finish. The built-in executors are
+
+* :py:class:`ProcessExecutor`: a pool of (non-daemonic) worker processes, optionally with a given start method (the default),
+* :py:class:`SubprocessExecutor`: every run is a separate Python interpreter in its own process group,
+* :py:class:`ThreadExecutor`: all runs share the calling process, one thread per run,
+* :py:class:`FuturesExecutor`: any ``concurrent.futures.Executor`` of the host application.
+"""
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import time
+import shutil
+import pickle
+import signal
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+from .multiprocessing_wrapper import MyPool, ContextPool
+
+
+class RunExecutor(object):
+    """
+    Base class for the executors of SMAC runs.
+    """
+
+    separate_processes = True
+    """ Whether every run has its own process, which is necessary to pin the runs to CPUs and to limit the CPU time of the evaluations."""
+
+    def start(self, num_procs):
+        """ Prepares the executor for at most num_procs simultaneous runs."""
+        pass
+
+    def submit(self, function, argument):
+        """ Starts function(argument) for a single SMAC run.
+
+        :returns: a handle with the methods done() and result()
+        """
+        raise NotImplementedError()
+
+    def wait(self, handles, timeout):
+        """ Waits until at least one of the runs has finished, but not longer than the timeout.
+
+        :param handles: the handles of the running runs
+        :type handles: list
+        :param timeout: the maximum time (in seconds) to wait
+        :type timeout: float
+        :returns: list -- the handles of the finished runs, empty if the timeout was reached
+        """
+        end = time.time() + timeout
+        while True:
+            finished = [h for h in handles if h.done()]
+            if (len(finished) > 0) or (time.time() >= end):
+                return(finished)
+            time.sleep(min(0.05, max(0., end - time.time())))
+
+    def terminate(self):
+        """ Stops all runs immediately."""
+        pass
+
+    def shutdown(self):
+        """ Frees the resources of the executor after all runs have finished."""
+        pass
+
+
+class PoolRun(object):
+    """ The handle of a run in a :py:class:`ProcessExecutor`."""
+    def __init__(self, async_result):
+        self.async_result = async_result
+
+    def done(self):
+        return(self.async_result.ready())
+
+    def result(self):
+        return(self.async_result.get())
+
+
+class ProcessExecutor(RunExecutor):
+    """
+    Executes the runs in a pool of worker processes.
+
+    The workers are no daemons, so the functions can start processes
+    themselves, see :py:class:`pysmac.utils.multiprocessing_wrapper.MyPool`.
+    """
+
+    def __init__(self, start_method=None):
+        """
+        :param start_method: how the workers are started: 'fork', 'spawn' or 'forkserver' (Python 3 only). None means the platform's default. With 'spawn' and 'forkserver', the function has to be picklable by reference, i.e. defined at the top level of a module or of the main script.
+        :type start_method: str
+        """
+        self.start_method = start_method
+        self.pool = None
+
+    def start(self, num_procs):
+        self.pool = MyPool(num_procs) if self.start_method is None else ContextPool(num_procs, self.start_method)
+
+    def submit(self, function, argument):
+        return(PoolRun(self.pool.apply_async(function, (argument,))))
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+class SubprocessRun(object):
+    """ The handle of a run in a :py:class:`SubprocessExecutor`."""
+    def __init__(self, process, directory):
+        self.process = process
+        self.directory = directory
+
+    def done(self):
+        return(self.process.poll() is not None)
+
+    def result(self):
+        self.process.wait()
+        try:
+            with open(os.path.join(self.directory, 'result.pkl'), 'rb') as fh:
+                return(pickle.load(fh))
+        except (IOError, OSError):
+            raise RuntimeError('The run in process {} exited with code {} without a result!'.format(
+                self.process.pid, self.process.returncode))
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def kill(self):
+        if not self.done():
+            try:
+                # the JVM and the function evaluations are in the same process group
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                self.process.kill()
+            self.process.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SubprocessExecutor(RunExecutor):
+    """
+    Executes every run in a new Python interpreter.
+
+    The function and its argument are pickled into a temporary directory,
+    and the interpreter (executing :py:func:`main`) writes the
+    result next to them. Every run is a session of its own, so it is not
+    affected by signals sent to the caller's process group (e.g. Ctrl-C in
+    a terminal) and can be killed together with all processes it started.
+    Like with the 'spawn' start method, the main script is imported again
+    in every interpreter, so the function has to be defined at the top
+    level of a module or of the main script.
+    """
+
+    def __init__(self, python=None):
+        """
+        :param python: the Python interpreter executing the runs. None means the current one.
+        :type python: str
+        """
+        self.python = sys.executable if python is None else python
+        self.runs = []
+
+    def submit(self, function, argument):
+        directory = tempfile.mkdtemp(prefix='pysmac_run_')
+        try:
+            with open(os.path.join(directory, 'run.pkl'), 'wb') as fh:
+                # the main script has to be importable before the function is unpickled
+                pickle.dump(preparation_data(), fh, pickle.HIGHEST_PROTOCOL)
+                pickle.dump((function, argument), fh, pickle.HIGHEST_PROTOCOL)
+        except:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        kwargs = {'start_new_session': True} if sys.version_info[0] >= 3 else {'preexec_fn': os.setsid}
+        with open(os.devnull, 'r') as devnull:
+            process = subprocess.Popen([self.python, '-c', 'from pysmac.utils.executors import main; main()', directory],
+                                       stdin=devnull, close_fds=True, **kwargs)
+        self.runs.append(SubprocessRun(process, directory))
+        return(self.runs[-1])
+
+    def terminate(self):
+        for run in self.runs:
+            run.kill()
+        self.runs = []
+
+    def shutdown(self):
+        self.runs = []
+
+
+class ThreadRun(object):
+    """ The handle of a run in a :py:class:`ThreadExecutor`."""
+    def __init__(self, function, argument):
+        self.value = None
+        self.exception = None
+        self.thread = threading.Thread(target=self.__run, args=(function, argument))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __run(self, function, argument):
+        try:
+            self.value = function(argument)
+        except BaseException as e:
+            self.exception = e
+
+    def done(self):
+        return(not self.thread.is_alive())
+
+    def result(self):
+        self.thread.join()
+        if self.exception is not None:
+            raise self.exception
+        return(self.value)
+
+
+class ThreadExecutor(RunExecutor):
+    """
+    Executes every run in a thread of the calling process.
+
+    A run mostly waits for SMAC (which is a separate Java process) and for
+    the function evaluations (which are subprocesses started by pynisher),
+    so a single process can multiplex many runs without starting a worker
+    process for each of them. The threads can not be terminated: after
+    the deadline, the runs are only asked to stop. The runs can not be
+    pinned to CPUs, and the CPU time of killed evaluations can not be
+    measured, so they can not be combined with a CPU time limit.
+    """
+
+    separate_processes = False
+
+    def __init__(self):
+        self.runs = []
+
+    def submit(self, function, argument):
+        self.runs.append(ThreadRun(function, argument))
+        return(self.runs[-1])
+
+    def terminate(self):
+        running = [r for r in self.runs if not r.done()]
+        if len(running) > 0:
+            multiprocessing.get_logger().warning('%i threads can not be terminated and continue in the background.', len(running))
+        self.runs = []
+
+    def shutdown(self):
+        self.runs = []
+
+
+class FuturesExecutor(RunExecutor):
+    """
+    Executes the runs with a ``concurrent.futures.Executor`` of the host application.
+
+    The executor is not shut down by pySMAC. Its workers have to be able
+    to start processes; the workers of a ``ProcessPoolExecutor`` can do
+    that since Python 3.9 (before, they were daemons).
+    """
+
+    def __init__(self, executor):
+        """
+        :param executor: the executor, e.g. a ProcessPoolExecutor
+        :type executor: concurrent.futures.Executor
+        """
+        import concurrent.futures
+        self.executor = executor
+        self.separate_processes = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+        self.futures = []
+
+    def submit(self, function, argument):
+        self.futures.append(self.executor.submit(function, argument))
+        return(self.futures[-1])
+
+    def wait(self, handles, timeout):
+        import concurrent.futures
+        finished, _ = concurrent.futures.wait(handles, timeout, concurrent.futures.FIRST_COMPLETED)
+        return(list(finished))
+
+    def terminate(self):
+        # only runs that have not started yet can be cancelled
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+    def shutdown(self):
+        self.futures = []
+
+
+EXECUTORS = {'process': ProcessExecutor, 'subprocess': SubprocessExecutor, 'thread': ThreadExecutor}
+""" The executors that can be selected by name, the start methods of multiprocessing select a ProcessExecutor."""
+
+
+def make_executor(executor):
+    """ Converts the executor argument of minimize into a :py:class:`RunExecutor`.
+
+    :param executor: None (a ProcessExecutor), a name in :py:data:`EXECUTORS`, a start method ('fork', 'spawn' or 'forkserver'), a RunExecutor or a concurrent.futures.Executor
+    :returns: :py:class:`RunExecutor`
+    """
+    if executor is None:
+        return(ProcessExecutor())
+    if isinstance(executor, RunExecutor):
+        return(executor)
+    if executor in EXECUTORS:
+        return(EXECUTORS[executor]())
+    if executor in ('fork', 'spawn', 'forkserver'):
+        return(ProcessExecutor(executor))
+    if hasattr(executor, 'submit'):
+        return(FuturesExecutor(executor))
+    raise ValueError('Unknown executor {}!'.format(executor))
+
+
+def preparation_data():
+    """ :returns: dict -- what a new interpreter needs to import the main script, like multiprocessing's 'spawn' (None on Python 2)"""
+    try:
+        import multiprocessing.spawn
+    except ImportError:
+        return(None)
+    data = multiprocessing.spawn.get_preparation_data('pysmac-run')
+    # the run does not connect to this process, and the key can not be pickled
+    data.pop('authkey', None)
+    return(data)
+
+
+def main(argv=None):
+    directory = (sys.argv[1:] if argv is None else argv)[0]
+    with open(os.path.join(directory, 'run.pkl'), 'rb') as fh:
+        data = pickle.load(fh)
+        if data is not None:
+            import multiprocessing.spawn
+            multiprocessing.spawn.prepare(data)
+        function, argument = pickle.load(fh)
+    result = function(argument)
+    # renamed only when complete, so a killed run leaves no partial result
+    fn = os.path.join(directory, 'result.pkl')
+    with open(fn + '.tmp', 'wb') as fh:
+        pickle.dump(result, fh, pickle.HIGHEST_PROTOCOL)
+    os.rename(fn + '.tmp', fn)
+
@@ -0,0 +1,268 @@
+"""
+A stand-in for SMAC that speaks the same TCP protocol as ``SMACExecutor --tae IPC``.
+
+It accepts SMAC's command line arguments, sends configurations to pySMAC
+as fast as pySMAC answers, and writes a trajectory file like SMAC. No
+Java and no model are involved, so it is useful to measure pySMAC's own
+overhead and to test the evaluation loop. The configurations either
+
+* are drawn uniformly at random from the pcs file (the default first,
+  honoring conditional and classic forbidden clauses), or
+* are replayed from a transcript recorded by pySMAC in an earlier
+  session, see :py:func:`transcript_filename`.
+
+It is selected in :py:class:`pysmac.optimizer.SMAC_optimizer` with::
+
+    opt.smac_options['backend'] = 'fake'
+    # optional: replay the transcripts in this directory
+    opt.smac_options['fake_replay_directory'] = 'transcripts'
+
+and can be started manually with
+``python -m pysmac.utils.fake_smac --scenario-file <file> --ipc-remote-port <port> --seed <seed>``.
+"""
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import socket
+
+
+def transcript_filename(directory, seed):
+    """ The transcript of the run with the given seed, one JSON object with the keys 'message' (sent by SMAC) and 'result' (pySMAC's answer) per line."""
+    return(os.path.join(directory, 'transcript-run%i.jsonl' % seed))
+
+
+def read_transcript(fn):
+    """ :returns: list -- the (message, result) pairs of a transcript file"""
+    pairs = []
+    with open(fn, 'r') as fh:
+        for line in fh:
+            if line.strip() != '':
+                entry = json.loads(line)
+                pairs.append((entry['message'], entry['result']))
+    return(pairs)
+
+
+def command(replay_directory=None):
+    """ :returns: list -- the command starting the fake SMAC (SMAC's arguments are appended)"""
+    # not 'python -m', because importing pysmac already imports this module
+    cmds = [sys.executable, '-c', 'from pysmac.utils.fake_smac import main; main()']
+    if replay_directory is not None:
+        cmds += ['--replay-directory', os.path.abspath(replay_directory)]
+    return(cmds)
+
+
+def read_pcs_file(fn):
+    """ Converts a pcs file written by pySMAC back into parameter definitions.
+
+    :returns: tuple -- (parameter dict, conditional clauses, forbidden clauses)
+    """
+    numerical = re.compile(r'^(\S+)\s+(real|integer)\s+\[([^,]+),\s*([^\]]+)\]\s*\[([^\]]+)\](\s+log)?')
+    discrete = re.compile(r'^(\S+)\s+(categorical|ordinal)\s+\{([^}]*)\}\s*\[([^\]]+)\]')
+    parameters, conditionals, forbiddens = {}, [], []
+    with open(fn, 'r') as fh:
+        for line in fh:
+            line = line.strip()
+            match = numerical.match(line)
+            if match:
+                name, kind, lower, upper, default, log = match.groups()
+                cast = float if kind == 'real' else int
+                parameters[name] = (kind, [cast(lower), cast(upper)], cast(default)) + (('log',) if log else ())
+                continue
+            match = discrete.match(line)
+            if match:
+                name, kind, values, default = match.groups()
+                parameters[name] = (kind, [v.strip() for v in values.split(',')], default.strip())
+            elif '|' in line:
+                conditionals.append(line)
+            elif line.startswith('{'):
+                forbiddens.append(line)
+    return(parameters, conditionals, forbiddens)
+
+
+class RandomConfigurations(object):
+    """
+    Draws configurations uniformly from the pcs file, starting with the default.
+    """
+
+    def __init__(self, pcs_fn, seed):
+        import numpy as np
+        from pysmac.numpy_backend import SearchSpace
+        parameters, conditionals, forbiddens = read_pcs_file(pcs_fn)
+        try:
+            self.space = SearchSpace(parameters, conditionals, forbiddens)
+        except ValueError:
+            # the advanced forbidden syntax is not supported
+            self.space = SearchSpace(parameters, conditionals, [])
+        self.rng = np.random.RandomState(seed)
+        self.first = True
+
+    def __next__(self):
+        if self.first:
+            self.first = False
+            return(self.space.decode(self.space.default))
+        X = self.space.sample(self.rng, 1)
+        while len(X) == 0:
+            X = self.space.sample(self.rng, 1)
+        return(self.space.decode(X[0]))
+    next = __next__ # Python 2 backward compatibility
+
+
+def parse_arguments(argv):
+    """ Collects all '--name value' pairs of the command line into a dict."""
+    options = {}
+    i = 0
+    while i < len(argv):
+        if argv[i].startswith('--') and (i + 1 < len(argv)):
+            options[argv[i][2:]] = argv[i + 1]
+            i += 2
+        else:
+            i += 1
+    return(options)
+
+
+def read_options(argv):
+    """ The options of the scenario file, overwritten by the command line."""
+    arguments = parse_arguments(argv)
+    options = {}
+    with open(arguments['scenario-file'], 'r') as fh:
+        for line in fh:
+            if line.strip() != '':
+                name, value = (line.strip().split(' ', 1) + [''])[:2]
+                options[name] = value
+    options.update(arguments)
+    return(options)
+
+
+def messages(options, seed):
+    """ Generates the messages for pySMAC, either replayed or with random configurations."""
+    if options.get('replay-directory') is not None:
+        for message, result in read_transcript(transcript_filename(options['replay-directory'], seed)):
+            yield(message)
+        return
+
+    import numpy as np
+    rng = np.random.RandomState(seed)
+    configurations = RandomConfigurations(options['pcs-file'], seed)
+    with open(options['instances'], 'r') as fh:
+        instances = [l.split()[0] for l in fh if l.strip() != '']
+    cutoff = float(options.get('cutoff_time', 3600))
+    while True:
+        config = next(configurations)
+        instance = instances[rng.randint(len(instances))]
+        yield('%s 0 %s 2147483647 %i %s' % (instance, cutoff, rng.randint(2**31 - 1),
+              ' '.join(["-%s '%s'" % (k, v) for k, v in sorted(config.items())])))
+
+
+def configuration_of(message):
+    """ :returns: list -- the (name, value) pairs of a message's configuration, values as strings"""
+    tokens = message.replace("'", '').split()
+    return([(tokens[i][1:], tokens[i + 1]) for i in range(5, len(tokens), 2)])
+
+
+def read_answer(sock, terminated):
+    """ Reads pySMAC's answer to a configuration.
+
+    pySMAC reports the result before it stops a run, so after a SIGTERM
+    the answer is either already there or will never come.
+
+    :returns: str -- the answer, empty if there is none
+    """
+    sock.settimeout(0.1)
+    data = b''
+    while not data.endswith(b'\n'):
+        try:
+            chunk = sock.recv(4096)
+        except socket.timeout:
+            if terminated[0]:
+                return('')
+            continue
+        if len(chunk) == 0:
+            break
+        data += chunk
+    return(data.decode().strip())
+
+
+def run(options):
+    """ Sends configurations to pySMAC until the budget is exhausted and writes the trajectory.
+
+    :returns: dict -- with the keys 'evaluations' and 'wall_time'
+    """
+    port = int(options['ipc-remote-port'])
+    seed = int(options['seed'])
+    max_evaluations = int(options.get('runcount-limit', 2**31 - 1))
+    wallclock_limit = float(options['wallclock-limit']) if 'wallclock-limit' in options else None
+    scenario_name = '.'.join(os.path.basename(options['scenario-file']).split('.')[:-1])
+    output_dir = os.path.join(options['output-dir'], scenario_name)
+    try:
+        os.makedirs(output_dir)
+    except OSError:
+        # created by a parallel run
+        if not os.path.isdir(output_dir):
+            raise
+
+    # like SMAC, the run shuts down cleanly on SIGTERM: a result pySMAC
+    # sent before stopping the run is still added to the trajectory
+    terminated = [False]
+    def terminate(signum, frame):
+        terminated[0] = True
+    previous_handler = signal.signal(signal.SIGTERM, terminate)
+
+    start = time.time()
+    trajectory_fh = None
+    incumbent_value = None
+    num_incumbents = 0
+    evaluations = 0
+    for message in messages(options, seed):
+        if terminated[0] or (evaluations >= max_evaluations) or \
+                ((wallclock_limit is not None) and (time.time() - start > wallclock_limit)):
+            break
+        try:
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall((message + '\n').encode())
+            result = read_answer(sock, terminated)
+            sock.close()
+        except socket.error:
+            # pySMAC has stopped listening
+            break
+        if len(result) == 0:
+            break
+        evaluations += 1
+        # 'Result for SMAC: status, runtime, 0, value, 0'
+        fields = [f.strip() for f in result.split(':', 1)[1].split(',')]
+        value = float(fields[3])
+        # like in SMAC, the first configuration is the initial incumbent
+        if (num_incumbents == 0) or ((fields[0] in ('SAT', 'UNSAT')) and (value < incumbent_value)):
+            # every new incumbent is written immediately, so the trajectory
+            # is complete even if the run is stopped with SIGTERM
+            if trajectory_fh is None:
+                trajectory_fh = open(os.path.join(output_dir, 'traj-run-%i.txt' % seed), 'w')
+                trajectory_fh.write('"CPU Time Used","Estimated Training Performance","Wallclock Time","Incumbent ID","Automatic Configurator (CPU) Time","Configuration..."\n')
+            t = time.time() - start
+            num_incumbents += 1
+            incumbent_value = value
+            trajectory_fh.write(', '.join(['%f' % t, repr(value), '%f' % t, '%i' % num_incumbents, '0'] +
+                                          ["%s='%s'" % (k, v) for k, v in configuration_of(message)]) + '\n')
+            trajectory_fh.flush()
+
+    signal.signal(signal.SIGTERM, previous_handler)
+    if trajectory_fh is not None:
+        trajectory_fh.close()
+    return({'evaluations': evaluations, 'wall_time': time.time() - start})
+
+
+def main(argv=None):
+    options = read_options(sys.argv[1:] if argv is None else argv)
+    statistics = run(options)
+    if options.get('console-log-level', 'OFF') != 'OFF':
+        print('Fake SMAC: %i evaluations in %f seconds (%f per second)' % (
+            statistics['evaluations'], statistics['wall_time'],
+            statistics['evaluations'] / max(statistics['wall_time'], 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,67 @@
 import os
+import json
 
+import pysmac
 import pysmac.remote_smac
 
-def check_java_version(java_executable="java"):
+
+# results of the Java check and the classpath computed in this process
+_memory_cache = {}
+
+
+def cache_filename():
+    """
+    The file in which the results of the Java check are cached.
+    
+    The cache persists across Python processes, so short-lived jobs do not
+    have to start Java just to check its version every time.
+    """
+    cache_dir = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return(os.path.join(cache_dir, 'pysmac', 'java_helper.json'))
+
+
+def _read_cache():
+    try:
+        with open(cache_filename(), 'r') as fh:
+            return(json.load(fh))
+    except (IOError, OSError, ValueError):
+        return({})
+
+
+def _write_cache(key, value):
+    # the cache is only an optimization, so failing to write it is no problem
+    cache = _read_cache()
+    cache[key] = value
+    fn = cache_filename()
+    tmp_fn = '%s.%i' % (fn, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(fn)):
+            os.makedirs(os.path.dirname(fn))
+        with open(tmp_fn, 'w') as fh:
+            json.dump(cache, fh)
+        os.rename(tmp_fn, fn)
+    except (IOError, OSError):
+        pass
+
+
+def _java_cache_key(java_executable):
+    """
+    Key identifying a Java installation: the command, the resolved binary and its modification time.
+    
+    :returns: str -- the key, or None if the binary can not be found
+    """
+    try:
+        from shutil import which
+    except ImportError: # Python 2 backward compatibility
+        from distutils.spawn import find_executable as which
+    binary = which(java_executable.split()[0])
+    if binary is None:
+        return(None)
+    binary = os.path.realpath(binary)
+    return('java %s %s %s %s' % (pysmac.__version__, java_executable, binary, os.path.getmtime(binary)))
+
+
+def check_java_version(java_executable="java", use_cache=True):
     """
     Small function to ensure that Java (version >= 7) was found.
     
@@ -10,10 +69,21 @@ def check_java_version(java_executable="java"):
     adequate version (>7) has been found. It raises a RuntimeError
     exception if no JRE or an out-dated version was found.
     
+    A successful check is cached (see :py:func:`cache_filename`) for the
+    resolved Java binary, its modification time and the pysmac version, so
+    Java is only started again if one of them changes.
+    
     :param java_executable: callable Java binary. It is possible to pass additional options via this argument to the JRE, e.g. "java -Xmx128m" is a valid argument.
     :type  java_executable: str
+    :param use_cache: whether a cached result of a previous check can be used.
+    :type use_cache: bool
     :raises: RuntimeError
     """
+    key = _java_cache_key(java_executable) if use_cache else None
+    if key is not None and (_memory_cache.get(key) or _read_cache().get(key)):
+        _memory_cache[key] = True
+        return
+    
     import re
     from subprocess import STDOUT, check_output
     
@@ -35,21 +105,32 @@ def check_java_version(java_executable="java"):
             error = True
     if error:
         raise RuntimeError(error_msg)
+    
+    if key is not None:
+        _memory_cache[key] = True
+        _write_cache(key, True)
 
 
 def smac_classpath():
     """
     Small function gathering all information to build the java class path.
     
+    The classpath only depends on the installation of pysmac, so it is
+    computed once per process. It is not cached on disk, because a cached
+    classpath would point to the wrong files after pysmac was installed
+    somewhere else.
+    
     :returns: string representing the Java classpath for SMAC
     
     """
     import multiprocessing
-    from pkg_resources import resource_filename
     
     logger = multiprocessing.get_logger()
     
-    smac_folder = resource_filename("pysmac", 'smac/%s' % pysmac.remote_smac.SMAC_VERSION)
+    smac_folder = os.path.join(os.path.dirname(os.path.abspath(pysmac.__file__)), 'smac', pysmac.remote_smac.SMAC_VERSION)
+    key = 'classpath %s' % smac_folder
+    if key in _memory_cache:
+        return(_memory_cache[key])
     
     smac_conf_folder = os.path.join(smac_folder, "conf")
     smac_patches_folder = os.path.join(smac_folder, "patches")
@@ -58,14 +139,14 @@ def smac_classpath():
 
     classpath = [fname for fname in os.listdir(smac_lib_folder) if fname.endswith(".jar")]
     classpath = [os.path.join(smac_lib_folder, fname) for fname in classpath]
-    classpath = [os.path.abspath(fname) for fname in classpath]
-    classpath.append(os.path.abspath(smac_conf_folder))
-    classpath.append(os.path.abspath(smac_patches_folder))
+    classpath.append(smac_conf_folder)
+    classpath.append(smac_patches_folder)
 
     # For Windows compability
     classpath = (os.pathsep).join(classpath)
 
     logger.debug("SMAC classpath: %s", classpath)
+    
+    _memory_cache[key] = classpath
 
     return classpath
-
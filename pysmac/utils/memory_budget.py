@@ -0,0 +1,141 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import time
+import multiprocessing
+
+
+DEFAULT_JVM_RESERVATION_MB = 1024
+""" The memory reserved for a SMAC process if no limit for the JVM was set."""
+
+MEMORY_TIMEOUT_S = 60
+""" How long (in seconds) an evaluation waits for memory before its SMAC run is aborted."""
+
+
+def available_memory_mb():
+    """ The memory available for new processes without swapping (Linux only).
+
+    :returns: float -- MemAvailable from /proc/meminfo in MB, or None if unknown
+    """
+    try:
+        with open('/proc/meminfo') as fh:
+            for line in fh:
+                if line.startswith('MemAvailable:'):
+                    return(int(line.split()[1]) / 1024.)
+    except (IOError, OSError):
+        pass
+    return(None)
+
+
+def process_tree_memory_mb(root_pid=None):
+    """ Sums the resident set size of all descendants of a process (Linux only).
+
+    :param root_pid: the process whose descendants are measured. None means the calling process.
+    :type root_pid: int
+    :returns: float -- the total resident memory of all descendants in MB, 0 if it can not be determined
+    """
+    root_pid = os.getpid() if root_pid is None else root_pid
+    if not os.path.isdir('/proc'):
+        return(0.)
+
+    children = {}
+    rss = {}
+    page_size_mb = os.sysconf('SC_PAGE_SIZE') / 1024. / 1024.
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % name) as fh:
+                # the process name can contain spaces, but is in parenthesis
+                ppid = int(fh.read().rsplit(')', 1)[1].split()[1])
+            with open('/proc/%s/statm' % name) as fh:
+                rss[int(name)] = int(fh.read().split()[1]) * page_size_mb
+        except (IOError, OSError, IndexError, ValueError):
+            # the process terminated in the meantime
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    total = 0.
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0.)
+        stack.extend(children.get(pid, []))
+    return(total)
+
+
+class MemoryBudget(object):
+    """
+    Admission control for SMAC runs based on a total memory budget.
+
+    Every run reserves the memory for its JVM and for the function it
+    evaluates (one evaluation at a time). A new run is only admitted if the
+    larger of the reserved and the actually measured memory of all running
+    runs plus the new reservation fits into the budget. If nothing is
+    running, a run is always admitted, so a single run exceeding the budget
+    can not block the optimization forever.
+    """
+
+    def __init__(self, budget_mb, mem_limit_smac_mb=None, mem_limit_function_mb=None):
+        """
+        :param budget_mb: the total memory (in MB) all SMAC runs and their function evaluations can use
+        :type budget_mb: float
+        :param mem_limit_smac_mb: the memory limit for every JVM. If None, :py:data:`DEFAULT_JVM_RESERVATION_MB` is reserved.
+        :type mem_limit_smac_mb: int
+        :param mem_limit_function_mb: the memory limit for every function evaluation. If None, only the measured memory is taken into account.
+        :type mem_limit_function_mb: int
+        """
+        self.budget_mb = budget_mb
+        self.run_reservation_mb = (DEFAULT_JVM_RESERVATION_MB if mem_limit_smac_mb is None else mem_limit_smac_mb) +\
+                                  (0 if mem_limit_function_mb is None else mem_limit_function_mb)
+        """ The memory reserved for every SMAC run."""
+        self.__logger = multiprocessing.get_logger()
+        if self.run_reservation_mb > self.budget_mb:
+            self.__logger.warning('A single SMAC run reserves %i MB, but the total memory budget is only %i MB.',
+                                  self.run_reservation_mb, self.budget_mb)
+
+    def can_admit(self, num_running):
+        """ Decides whether one more SMAC run can be started.
+
+        :param num_running: number of currently running SMAC runs
+        :type num_running: int
+        :returns: bool -- True if the new run fits into the budget
+        """
+        if num_running == 0:
+            return(True)
+        in_use = max(num_running * self.run_reservation_mb, process_tree_memory_mb())
+        return(in_use + self.run_reservation_mb <= self.budget_mb)
+
+
+def wait_for_memory(required_mb, budget_mb, root_pid=None, timeout_s=None, poll_interval_s=0.5):
+    """ Blocks until an evaluation fits into the total memory budget.
+
+    This is used inside the SMAC runs before every function evaluation, so
+    evaluations are queued instead of exceeding the budget the scheduler
+    admits the runs with (see :py:class:`MemoryBudget`). The evaluation
+    fits if the measured memory of all SMAC runs plus its own limit is
+    within the budget, and the system has that much memory available.
+    After the timeout, the evaluation is not started at all.
+
+    :param required_mb: the memory (in MB) the evaluation needs
+    :type required_mb: float
+    :param budget_mb: the total memory (in MB) all SMAC runs and their function evaluations can use
+    :type budget_mb: float
+    :param root_pid: the process that started the SMAC runs, see :py:func:`process_tree_memory_mb`. None means the calling process.
+    :type root_pid: int
+    :param timeout_s: maximum time (in seconds) to wait, None means :py:data:`MEMORY_TIMEOUT_S`
+    :type timeout_s: float
+    :returns: bool -- True if the evaluation can be started, False if the memory did not become available in time
+    """
+    timeout_s = MEMORY_TIMEOUT_S if timeout_s is None else timeout_s
+    start = time.time()
+    while True:
+        in_use = process_tree_memory_mb(root_pid)
+        available = available_memory_mb()
+        if (in_use + required_mb <= budget_mb) and ((available is None) or (available >= required_mb)):
+            return(True)
+        if time.time() - start >= timeout_s:
+            multiprocessing.get_logger().warning('The evaluation needs %i MB, but %i MB of the budget of %i MB are in use for %i seconds.',
+                                                 required_mb, in_use, budget_mb, timeout_s)
+            return(False)
+        time.sleep(poll_interval_s)
@@ -21,4 +21,49 @@ class NoDaemonProcess(multiprocessing.Process):
 
 class MyPool(multiprocessing.pool.Pool):
     """Subclass to use the NoDeamonProcesses as workers in a Pool."""
-    Process = NoDaemonProcess
+    def Process(self, *args, **kwds):
+        # Python >= 3.8 passes the context as the first positional argument
+        return NoDaemonProcess(**kwds)
+
+
+class NoDaemonMixin(object):
+    """Makes any process class of a multiprocessing context a non-daemon, like NoDaemonProcess."""
+    def _get_daemon(self):
+        return False
+    def _set_daemon(self, value):
+        pass
+    daemon = property(_get_daemon, _set_daemon)
+
+# The process classes have to be defined on module level, because the
+# 'spawn' and 'forkserver' start methods pickle the process object.
+NO_DAEMON_PROCESSES = {}
+"""The non-daemonic process class for every start method available on this platform."""
+try:
+    _start_methods = multiprocessing.get_all_start_methods()
+except AttributeError:
+    # Python 2 only knows the platform's default
+    _start_methods = []
+if 'fork' in _start_methods:
+    class NoDaemonForkProcess(NoDaemonMixin, multiprocessing.get_context('fork').Process):
+        pass
+    NO_DAEMON_PROCESSES['fork'] = NoDaemonForkProcess
+if 'spawn' in _start_methods:
+    class NoDaemonSpawnProcess(NoDaemonMixin, multiprocessing.get_context('spawn').Process):
+        pass
+    NO_DAEMON_PROCESSES['spawn'] = NoDaemonSpawnProcess
+if 'forkserver' in _start_methods:
+    class NoDaemonForkServerProcess(NoDaemonMixin, multiprocessing.get_context('forkserver').Process):
+        pass
+    NO_DAEMON_PROCESSES['forkserver'] = NoDaemonForkServerProcess
+
+
+class ContextPool(multiprocessing.pool.Pool):
+    """Like MyPool, but the workers are started with the given start method ('fork', 'spawn' or 'forkserver')."""
+    def __init__(self, processes, start_method):
+        if start_method not in NO_DAEMON_PROCESSES:
+            raise ValueError('The start method {} is not available on this platform!'.format(start_method))
+        self.__process_class = NO_DAEMON_PROCESSES[start_method]
+        super(ContextPool, self).__init__(processes, context=multiprocessing.get_context(start_method))
+
+    def Process(self, *args, **kwds):
+        return self.__process_class(**kwds)
@@ -0,0 +1,92 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import resource
+
+
+def maxrss_to_mb(maxrss):
+    """ Converts the ru_maxrss field of getrusage into MB.
+
+    Linux reports the value in kilobytes, but Mac OS X in bytes.
+    """
+    if sys.platform == 'darwin':
+        return(maxrss / 1024. / 1024.)
+    return(maxrss / 1024.)
+
+
+def current_rss_mb():
+    """ The current resident set size of the calling process in MB (the peak if the current value is unknown)."""
+    try:
+        with open('/proc/self/statm', 'r') as fh:
+            pages = int(fh.read().split()[1])
+        return(pages * os.sysconf('SC_PAGE_SIZE') / 1024. / 1024.)
+    except (IOError, OSError, ValueError, IndexError):
+        return(maxrss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def peak_rss_mb(baseline_mb=0.):
+    """ The peak resident set size of the calling process and all its reaped children in MB.
+
+    This is called inside the subprocess executing the user's function,
+    right after the function returned. A forked subprocess starts with the
+    resident pages of its parent, and the kernel counts them towards its
+    peak. Pass the resident set size taken when the function started as
+    baseline_mb to get the memory the function itself added.
+
+    :param baseline_mb: subtracted from the peak (the result is at least 0)
+    :type baseline_mb: float
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return(max(maxrss_to_mb(max(own, children)) - baseline_mb, 0.))
+
+
+def process_cpu_time():
+    """ The CPU time (user + system, in seconds) of the calling process and all its reaped children.
+
+    Like :py:func:`peak_rss_mb`, this is called inside the subprocess
+    executing the user's function, so it only contains that evaluation,
+    even if other evaluations run in threads of the same parent process.
+    """
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return(sum([u.ru_utime + u.ru_stime for u in usage]))
+
+
+class child_usage(object):
+    """
+    Measures the resources used by the subprocesses reaped in between two calls.
+
+    The kernel accumulates the resource usage of all terminated and waited
+    for children (the same information wait4 reports per child). Taking
+    the difference of these counters before and after a single evaluation
+    yields exactly the CPU time of that evaluation's subprocess, even if it
+    was killed because it exceeded a limit. The peak memory is only known
+    if the subprocess exceeded the peak of all previous children, because
+    the kernel only keeps the maximum. Like for :py:func:`peak_rss_mb`, the
+    resident set size the forked subprocess inherits (the one of this
+    process when the measurement starts) is subtracted from it.
+
+    The counters belong to the whole process: if several evaluations run
+    in threads of the same process, every difference also contains the
+    subprocesses of the other threads reaped in between.
+    """
+
+    def __init__(self):
+        self.start = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.baseline_mb = current_rss_mb()
+        self.end = None
+
+    def stop(self):
+        self.end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return(self)
+
+    def cpu_time(self):
+        """ :returns: float -- user plus system time (in seconds) of the children reaped in between."""
+        return((self.end.ru_utime - self.start.ru_utime) + (self.end.ru_stime - self.start.ru_stime))
+
+    def peak_rss_mb(self):
+        """ :returns: float -- the peak resident set size in MB, or None if it is not known."""
+        if self.end.ru_maxrss > self.start.ru_maxrss:
+            return(max(maxrss_to_mb(self.end.ru_maxrss) - self.baseline_mb, 0.))
+        return(None)
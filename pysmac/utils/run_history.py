@@ -0,0 +1,266 @@
+from __future__ import print_function, division, absolute_import
+
+
+STATUS_NAMES = ('SAT', 'UNSAT', 'TIMEOUT', 'CRASHED', 'ABORT')
+""" The status of a run is stored as its index in this tuple."""
+
+
+class RunHistory(object):
+    """
+    Stores all evaluations of one or more SMAC runs in NumPy arrays.
+
+    Every evaluation is one row in the columns :py:attr:`config_ids`,
+    :py:attr:`instances`, :py:attr:`instance_seeds`, :py:attr:`budgets`,
+    :py:attr:`values`, :py:attr:`statuses`, :py:attr:`runtimes` and
+    :py:attr:`run_seeds`. The configurations are stored once, and the
+    aggregates per configuration (number of runs, mean value, number of
+    censored runs) are updated whenever a result is added. The arrays grow
+    geometrically, so adding a run takes amortized constant time.
+
+    With multi-fidelity optimization a configuration is evaluated on several
+    budgets, and values on different budgets are not comparable. The
+    aggregates therefore only cover the runs on the highest budget a
+    configuration was evaluated on (see :py:attr:`config_budgets`). The mean
+    only includes SAT and UNSAT runs, so the timeout quality of censored or
+    crashed runs does not distort it.
+
+    Every SMAC run builds its own history, and minimize merges them into
+    :py:attr:`pysmac.optimizer.SMAC_optimizer.run_history`.
+    """
+
+    # numpy is only imported when a history is used, to keep importing pysmac fast
+    __columns = (('config_ids', 'int32'), ('instances', 'int32'), ('instance_seeds', 'int64'),
+                 ('budgets', 'float64'), ('values', 'float64'), ('statuses', 'int8'),
+                 ('runtimes', 'float64'), ('run_seeds', 'int64'))
+
+    def __init__(self, capacity=1024):
+        """
+        :param capacity: initial number of runs the arrays can hold
+        :type capacity: int
+        """
+        import numpy as np
+        self.num_runs = 0
+        self.configurations = []
+        """ The configurations (dicts) in the order they were first evaluated. A configuration's id is its index."""
+        self.__config_ids = {}
+        self.__data = dict([(name, np.zeros(max(int(capacity), 1), dtype=dtype)) for name, dtype in self.__columns])
+        self.__count = np.zeros(0, dtype=np.int64)
+        self.__sum = np.zeros(0, dtype=np.float64)
+        self.__num_values = np.zeros(0, dtype=np.int64)
+        self.__num_censored = np.zeros(0, dtype=np.int64)
+        # the budget the aggregates refer to, -inf for runs without a budget
+        self.__top_budget = np.zeros(0, dtype=np.float64)
+        self.__indices = {}
+
+    @staticmethod
+    def key(configuration):
+        """ A hashable representation of a configuration."""
+        return(tuple(sorted(configuration.items())))
+
+    def __getattr__(self, name):
+        # the columns are read-only views of the filled part of the arrays
+        data = self.__dict__.get('_RunHistory__data')
+        if (data is not None) and (name in data):
+            view = data[name][:self.num_runs]
+            view.flags.writeable = False
+            return(view)
+        raise AttributeError(name)
+
+    def config_id(self, configuration):
+        """ :returns: int -- the id of the configuration, or None if it was never evaluated"""
+        return(self.__config_ids.get(self.key(configuration)))
+
+    def __add_configuration(self, configuration):
+        import numpy as np
+        k = self.key(configuration)
+        cid = self.__config_ids.get(k)
+        if cid is None:
+            cid = len(self.configurations)
+            self.__config_ids[k] = cid
+            self.configurations.append(dict(configuration))
+            if cid >= len(self.__count):
+                size = max(2 * len(self.__count), 16)
+                self.__count = np.concatenate([self.__count, np.zeros(size - len(self.__count), dtype=np.int64)])
+                self.__sum = np.concatenate([self.__sum, np.zeros(size - len(self.__sum))])
+                self.__num_values = np.concatenate([self.__num_values, np.zeros(size - len(self.__num_values), dtype=np.int64)])
+                self.__num_censored = np.concatenate([self.__num_censored, np.zeros(size - len(self.__num_censored), dtype=np.int64)])
+                self.__top_budget = np.concatenate([self.__top_budget, np.full(size - len(self.__top_budget), -np.inf)])
+        return(cid)
+
+    def __reserve(self, num_runs):
+        import numpy as np
+        capacity = len(self.__data['values'])
+        if num_runs > capacity:
+            capacity = max(2 * capacity, num_runs)
+            for name in self.__data:
+                column = np.zeros(capacity, dtype=self.__data[name].dtype)
+                column[:self.num_runs] = self.__data[name][:self.num_runs]
+                self.__data[name] = column
+        # new rows invalidate the indices
+        self.__indices = {}
+
+    def add(self, configuration, result_dict, instance=0, instance_seed=0, budget=float('nan'), run_seed=0):
+        """ Adds the result of a single evaluation.
+
+        :param configuration: the parameters of the function (without instance, seed and budget)
+        :type configuration: dict
+        :param result_dict: the result reported to SMAC, with the keys 'value', 'status' and 'runtime'
+        :type result_dict: dict
+        :param instance: the index of the instance
+        :type instance: int
+        :param instance_seed: the seed passed to the function
+        :type instance_seed: int
+        :param budget: the budget passed to the function (NaN without multi-fidelity optimization)
+        :type budget: float
+        :param run_seed: the seed of the SMAC run
+        :type run_seed: int
+        """
+        import numpy as np
+        status = STATUS_NAMES.index(result_dict['status'])
+        value = np.nan if result_dict['value'] is None else float(result_dict['value'])
+        cid = self.__add_configuration(configuration)
+
+        self.__reserve(self.num_runs + 1)
+        i = self.num_runs
+        row = (cid, instance, instance_seed, budget, value, status, result_dict['runtime'], run_seed)
+        for (name, _), v in zip(self.__columns, row):
+            self.__data[name][i] = v
+        self.num_runs += 1
+
+        b = -np.inf if np.isnan(budget) else budget
+        if b > self.__top_budget[cid]:
+            # the runs on lower budgets no longer count
+            self.__top_budget[cid] = b
+            self.__count[cid] = self.__sum[cid] = self.__num_values[cid] = self.__num_censored[cid] = 0
+        if b == self.__top_budget[cid]:
+            self.__count[cid] += 1
+            if (STATUS_NAMES[status] in ('SAT', 'UNSAT')) and np.isfinite(value):
+                self.__sum[cid] += value
+                self.__num_values[cid] += 1
+            if STATUS_NAMES[status] == 'TIMEOUT':
+                self.__num_censored[cid] += 1
+
+    def merge(self, other):
+        """ Appends all runs of another RunHistory, identical configurations share their id.
+
+        :param other: the history of another SMAC run
+        :type other: RunHistory
+        """
+        import numpy as np
+        if other.num_runs == 0:
+            return
+        mapping = np.array([self.__add_configuration(c) for c in other.configurations], dtype=np.int32)
+        start = self.num_runs
+        self.__reserve(start + other.num_runs)
+        for name, _ in self.__columns:
+            self.__data[name][start:start + other.num_runs] = getattr(other, name)
+        self.__data['config_ids'][start:start + other.num_runs] = mapping[other.config_ids]
+        self.num_runs += other.num_runs
+        self.__aggregate()
+
+    def __aggregate(self):
+        import numpy as np
+        # recomputes the aggregates of all configurations from the columns
+        n = len(self.__count)
+        cids = self.config_ids
+        budgets = np.where(np.isnan(self.budgets), -np.inf, self.budgets)
+        self.__top_budget = np.full(n, -np.inf)
+        np.maximum.at(self.__top_budget, cids, budgets)
+        top = budgets == self.__top_budget[cids]
+        valid = top & np.isfinite(self.values) & (self.statuses <= STATUS_NAMES.index('UNSAT'))
+        censored = top & (self.statuses == STATUS_NAMES.index('TIMEOUT'))
+        self.__count = np.bincount(cids[top], minlength=n).astype(np.int64)
+        self.__sum = np.bincount(cids[valid], weights=self.values[valid], minlength=n)
+        self.__num_values = np.bincount(cids[valid], minlength=n).astype(np.int64)
+        self.__num_censored = np.bincount(cids[censored], minlength=n).astype(np.int64)
+
+    def __index(self, name):
+        import numpy as np
+        # sorting once makes every lookup a binary search, until new runs are added
+        if name not in self.__indices:
+            column = getattr(self, name)
+            order = np.argsort(column, kind='mergesort')
+            self.__indices[name] = (order, column[order])
+        return(self.__indices[name])
+
+    def __lookup(self, name, value):
+        import numpy as np
+        order, sorted_column = self.__index(name)
+        return(order[np.searchsorted(sorted_column, value, 'left'):np.searchsorted(sorted_column, value, 'right')])
+
+    def runs_of_configuration(self, configuration):
+        """ :returns: numpy.ndarray -- the (row) indices of all runs of the configuration (given as a dict or its id)"""
+        import numpy as np
+        cid = configuration if not isinstance(configuration, dict) else self.config_id(configuration)
+        if cid is None:
+            return(np.zeros(0, dtype=np.int64))
+        return(self.__lookup('config_ids', cid))
+
+    def runs_on_instance(self, instance):
+        """ :returns: numpy.ndarray -- the (row) indices of all runs on the instance with the given index"""
+        return(self.__lookup('instances', instance))
+
+    @property
+    def num_configurations(self):
+        return(len(self.configurations))
+
+    @property
+    def config_budgets(self):
+        """ The highest budget every configuration (indexed by id) was evaluated on, NaN without multi-fidelity optimization."""
+        import numpy as np
+        budgets = self.__top_budget[:self.num_configurations]
+        return(np.where(np.isinf(budgets), np.nan, budgets))
+
+    @property
+    def config_counts(self):
+        """ The number of runs of every configuration (indexed by id) on its highest budget."""
+        return(self.__count[:self.num_configurations].copy())
+
+    @property
+    def config_means(self):
+        """ The mean value of the SAT and UNSAT runs of every configuration (indexed by id) on its highest budget, NaN if there are none."""
+        import numpy as np
+        count = self.__num_values[:self.num_configurations]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return(np.where(count > 0, self.__sum[:self.num_configurations] / np.maximum(count, 1), np.nan))
+
+    @property
+    def config_censored(self):
+        """ The number of timed out (censored) runs of every configuration (indexed by id) on its highest budget."""
+        return(self.__num_censored[:self.num_configurations].copy())
+
+    def best_configuration(self, min_runs=1):
+        """ The configuration with the lowest mean value.
+
+        Only configurations evaluated on the highest budget in the history
+        compete, a low value on a small budget says little about the full one.
+
+        :param min_runs: only configurations with at least this many runs (on their highest budget) are considered
+        :type min_runs: int
+        :returns: tuple -- (mean value, configuration as a dict), or None if no configuration qualifies
+        """
+        import numpy as np
+        means = self.config_means
+        means[self.config_counts < min_runs] = np.nan
+        budgets = self.__top_budget[:self.num_configurations]
+        if len(budgets) > 0:
+            means[budgets < budgets.max()] = np.nan
+        if np.all(np.isnan(means)):
+            return(None)
+        cid = int(np.nanargmin(means))
+        return(float(means[cid]), dict(self.configurations[cid]))
+
+    def __len__(self):
+        return(self.num_runs)
+
+    def __getstate__(self):
+        # only the filled part of the arrays is sent between processes
+        state = self.__dict__.copy()
+        state['_RunHistory__data'] = dict([(name, getattr(self, name).copy()) for name in self.__data])
+        state['_RunHistory__indices'] = {}
+        return(state)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if len(self.__data['values']) == 0:
+            self.__reserve(1)
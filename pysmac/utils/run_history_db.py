@@ -0,0 +1,261 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import multiprocessing
+
+
+STATUS_CODES = {2: 'SAT', 1: 'UNSAT', 0: 'TIMEOUT', -1: 'CRASHED'}
+""" Maps the status codes of :py:func:`pysmac.utils.smac_output_readers.read_runs_and_results_file` to their names."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS configurations (
+    hash TEXT PRIMARY KEY,
+    configuration TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    study TEXT NOT NULL,
+    seed INTEGER,
+    config_hash TEXT NOT NULL,
+    instance TEXT,
+    instance_seed INTEGER,
+    budget REAL,
+    value REAL,
+    status TEXT,
+    runtime REAL,
+    timestamp REAL,
+    replayed INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS runs_config_hash ON runs (config_hash);
+CREATE INDEX IF NOT EXISTS runs_instance ON runs (instance);
+CREATE INDEX IF NOT EXISTS runs_study ON runs (study);
+CREATE INDEX IF NOT EXISTS runs_seed ON runs (seed);
+"""
+
+
+def configuration_hash(configuration):
+    """ A hash identifying a configuration independent of the order and type of its values.
+
+    All values are converted to strings first, so configurations read from
+    SMAC's files (which only contain strings) and the typed ones from the
+    evaluation loop get the same hash.
+
+    :param configuration: maps parameter names to values
+    :type configuration: dict
+    :returns: str -- the hexadecimal SHA1 hash
+    """
+    normalized = json.dumps(sorted([(k, str(v)) for k, v in list(configuration.items())]))
+    return(hashlib.sha1(normalized.encode()).hexdigest())
+
+
+def connect(fn):
+    """ Opens (and if necessary creates) a run history database.
+
+    The database is in write-ahead-logging mode, so the SMAC runs can
+    write to it concurrently while it is queried.
+
+    :param fn: the database file
+    :type fn: str
+    :returns: sqlite3.Connection
+    """
+    connection = sqlite3.connect(fn, timeout=60)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(_SCHEMA)
+    # databases created before results were tagged as replayed
+    if 'replayed' not in [row[1] for row in connection.execute('PRAGMA table_info(runs)')]:
+        with connection:
+            connection.execute('ALTER TABLE runs ADD COLUMN replayed INTEGER NOT NULL DEFAULT 0')
+    return(connection)
+
+
+def insert_runs(connection, runs):
+    """ Inserts many runs in a single transaction.
+
+    :param runs: dicts with the keys 'study', 'seed', 'configuration', 'instance', 'instance_seed', 'budget', 'value', 'status', 'runtime' and 'timestamp' (all but the first three may be None), and optionally 'replayed' (whether the result was replayed when resuming an interrupted call of minimize)
+    :type runs: list of dicts
+    """
+    configurations = {}
+    rows = []
+    for run in runs:
+        h = configuration_hash(run['configuration'])
+        configurations[h] = json.dumps(run['configuration'], sort_keys=True)
+        rows.append((run['study'], run['seed'], h, run.get('instance'), run.get('instance_seed'),
+                     run.get('budget'), run.get('value'), run.get('status'), run.get('runtime'),
+                     run.get('timestamp'), int(bool(run.get('replayed')))))
+    with connection:
+        connection.executemany('INSERT OR IGNORE INTO configurations (hash, configuration) VALUES (?, ?)',
+                               list(configurations.items()))
+        connection.executemany('INSERT INTO runs (study, seed, config_hash, instance, instance_seed, budget,'
+                               ' value, status, runtime, timestamp, replayed) VALUES (?,?,?,?,?,?,?,?,?,?,?)', rows)
+
+
+class RunHistoryWriter(object):
+    """
+    Buffers the evaluations of one SMAC run and writes them in batches.
+
+    A transaction per evaluation would make SQLite's fsync the bottleneck
+    for cheap functions. Instead, the runs are written whenever batch_size
+    of them accumulated, or flush_interval_s passed since the last write.
+    """
+
+    def __init__(self, fn, study, seed, batch_size=100, flush_interval_s=5):
+        """
+        :param fn: the database file
+        :type fn: str
+        :param study: name of the study (e.g. one call of minimize)
+        :type study: str
+        :param seed: the seed of the SMAC run
+        :type seed: int
+        :param batch_size: number of runs written in one transaction
+        :type batch_size: int
+        :param flush_interval_s: maximum time (in seconds) a run stays in the buffer
+        :type flush_interval_s: float
+        """
+        self.__connection = connect(fn)
+        self.study = study
+        self.seed = seed
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.__buffer = []
+        self.__last_flush = time.time()
+
+    def add(self, config_dict, result_dict):
+        """ Records the evaluation of a configuration.
+
+        :param config_dict: the arguments of the function, including 'instance', 'seed' and 'budget' if present
+        :type config_dict: dict
+        :param result_dict: the result reported to SMAC
+        :type result_dict: dict
+        """
+        configuration = dict([(k, v) for k, v in list(config_dict.items()) if k not in ('instance', 'seed', 'budget')])
+        self.__buffer.append({'study': self.study, 'seed': self.seed, 'configuration': configuration,
+                              'instance': 'id_%i' % config_dict.get('instance', 0),
+                              'instance_seed': config_dict.get('seed'),
+                              'budget': config_dict.get('budget'),
+                              'value': result_dict['value'],
+                              'status': result_dict['status'],
+                              'runtime': result_dict['runtime'], 'timestamp': time.time(),
+                              'replayed': result_dict.get('replayed', False)})
+        if (len(self.__buffer) >= self.batch_size) or (time.time() - self.__last_flush >= self.flush_interval_s):
+            self.flush()
+
+    def flush(self):
+        """ Writes all buffered runs. """
+        if len(self.__buffer) > 0:
+            insert_runs(self.__connection, self.__buffer)
+            self.__buffer = []
+        self.__last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        self.__connection.close()
+
+
+def import_state_run_folder(fn, directory, study, seed=None):
+    """ Imports the runs of a state-run folder written by SMAC.
+
+    The folder is read with :py:func:`pysmac.utils.state_merge.read_sate_run_folder`.
+
+    :param fn: the database file
+    :type fn: str
+    :param directory: the state-run folder
+    :type directory: str
+    :param study: the name of the study the runs are stored under
+    :type study: str
+    :param seed: the seed of the SMAC run. None means it is taken from the folder name (state-run<seed>) if possible.
+    :type seed: int
+    :returns: int -- the number of imported runs
+    """
+    from .state_merge import read_sate_run_folder
+    configurations, instance_names, _, runs_and_results = read_sate_run_folder(directory)
+
+    if seed is None:
+        match = re.search(r'state-run(\d+)', os.path.basename(os.path.normpath(directory)))
+        seed = None if match is None else int(match.group(1))
+
+    # see read_runs_and_results_file for the columns
+    runs = []
+    for row in runs_and_results:
+        runs.append({'study': study, 'seed': seed,
+                     'configuration': configurations[int(row[0]) - 1],
+                     'instance': instance_names[int(row[1]) - 1][0],
+                     'instance_seed': int(row[5]),
+                     'value': float(row[9]),
+                     'status': STATUS_CODES.get(int(row[12]), 'CRASHED'),
+                     'runtime': float(row[6]),
+                     'timestamp': None})
+    connection = connect(fn)
+    try:
+        insert_runs(connection, runs)
+    finally:
+        connection.close()
+    multiprocessing.get_logger().debug('Imported %i runs from %s', len(runs), directory)
+    return(len(runs))
+
+
+class RunHistoryDatabase(object):
+    """
+    Queries the runs of (possibly many) studies stored in a run history database.
+    """
+
+    def __init__(self, fn):
+        """
+        :param fn: the database file, created by minimize or import_state_run_folder
+        :type fn: str
+        """
+        self.__connection = connect(fn)
+
+    def __where(self, study, seed, instance, configuration, successful_only):
+        clauses, arguments = [], []
+        for column, value in [('study', study), ('seed', seed), ('instance', instance)]:
+            if value is not None:
+                clauses.append('runs.%s = ?' % column)
+                arguments.append(value)
+        if configuration is not None:
+            clauses.append('runs.config_hash = ?')
+            arguments.append(configuration_hash(configuration))
+        if successful_only:
+            clauses.append("runs.status IN ('SAT', 'UNSAT')")
+        return((' WHERE ' + ' AND '.join(clauses)) if clauses else '', arguments)
+
+    def runs(self, study=None, seed=None, instance=None, configuration=None):
+        """ All runs matching the given criteria (None matches everything).
+
+        :returns: list of dicts -- with the columns of a run and the configuration as a dict
+        """
+        where, arguments = self.__where(study, seed, instance, configuration, False)
+        cursor = self.__connection.execute(
+            'SELECT runs.study, runs.seed, configurations.configuration, runs.instance, runs.instance_seed,'
+            ' runs.budget, runs.value, runs.status, runs.runtime, runs.timestamp, runs.replayed FROM runs'
+            ' JOIN configurations ON runs.config_hash = configurations.hash' + where + ' ORDER BY runs.id', arguments)
+        keys = ('study', 'seed', 'configuration', 'instance', 'instance_seed', 'budget', 'value', 'status', 'runtime', 'timestamp', 'replayed')
+        result = []
+        for row in cursor:
+            run = dict(zip(keys, row))
+            run['configuration'] = json.loads(run['configuration'])
+            run['replayed'] = bool(run['replayed'])
+            result.append(run)
+        return(result)
+
+    def best_configuration(self, study=None, seed=None, instance=None):
+        """ The successful run with the lowest value matching the given criteria.
+
+        :returns: tuple -- (value, configuration as a dict), or None if there is no such run
+        """
+        where, arguments = self.__where(study, seed, instance, None, True)
+        row = self.__connection.execute(
+            'SELECT runs.value, configurations.configuration FROM runs'
+            ' JOIN configurations ON runs.config_hash = configurations.hash' + where +
+            ' ORDER BY runs.value LIMIT 1', arguments).fetchone()
+        return(None if row is None else (row[0], json.loads(row[1])))
+
+    def studies(self):
+        """ :returns: list -- the names of all studies"""
+        return([row[0] for row in self.__connection.execute('SELECT DISTINCT study FROM runs ORDER BY study')])
+
+    def close(self):
+        self.__connection.close()
@@ -0,0 +1,238 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import glob
+import time
+import multiprocessing
+
+from .executors import ProcessExecutor
+from .smac_output_readers import read_trajectory_file
+
+
+def stop_file_name(directory, seed):
+    """ The file whose existence tells the SMAC run with the given seed to stop."""
+    return(os.path.join(directory, 'stop-run-%i' % seed))
+
+
+def incumbent_at(trajectory, wallclock_time):
+    """ Returns the estimated performance of the incumbent at a given time.
+
+    :param trajectory: the trajectory as returned by :py:func:`pysmac.utils.smac_output_readers.read_trajectory_file`
+    :type trajectory: list of dicts
+    :param wallclock_time: the time since the start of the run
+    :type wallclock_time: float
+    :returns: float -- the incumbent's performance, or None if the run had no incumbent at that time
+    """
+    value = None
+    for entry in trajectory:
+        if entry['Wallclock Time'] > wallclock_time:
+            break
+        value = entry['Estimated Training Performance']
+    return(value)
+
+
+class RunScheduler(object):
+    """
+    Executes the SMAC runs with an executor and optionally races them.
+
+    Runs are handed to the executor only when a slot is free, and their
+    results are collected in the order in which the runs finish. With racing enabled, the
+    scheduler periodically reads the trajectories of all running SMAC runs.
+    A run whose incumbent is worse than the best incumbent of all other
+    runs at the same wall clock time (by more than the threshold) is stopped,
+    and its slot is given to a run with a fresh seed.
+
+    If a CPU allocator is given, every run gets its own set of CPUs.
+
+    If a memory budget is given, runs are only started while they fit into
+    it; the others wait until enough memory is freed by finished runs.
+
+    If a deadline is given, no runs are started after it, all running runs
+    are asked to stop, and the remaining workers are terminated after a
+    grace period.
+    """
+
+    def __init__(self, num_procs, scenario_dir, stop_directory,
+                 racing=False, racing_threshold=0.1, racing_grace_period_s=60,
+                 racing_max_new_runs=None, poll_interval_s=1,
+                 deadline=None, deadline_grace_period_s=10, memory_budget=None,
+                 cpu_allocator=None, executor=None):
+        """
+        :param num_procs: number of SMAC runs executed in parallel
+        :type num_procs: int
+        :param scenario_dir: SMAC's output directory containing the trajectory files
+        :type scenario_dir: str
+        :param stop_directory: directory where the stop files for the individual runs are created
+        :type stop_directory: str
+        :param racing: whether dominated runs are stopped and replaced
+        :type racing: bool
+        :param racing_threshold: a run is dominated if its incumbent is worse than the best one by more than this fraction of the best one's absolute value
+        :type racing_threshold: float
+        :param racing_grace_period_s: minimum wall clock time (in seconds) a run can run before it can be stopped
+        :type racing_grace_period_s: float
+        :param racing_max_new_runs: maximum number of runs with fresh seeds that are started to replace stopped runs. None means as many as there are initial runs.
+        :type racing_max_new_runs: int
+        :param poll_interval_s: time between two checks of the runs' progress
+        :type poll_interval_s: float
+        :param deadline: the point in time (as returned by time.time()) when all runs have to be finished. None means no deadline.
+        :type deadline: float
+        :param deadline_grace_period_s: time (in seconds) the runs have to shut down after the deadline before they are terminated
+        :type deadline_grace_period_s: float
+        :param memory_budget: admission control for new runs. None means runs are started whenever a slot is free.
+        :type memory_budget: :py:class:`pysmac.utils.memory_budget.MemoryBudget`
+        :param cpu_allocator: hands out the CPUs for every run. None means the runs are not pinned to CPUs.
+        :type cpu_allocator: :py:class:`pysmac.utils.cpu_allocation.CPUAllocator`
+        :param executor: starts the individual runs. None means a pool of worker processes.
+        :type executor: :py:class:`pysmac.utils.executors.RunExecutor`
+        """
+        self.num_procs = num_procs
+        self.scenario_dir = scenario_dir
+        self.stop_directory = stop_directory
+        self.racing = racing
+        self.racing_threshold = racing_threshold
+        self.racing_grace_period_s = racing_grace_period_s
+        self.racing_max_new_runs = racing_max_new_runs
+        self.poll_interval_s = poll_interval_s
+        self.deadline = deadline
+        self.deadline_grace_period_s = deadline_grace_period_s
+        self.memory_budget = memory_budget
+        self.cpu_allocator = cpu_allocator
+        self.executor = ProcessExecutor() if executor is None else executor
+        if (cpu_allocator is not None) and (not self.executor.separate_processes):
+            raise ValueError('The runs can only be pinned to CPUs if every run has its own process!')
+        self.stopped_runs = []
+        """ The seeds of all runs stopped by the scheduler."""
+        self.__logger = multiprocessing.get_logger()
+
+    def trajectory(self, seed):
+        """ Reads the trajectory of a (possibly still running) SMAC run.
+
+        :returns: list of dicts -- the trajectory, empty if it can not be read (yet)
+        """
+        fn = os.path.join(self.scenario_dir, 'traj-run-%i.txt' % seed)
+        try:
+            return(read_trajectory_file(fn))
+        except (IOError, OSError, ValueError, IndexError):
+            # the file does not exist yet or the last line is incomplete
+            return([])
+
+    def stop_run(self, seed):
+        """ Tells the SMAC run with the given seed to stop after its current evaluation."""
+        open(stop_file_name(self.stop_directory, seed), 'w').close()
+        self.stopped_runs.append(seed)
+
+    def remove_stop_files(self):
+        """ Removes the stop files of all runs, e.g. those left by a previous call or an interrupted one."""
+        for fn in glob.glob(os.path.join(self.stop_directory, 'stop-run-*')):
+            try:
+                os.remove(fn)
+            except OSError:
+                pass
+
+    def dominated_runs(self, start_times):
+        """ Finds the running SMAC runs that are clearly worse than the others.
+
+        :param start_times: the start time of every running SMAC run
+        :type start_times: dict
+        :returns: list -- seeds of the dominated runs
+        """
+        now = time.time()
+        trajectories = dict([(s, self.trajectory(s)) for s in start_times])
+        dominated = []
+        for s in start_times:
+            elapsed = now - start_times[s]
+            if elapsed < self.racing_grace_period_s or s in self.stopped_runs:
+                continue
+            value = incumbent_at(trajectories[s], elapsed)
+            if value is None:
+                continue
+            # compare against the other runs at the same point in their run
+            others = [incumbent_at(trajectories[o], elapsed) for o in start_times if o != s]
+            others = [v for v in others if v is not None]
+            if len(others) == 0:
+                continue
+            best = min(others)
+            if value - best > self.racing_threshold * max(abs(best), 1e-10):
+                dominated.append(s)
+        return(dominated)
+
+    def run(self, function, make_arguments, seeds, next_seed=None, on_finished=None):
+        """ Executes the runs and blocks until all of them are finished.
+
+        :param function: the function executing a single run
+        :type function: callable
+        :param make_arguments: callable returning the argument for function given a seed and the list of CPUs assigned to the run (None without a CPU allocator)
+        :type make_arguments: callable
+        :param seeds: the seeds of the initial runs
+        :type seeds: list of ints
+        :param next_seed: the first seed for runs started while racing. None means the largest seed plus one.
+        :type next_seed: int
+        :param on_finished: called with the seed and the return value of function as soon as a run finishes
+        :type on_finished: callable
+        :returns: dict -- the return value of function for every seed (including the fresh seeds started while racing)
+        """
+        max_new_runs = len(seeds) if self.racing_max_new_runs is None else self.racing_max_new_runs
+        next_seed = max(seeds) + 1 if next_seed is None else next_seed
+        pending = list(seeds)
+        running = {}
+        start_times = {}
+        assigned_cpus = {}
+        results = {}
+
+        # a stop file of a previous call would stop the new run immediately
+        self.remove_stop_files()
+        executor = self.executor
+        executor.start(self.num_procs)
+        try:
+            while pending or running:
+                if (self.deadline is not None) and (time.time() >= self.deadline):
+                    if pending:
+                        self.__logger.warning('The total time budget is exhausted, %i runs were not started.', len(pending))
+                        pending = []
+                    for s in running:
+                        if s not in self.stopped_runs:
+                            self.stop_run(s)
+                    if time.time() >= self.deadline + self.deadline_grace_period_s:
+                        self.__logger.warning('Terminating %i runs that did not stop in time.', len(running))
+                        executor.terminate()
+                        self.remove_stop_files()
+                        return(results)
+                    if not running:
+                        break
+
+                while pending and len(running) < self.num_procs:
+                    if (self.memory_budget is not None) and (not self.memory_budget.can_admit(len(running))):
+                        self.__logger.debug('Not enough memory to start another run, %i runs are waiting.', len(pending))
+                        break
+                    s = pending.pop(0)
+                    if self.cpu_allocator is not None:
+                        assigned_cpus[s] = self.cpu_allocator.acquire()
+                    running[s] = executor.submit(function, make_arguments(s, assigned_cpus.get(s)))
+                    start_times[s] = time.time()
+
+                # wait for any run to finish, but not longer than the poll interval
+                finished = executor.wait(list(running.values()), self.poll_interval_s)
+
+                for s in [s for h in finished for s, r in list(running.items()) if r is h]:
+                    results[s] = running.pop(s).result()
+                    del start_times[s]
+                    if s in assigned_cpus:
+                        self.cpu_allocator.release(assigned_cpus.pop(s))
+                    if on_finished is not None:
+                        on_finished(s, results[s])
+
+                if self.racing:
+                    for s in self.dominated_runs(start_times):
+                        self.__logger.debug('Stopping dominated run with seed %i', s)
+                        self.stop_run(s)
+                        if max_new_runs > 0:
+                            pending.append(next_seed)
+                            next_seed += 1
+                            max_new_runs -= 1
+        except:
+            executor.terminate()
+            self.remove_stop_files()
+            raise
+        executor.shutdown()
+        self.remove_stop_files()
+        return(results)
@@ -1,10 +1,7 @@
 import json
 import functools
-import re
 import operator
 
-import numpy as np
-
 
 
 def json_parse(fileobj, decoder=json.JSONDecoder(), buffersize=2048):
@@ -26,6 +23,23 @@ def json_parse(fileobj, decoder=json.JSONDecoder(), buffersize=2048):
                 break
 
 
+def read_live_rundata_file(fn):
+    """ Reads a live-rundata-xx.json file written by SMAC in shared model mode.
+    
+    The first JSON object in such a file is the list of instances, every
+    following object describes one run performed by this SMAC run.
+    
+    :param fn: name of the file to read
+    :type fn: str
+    :returns: tuple -- (list of instances, list of dicts with the run data)
+    """
+    with open(fn, 'r') as fh:
+        objects = list(json_parse(fh))
+    if len(objects) == 0:
+        return([], [])
+    return(objects[0], objects[1:])
+
+
 def read_runs_and_results_file(fn):
     """ Converting a runs_and_results file into a numpy array.
     
@@ -48,6 +62,8 @@ def read_runs_and_results_file(fn):
     
     :returns: numpy_array(dtype = double) -- the data
     """
+    import numpy as np
+    
     # to convert everything into floats, the run result needs to be mapped
     def map_run_result(res):
          if b'TIMEOUT' in res:  return(0)
@@ -115,16 +131,31 @@ def read_validationObjectiveMatrix_file(fn):
     .. todo::
        testing of validation runs where more than the final incumbent is validated
     """
-    values = {}
+    instances, _, values = read_validation_matrix(fn)
+    return(dict(zip(instances.tolist(), values.tolist())))
+
+
+def read_validation_matrix(fn):
+    """ Reads a validationObjectiveMatrix file into NumPy arrays.
+    
+    The whole table is parsed by np.loadtxt instead of line by line in
+    Python, so large matrices are read quickly.
+    
+    :param fn: the name of the validationObjectiveMatrix file
+    :type fn: str
+    :returns: tuple -- (instance ids, seeds, values): two int arrays with one entry per instance, and a float array with one row per instance and one column per configuration
+    """
+    import numpy as np
     
-    with open(fn,'r') as fh:
-        header = fh.readline().split(",")
-        num_configs = len(header)-2
-        re_string = '\w?,\w?'.join(['"id\_(\d*)"', '"(\d*)"']  + ['"([0-9.]*)"']*num_configs)
-        for line in fh.readlines():
-            match = (re.match(re_string, line))
-            values[int(match.group(1))] = list(map(float,list(map(match.group, list(range(3,3+num_configs))))))
-    return(values)
+    try:
+        # numpy >= 1.23 removes the quotes itself, only 'id_' is stripped in Python
+        table = np.loadtxt(fn, delimiter=',', skiprows=1, quotechar='"', ndmin=2,
+                           converters={0: lambda s: s[3:]})
+    except TypeError:
+        table = np.char.strip(np.loadtxt(fn, dtype=str, delimiter=',', skiprows=1, ndmin=2), '"')
+        table[:,0] = np.char.replace(table[:,0], 'id_', '')
+        table = table.astype(np.double)
+    return(table[:,0].astype(int), table[:,1].astype(int), table[:,2:])
 
 
 def read_trajectory_file(fn):
@@ -171,6 +202,8 @@ def read_instance_features_file(fn):
     
     :returns: tuple -- first entry is a list of the feature names, second one is a dict with 'instance name' - 'numpy array containing the features' key-value pairs
     """
+    import numpy as np
+    
     instances = {}
     with open(fn,'r') as fh:
         lines = fh.readlines()
@@ -0,0 +1,90 @@
+from __future__ import print_function, division, absolute_import
+
+from math import floor, log
+
+
+class SuccessiveHalving(object):
+    """
+    Asynchronous successive halving for the configurations of a single SMAC run.
+
+    Every configuration proposed by SMAC is first evaluated on the smallest
+    budget. It is promoted to the next larger budget (eta times larger)
+    only if its value is among the best 1/eta fraction of all values
+    observed on the current budget so far. The first configuration on each
+    budget is always promoted, so SMAC sees some results on the largest
+    budget early on. Most configurations are discarded after the cheap
+    evaluations, and only the promising ones are evaluated on the full budget.
+
+    SMAC receives a single result per configuration, see
+    :py:meth:`combine`.
+    """
+
+    def __init__(self, min_budget, max_budget, eta=3):
+        """
+        :param min_budget: the smallest budget a configuration is evaluated on
+        :type min_budget: float
+        :param max_budget: the largest budget, usually corresponding to a full evaluation
+        :type max_budget: float
+        :param eta: the factor between consecutive budgets. Only the best 1/eta configurations are promoted.
+        :type eta: float
+        """
+        if min_budget <= 0 or max_budget < min_budget:
+            raise ValueError('The budgets have to satisfy 0 < min_budget <= max_budget!')
+        if eta <= 1:
+            raise ValueError('eta has to be larger than one!')
+        self.eta = eta
+
+        num_rungs = int(floor(log(max_budget/min_budget)/log(eta) + 1e-8)) + 1
+        self.budgets = [min_budget * eta**i for i in range(num_rungs - 1)] + [max_budget]
+        """ The budgets of all rungs in increasing order."""
+        # keep integers if the user specified integer budgets (e.g. epochs)
+        if isinstance(min_budget, int) and isinstance(max_budget, int):
+            self.budgets = [int(round(b)) for b in self.budgets]
+
+        self.rungs = [[] for b in self.budgets]
+        """ The values observed on every budget."""
+
+    def promote(self, rung, result_dict):
+        """ Records a result and decides whether the configuration goes to the next budget.
+
+        :param rung: the index of the budget the configuration was evaluated on
+        :type rung: int
+        :param result_dict: the result of the evaluation with the keys 'value' and 'status'
+        :type result_dict: dict
+        :returns: bool -- True if the configuration should be evaluated on the next larger budget
+        """
+        # crashed or timed out configurations are never promoted
+        if result_dict['status'] not in ('SAT', 'UNSAT'):
+            return(False)
+
+        values = self.rungs[rung]
+        values.append(result_dict['value'])
+        if rung == len(self.budgets) - 1:
+            return(False)
+
+        num_promoted = max(1, int(len(values) // self.eta))
+        rank = sorted(values).index(result_dict['value'])
+        return(rank < num_promoted)
+
+    def combine(self, results):
+        """ Combines the results of a configuration on all its budgets into the result reported to SMAC.
+
+        The runtime is the sum over all budgets, so SMAC's runtime budget
+        accounts for every evaluation. A configuration that reached the
+        largest budget is reported with its value there. The value of a
+        configuration that was not promoted that far is only known on a
+        smaller budget, where values are usually on a different scale.
+        It is capped from below by the worst value observed on the largest
+        budget so far, so SMAC's model never sees it as better than a
+        configuration that was evaluated fully. Crashes and timeouts are
+        reported as they are.
+
+        :param results: the result dicts of the evaluations on the budgets in increasing order
+        :type results: list of dicts
+        :returns: dict -- the result for SMAC
+        """
+        result_dict = dict(results[-1])
+        result_dict['runtime'] = sum([r['runtime'] for r in results])
+        if (len(results) < len(self.budgets)) and (result_dict['status'] in ('SAT', 'UNSAT')) and (len(self.rungs[-1]) > 0):
+            result_dict['value'] = max(result_dict['value'], max(self.rungs[-1]))
+        return(result_dict)
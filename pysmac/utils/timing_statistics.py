@@ -0,0 +1,134 @@
+from __future__ import print_function, division, absolute_import
+
+import time
+
+from .resource_accounting import current_rss_mb, peak_rss_mb, process_cpu_time
+
+TIMING_KEYS = ('smac_think_time', 'ipc_parse_time', 'spawn_time',
+               'function_wall_time', 'function_cpu_time', 'report_time')
+"""
+The names of the timings recorded for every function evaluation:
+
+    +-------------------+--------------------------------------------------+
+    | Key               | Meaning                                          |
+    +===================+==================================================+
+    | smac_think_time   | time spend waiting for SMAC to send the next     |
+    |                   | configuration                                    |
+    +-------------------+--------------------------------------------------+
+    | ipc_parse_time    | time to convert SMAC's message into Python types |
+    +-------------------+--------------------------------------------------+
+    | spawn_time        | time from calling the limited function until the |
+    |                   | user's function actually starts in the subprocess|
+    +-------------------+--------------------------------------------------+
+    | function_wall_time| wall clock time of the user's function           |
+    +-------------------+--------------------------------------------------+
+    | function_cpu_time | CPU time (user + system) of the subprocess       |
+    +-------------------+--------------------------------------------------+
+    | report_time       | time to send the result back to SMAC             |
+    +-------------------+--------------------------------------------------+
+"""
+
+MEMORY_KEYS = ('peak_rss_mb',)
+"""
+The memory measurements recorded for every function evaluation. 'peak_rss_mb'
+is the peak resident set size (in MB) of the subprocess evaluating the function,
+without the pages it inherited from its parent when it was forked.
+"""
+
+
+class timed_function(object):
+    """
+    Small wrapper recording when the user's function starts and stops.
+
+    The wrapper is executed inside the subprocess created by pynisher, so
+    the recorded timestamps exclude the time needed to spawn (and tear
+    down) that process. It also records the peak memory usage and the CPU
+    time of that subprocess.
+    """
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, **kwargs):
+        # the pages inherited from the parent are resident before the function starts
+        baseline_mb = current_rss_mb()
+        start = time.time()
+        res = self.function(**kwargs)
+        return (start, res, time.time(), peak_rss_mb(baseline_mb), process_cpu_time())
+
+
+class TimingStatistics(object):
+    """
+    Collects the per-evaluation timings of one or more SMAC runs.
+
+    Every evaluation contributes one value for every key in
+    :py:data:`TIMING_KEYS` and :py:data:`MEMORY_KEYS`. Missing values (e.g.
+    the spawn time of a crashed function) are simply not recorded.
+    """
+
+    def __init__(self):
+        self.timings = dict([(k, []) for k in TIMING_KEYS + MEMORY_KEYS])
+        self.num_evaluations = 0
+        self.time_to_first_evaluation = None
+        """ Seconds from calling minimize until the first result was reported to SMAC (None if unknown)."""
+
+    def add(self, timing_dict):
+        """ Adds the timings of a single evaluation.
+
+        :param timing_dict: dictionary with (some of) the keys in TIMING_KEYS and the times in seconds as values.
+        :type timing_dict: dict
+        """
+        for k, v in list(timing_dict.items()):
+            if v is not None:
+                self.timings[k].append(float(v))
+        self.num_evaluations += 1
+
+    def merge(self, other):
+        """ Adds all timings of another TimingStatistics object to this one.
+
+        :param other: the statistics to be added
+        :type other: TimingStatistics
+        """
+        for k in TIMING_KEYS + MEMORY_KEYS:
+            self.timings[k].extend(other.timings[k])
+        self.num_evaluations += other.num_evaluations
+        if other.time_to_first_evaluation is not None:
+            self.time_to_first_evaluation = other.time_to_first_evaluation if self.time_to_first_evaluation is None\
+                    else min(self.time_to_first_evaluation, other.time_to_first_evaluation)
+        return(self)
+
+    def totals(self):
+        """
+        :returns: dict -- the accumulated time (in seconds) for every key
+        """
+        return(dict([(k, sum(v)) for k, v in list(self.timings.items())]))
+
+    def percentiles(self, q=(50, 90, 99)):
+        """ Computes percentiles for every recorded timing.
+
+        :param q: the percentiles to compute (values between 0 and 100)
+        :type q: sequence of floats
+        :returns: dict -- for every key a dict mapping the percentile to its value (None if nothing was recorded)
+        """
+        import numpy as np
+        res = {}
+        for k, v in list(self.timings.items()):
+            if len(v) == 0:
+                res[k] = dict([(p, None) for p in q])
+            else:
+                res[k] = dict(zip(q, np.percentile(v, q).tolist()))
+        return(res)
+
+    def histograms(self, bins=10):
+        """ Computes a histogram for every recorded timing.
+
+        :param bins: number of bins (or their edges), see numpy.histogram
+        :type bins: int
+        :returns: dict -- for every key the tuple (counts, bin_edges) as returned by numpy.histogram
+        """
+        import numpy as np
+        return(dict([(k, np.histogram(v, bins=bins)) for k, v in list(self.timings.items()) if len(v) > 0]))
+
+    def __repr__(self):
+        totals = self.totals()
+        return('TimingStatistics(%i evaluations, %s)' % (self.num_evaluations,
+                ', '.join(['%s=%.3fs' % (k, totals[k]) for k in TIMING_KEYS])))
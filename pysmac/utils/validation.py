@@ -0,0 +1,127 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import time
+import multiprocessing
+
+from .multiprocessing_wrapper import MyPool
+from .smac_output_readers import read_trajectory_file
+
+
+def final_incumbents(scenario_dir, seeds, parser_dict):
+    """ The final incumbent of every SMAC run with the proper types.
+
+    :param scenario_dir: SMAC's output directory for the scenario
+    :type scenario_dir: str
+    :param seeds: the seeds of the runs
+    :type seeds: list of ints
+    :param parser_dict: maps every parameter to its type, see :py:func:`pysmac.remote_smac.process_parameter_definitions`
+    :type parser_dict: dict
+    :returns: dict -- the configuration (a dict) for every seed whose run wrote a trajectory
+    """
+    incumbents = {}
+    for seed in seeds:
+        fn = os.path.join(scenario_dir, 'traj-run-%i.txt'%seed)
+        if os.path.exists(fn):
+            trajectory = read_trajectory_file(fn)
+            if len(trajectory) > 0:
+                # SMAC stores all values as strings
+                incumbents[seed] = dict([(k, parser_dict[k](v)) if k in parser_dict else (k, v)
+                                         for k, v in list(trajectory[-1]['Configuration'].items())])
+    return(incumbents)
+
+
+def unique_configurations(run_configurations):
+    """ Removes duplicates among the configurations of several runs.
+
+    :param run_configurations: maps every seed to a configuration
+    :type run_configurations: dict
+    :returns: tuple -- (list of the distinct configurations, dict mapping every seed to the index of its configuration in that list)
+    """
+    configurations, indices, columns = [], {}, {}
+    for seed, config in sorted(run_configurations.items()):
+        key = tuple(sorted(config.items()))
+        if key not in indices:
+            indices[key] = len(configurations)
+            configurations.append(config)
+        columns[seed] = indices[key]
+    return(configurations, columns)
+
+
+def validate_pair(only_arg):
+    """
+    Evaluates one configuration on one instance inside a worker of the validation pool.
+
+    :returns: tuple -- (index of the instance, index of the configuration, result dict as reported to SMAC)
+    """
+    from pysmac.remote_smac import evaluate_with_limits, make_result_dict
+    row, column, function, config_dict, mem_limit_function, t_limit_function, timeout_quality = only_arg
+    evaluation = evaluate_with_limits(function, config_dict, mem_limit_function, t_limit_function,
+                                      None if t_limit_function is None else 10*t_limit_function)
+    result_dict = make_result_dict(evaluation['result'], evaluation['function_cpu_time'], timeout_quality,
+                                   t_limit_function, evaluation['wall_time'])
+    return(row, column, result_dict)
+
+
+def validate(function, configurations, instances, num_procs, instance_seeds=None,
+             mem_limit_function=None, t_limit_function=None, timeout_quality=2.**127):
+    """ Evaluates every configuration on every instance in parallel.
+
+    Every (configuration, instance) pair is evaluated exactly once, in
+    pynisher subprocesses started by num_procs workers.
+
+    :param function: the function to be evaluated
+    :type function: callable
+    :param configurations: the distinct configurations, e.g. from :py:func:`unique_configurations`
+    :type configurations: list of dicts
+    :param instances: the indices of the instances passed as the argument 'instance'
+    :type instances: list of ints
+    :param num_procs: number of evaluations executed in parallel
+    :type num_procs: int
+    :param instance_seeds: the seed passed as the argument 'seed' on every instance. None means the function is deterministic.
+    :type instance_seeds: list of ints
+    :returns: tuple -- (values, statuses): NumPy arrays with one row per instance and one column per configuration
+    """
+    import numpy as np
+
+    tasks = []
+    for row, instance in enumerate(instances):
+        for column, config in enumerate(configurations):
+            config_dict = dict(config, instance=instance)
+            if instance_seeds is not None:
+                config_dict['seed'] = instance_seeds[row]
+            tasks.append((row, column, function, config_dict, mem_limit_function, t_limit_function, timeout_quality))
+
+    values = np.empty((len(instances), len(configurations)))
+    statuses = np.empty((len(instances), len(configurations)), dtype=object)
+    start = time.time()
+    pool = MyPool(max(1, min(num_procs, len(tasks))))
+    try:
+        for row, column, result_dict in pool.imap_unordered(validate_pair, tasks):
+            values[row, column] = result_dict['value']
+            statuses[row, column] = result_dict['status']
+    except:
+        pool.terminate()
+        raise
+    pool.close()
+    pool.join()
+    multiprocessing.get_logger().debug('Validated %i configurations on %i instances in %f seconds',
+                                       len(configurations), len(instances), time.time() - start)
+    return(values, statuses)
+
+
+def write_validation_matrix(fn, instances, instance_seeds, values):
+    """ Writes the results of a validation in the format of SMAC's validationObjectiveMatrix files.
+
+    :param instances: the indices of the instances (the rows of values)
+    :type instances: list of ints
+    :param instance_seeds: the seed of every instance, None writes -1
+    :type instance_seeds: list of ints
+    :param values: one row per instance and one column per configuration
+    :type values: numpy.ndarray
+    """
+    with open(fn, 'w') as fh:
+        fh.write(','.join(['"Instance"', '"Seed"'] + ['"Config %i"' % (i + 1) for i in range(values.shape[1])]) + '\n')
+        for row, instance in enumerate(instances):
+            seed = -1 if instance_seeds is None else instance_seeds[row]
+            fh.write(','.join(['"id_%i"' % instance, '"%i"' % seed] + ['"%r"' % float(v) for v in values[row]]) + '\n')
@@ -0,0 +1,78 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import shutil
+import subprocess
+
+
+RAM_DISK_CANDIDATES = ['/dev/shm', '/run/shm']
+""" Directories backed by memory on common Linux systems."""
+
+OUTPUT_LEVELS = {
+    'full': {},
+    'reduced': {'quick-saves': False, 'intermediary-saves': False},
+    'minimal': {'state-serializer': 'NULL', 'save-context': False},
+}
+"""
+The SMAC options for the different output levels:
+
+    +---------+-----------------------------------------------------------+
+    | Level   | SMAC writes                                               |
+    +=========+===========================================================+
+    | full    | everything (SMAC's defaults)                              |
+    +---------+-----------------------------------------------------------+
+    | reduced | the final state only, no quick saves and intermediary     |
+    |         | saves during the run (quick-saves and intermediary-saves  |
+    |         | are False)                                                |
+    +---------+-----------------------------------------------------------+
+    | minimal | no state files (runs and results, paramstrings and their  |
+    |         | backups), only trajectories and logs. Can not be resumed. |
+    +---------+-----------------------------------------------------------+
+"""
+
+
+def ram_disk_directory():
+    """ A writable directory on a memory backed filesystem.
+
+    :returns: str -- the directory, or None if none of :py:data:`RAM_DISK_CANDIDATES` is available
+    """
+    for directory in RAM_DISK_CANDIDATES:
+        if os.path.isdir(directory) and os.access(directory, os.W_OK):
+            return(directory)
+    return(None)
+
+
+def remove_in_background(directory):
+    """ Deletes a directory tree in a detached process.
+
+    The directory is renamed first, so its name can be reused right away.
+    The deletion continues after the interpreter exits. If the process can
+    not be started, the directory is removed synchronously.
+
+    :param directory: the directory to delete
+    :type directory: str
+    """
+    if not os.path.exists(directory):
+        return
+    doomed = '%s.deleted-%i' % (directory.rstrip(os.sep), os.getpid())
+    try:
+        os.rename(directory, doomed)
+    except OSError:
+        doomed = directory
+
+    kwargs = {}
+    if hasattr(os, 'setsid'):
+        # not killed together with the interpreter's process group
+        kwargs['preexec_fn'] = os.setsid
+    # this usually runs in a destructor, possibly while the interpreter shuts
+    # down and the builtins are gone, so only the os module is used here
+    try:
+        fnull = os.open(os.devnull, os.O_RDWR)
+        try:
+            subprocess.Popen([sys.executable, '-c', 'import shutil, sys; shutil.rmtree(sys.argv[1], ignore_errors=True)', doomed],
+                             stdin=fnull, stdout=fnull, stderr=fnull, close_fds=True, **kwargs)
+        finally:
+            os.close(fnull)
+    except Exception:
+        shutil.rmtree(doomed, ignore_errors=True)
@@ -1,9 +1,16 @@
+import os
+import re
+
 from setuptools import setup, find_packages
 
+# the version is only defined in pysmac/__init__.py, importing pysmac here would require its dependencies
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pysmac', '__init__.py')) as fh:
+    version = re.search(r"^__version__ = '([^']+)'", fh.read(), re.M).group(1)
+
 setup(
     name = 'pysmac',
-    version = '0.9.1',
-    packages = find_packages(),
+    version = version,
+    packages = find_packages(exclude=['tests']),
     install_requires = ['docutils>=0.3', 'setuptools', 'numpy', 'pynisher'],
     author = "Stefan Falkner and Tobias Domhan (python wrapper). Frank Hutter, Holger Hoos, Kevin Leyton-Brown, Kevin Murphy and Steve Ramage (SMAC)",
     author_email = "sfalkner@informatik.uni-freiburg.de",
@@ -0,0 +1,47 @@
+from __future__ import print_function, division, absolute_import
+
+import unittest
+
+import pysmac
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1)}
+
+
+class TestAskTell(unittest.TestCase):
+
+    def session(self, max_evaluations, num_slots):
+        # the optimizer removes its working directory when it is deleted, so it has to outlive the session
+        self.opt = pysmac.SMAC_optimizer()
+        self.opt.smac_options['backend'] = 'fake'
+        return(self.opt.ask_tell_session(max_evaluations, PARAMETERS, num_slots=num_slots))
+
+    def test_results_can_be_told_in_any_order(self):
+        session = self.session(5, 2)
+        values = []
+        with session:
+            while not session.finished:
+                batch = [session.ask(timeout_s=10), session.ask(timeout_s=10)]
+                batch = [c for c in batch if c is not None]
+                for config in reversed(batch):
+                    values.append(config['x']**2)
+                    session.tell(config, values[-1])
+            self.assertEqual(session.num_outstanding, 0)
+            self.assertEqual(session.num_evaluations, 10)
+            value, configuration = session.close()
+        self.assertEqual(len(values), 10)
+        self.assertEqual(value, min(values))
+
+    def test_every_slot_has_one_outstanding_configuration(self):
+        with self.session(5, 1) as session:
+            config = session.ask(timeout_s=10)
+            self.assertIsNotNone(config)
+            self.assertIsNone(session.ask(timeout_s=0.5))
+            self.assertEqual(session.num_outstanding, 1)
+            session.tell(config, {'value': 1., 'status': 'SAT'})
+            self.assertRaises(ValueError, session.tell, config, 1.)
+            session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+from __future__ import print_function, division, absolute_import
+
+import sys
+import unittest
+
+import pysmac
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1)}
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'minimize_async requires Python 3.5 or newer')
+class TestMinimizeAsync(unittest.TestCase):
+
+    def test_coroutine_function(self):
+        import asyncio
+        calls = []
+
+        async def quadratic(x):
+            await asyncio.sleep(0.01)
+            calls.append(x)
+            return(x**2)
+
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        loop = asyncio.new_event_loop()
+        try:
+            value, configuration = loop.run_until_complete(opt.minimize_async(quadratic, 5, PARAMETERS, num_runs=2))
+        finally:
+            loop.close()
+        self.assertEqual(len(calls), 10)
+        self.assertEqual(value, min([x**2 for x in calls]))
+
+    def test_plain_function(self):
+        import asyncio
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        loop = asyncio.new_event_loop()
+        try:
+            value, configuration = loop.run_until_complete(opt.minimize_async(lambda x: x**2, 5, PARAMETERS))
+        finally:
+            loop.close()
+        self.assertAlmostEqual(value, float(configuration['x'])**2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+from __future__ import print_function, division, absolute_import
+
+import unittest
+
+import numpy as np
+
+import pysmac
+from pysmac.utils.batching import configurations_to_columns, split_results
+
+
+class TestBatching(unittest.TestCase):
+
+    def test_columns(self):
+        columns = configurations_to_columns([{'x': 1., 'c': 'a'}, {'x': 2.}])
+        self.assertEqual(columns['x'].tolist(), [1., 2.])
+        self.assertEqual(columns['c'].dtype, object)
+        self.assertEqual(columns['c'].tolist(), ['a', None])
+
+    def test_results(self):
+        self.assertEqual(split_results(np.array([1., np.nan]), 2), [1., None])
+        self.assertEqual(split_results([None, 3], 2), [None, 3.])
+        self.assertRaises(ValueError, split_results, [1.], 2)
+
+    def test_minimize_batched(self):
+        batch_sizes = []
+        def quadratic(x):
+            batch_sizes.append(len(x))
+            return(x**2)
+
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        value, configuration = opt.minimize_batched(quadratic, 5, {'x': ('real', [-5, 5], 1)}, num_runs=4)
+        self.assertEqual(sum(batch_sizes), 20)
+        self.assertTrue(max(batch_sizes) <= 4)
+        self.assertAlmostEqual(value, float(configuration['x'])**2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+from __future__ import print_function, division, absolute_import
+
+import threading
+import unittest
+
+import pysmac
+from pysmac.utils.callbacks import Callback, call_hooks
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1)}
+
+
+def quadratic(x):
+    return(x**2)
+
+
+def unsatisfiable(x):
+    return({'value': x**2, 'status': b'UNSAT'})
+
+
+class Recorder(Callback):
+    """ Records every call of a hook, and stops a run after a given number of evaluations."""
+    def __init__(self, stop_before=None, stop_after=None):
+        self.stop_before = stop_before
+        self.stop_after = stop_after
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+    def hooks(self, name, seed=None):
+        return([c[1:] for c in self.calls if (c[0] == name) and ((seed is None) or (c[1] == seed))])
+
+    def before_evaluation(self, seed, config_dict):
+        self.record('before_evaluation', seed, config_dict)
+        return(len(self.hooks('before_evaluation', seed)) == self.stop_before)
+
+    def after_evaluation(self, seed, config_dict, result_dict, timings):
+        self.record('after_evaluation', seed, config_dict, result_dict, timings)
+        return(len(self.hooks('after_evaluation', seed)) == self.stop_after)
+
+    def on_incumbent_change(self, seed, config_dict, result_dict):
+        self.record('on_incumbent_change', seed, config_dict, result_dict)
+
+    def on_run_end(self, seed, timing_statistics):
+        self.record('on_run_end', seed, timing_statistics)
+
+
+class Failing(Callback):
+    def after_evaluation(self, seed, config_dict, result_dict, timings):
+        raise RuntimeError('a broken callback')
+
+
+def minimize(func, max_evaluations, callbacks, **kwargs):
+    opt = pysmac.SMAC_optimizer()
+    opt.smac_options['backend'] = 'fake'
+    # the callbacks run in threads of this process, so the test can inspect them
+    return(opt.minimize(func, max_evaluations, PARAMETERS, callbacks=callbacks, executor='thread', **kwargs))
+
+
+class TestCallbacks(unittest.TestCase):
+
+    def test_hooks_of_every_evaluation(self):
+        recorder = Recorder()
+        value, configuration = minimize(quadratic, 10, [recorder])
+
+        before, after = recorder.hooks('before_evaluation'), recorder.hooks('after_evaluation')
+        self.assertEqual((len(before), len(after)), (10, 10))
+        for (seed, config_dict), (seed_after, config_after, result_dict, timings) in zip(before, after):
+            self.assertEqual(config_dict, config_after)
+            self.assertEqual(result_dict['value'], quadratic(config_dict['x']))
+            self.assertEqual(result_dict['status'], 'SAT')
+            self.assertFalse(result_dict.get('replayed', False))
+            self.assertTrue('function_cpu_time' in timings)
+        self.assertEqual(len(recorder.hooks('on_run_end')), 1)
+
+        # the incumbent only improves, and ends with the best value of the run
+        incumbents = [c[2]['value'] for c in recorder.hooks('on_incumbent_change')]
+        self.assertEqual(incumbents, sorted(incumbents, reverse=True))
+        self.assertEqual(incumbents[-1], min([c[2]['value'] for c in after]))
+        self.assertEqual(incumbents[-1], value)
+
+    def test_status_is_passed_on_as_str(self):
+        recorder = Recorder()
+        minimize(unsatisfiable, 3, [recorder])
+        self.assertEqual([c[2]['status'] for c in recorder.hooks('after_evaluation')], ['UNSAT'] * 3)
+
+    def test_stop_before_evaluation(self):
+        recorder = Recorder(stop_before=4)
+        minimize(quadratic, 10, [recorder])
+        self.assertEqual(len(recorder.hooks('before_evaluation')), 4)
+        self.assertEqual(len(recorder.hooks('after_evaluation')), 3)
+        self.assertEqual(len(recorder.hooks('on_run_end')), 1)
+
+    def test_stop_after_evaluation_per_run(self):
+        recorder = Recorder(stop_after=3)
+        minimize(quadratic, 10, [recorder], num_runs=2, num_procs=2)
+        seeds = set([c[0] for c in recorder.hooks('on_run_end')])
+        self.assertEqual(len(seeds), 2)
+        for seed in seeds:
+            self.assertEqual(len(recorder.hooks('after_evaluation', seed)), 3)
+
+    def test_exceptions_do_not_abort_the_run(self):
+        recorder = Recorder()
+        minimize(quadratic, 5, [Failing(), recorder])
+        self.assertEqual(len(recorder.hooks('after_evaluation')), 5)
+
+    def test_call_hooks(self):
+        class Stop(Callback):
+            def before_evaluation(self, seed, config_dict):
+                return(True)
+        self.assertFalse(call_hooks([Callback()], 'before_evaluation', 0, {}))
+        self.assertTrue(call_hooks([Callback(), Stop(), Failing()], 'before_evaluation', 0, {}))
+        self.assertFalse(call_hooks([Failing()], 'after_evaluation', 0, {}, {}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
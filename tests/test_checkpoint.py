@@ -0,0 +1,130 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pysmac
+from pysmac.utils.callbacks import Callback
+from pysmac.utils.checkpoint import EvaluationCache
+from pysmac.utils.event_log import read_event_log
+from pysmac.utils.run_history_db import RunHistoryDatabase
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1)}
+
+
+def quadratic(x):
+    return(x**2)
+
+
+def quadratic_with_budget(x, budget):
+    return(x**2 + 1. / budget)
+
+
+class StopAfter(Callback):
+    """ Records whether every result was replayed, and stops the run after num_evaluations."""
+    def __init__(self, num_evaluations):
+        self.num_evaluations = num_evaluations
+        self.replayed = []
+
+    def after_evaluation(self, seed, config_dict, result_dict, timings):
+        self.replayed.append(result_dict.get('replayed', False))
+        return(len(self.replayed) >= self.num_evaluations)
+
+
+class TestEvaluationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fn = os.path.join(self.directory, 'evaluations.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reopened_cache_returns_the_results(self):
+        cache = EvaluationCache(self.fn)
+        cache.add({'x': 1., 'seed': 3}, {'value': 1., 'status': 'SAT', 'runtime': 0.5}, [(0, 2., 'SAT', 0.25)])
+        cache.close()
+        # a line written while the process was killed is ignored
+        with open(self.fn, 'a') as fh:
+            fh.write('{"key": ')
+
+        cache = EvaluationCache(self.fn)
+        self.assertEqual(cache.get({'seed': 3, 'x': 1.}), {'value': 1., 'status': 'SAT', 'runtime': 0.5})
+        self.assertEqual(cache.rungs({'x': 1., 'seed': 3}), [(0, {'value': 2., 'status': 'SAT', 'runtime': 0.25})])
+        self.assertIsNone(cache.get({'x': 2., 'seed': 3}))
+        cache.close()
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.working_directory = os.path.join(self.directory, 'smac')
+        self.event_log = os.path.join(self.directory, 'events.jsonl')
+        self.run_history_db = os.path.join(self.directory, 'history.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def minimize(self, func, callback, resume, **kwargs):
+        opt = pysmac.SMAC_optimizer(working_directory=self.working_directory, persistent_files=True)
+        opt.smac_options['backend'] = 'fake'
+        value, configuration = opt.minimize(func, 12, PARAMETERS, callbacks=[callback], resume=resume,
+                                            executor='thread', event_log=self.event_log,
+                                            run_history_db=self.run_history_db, **kwargs)
+        return(opt, value)
+
+    def test_interrupted_call_is_replayed_and_completed(self):
+        self.minimize(quadratic, StopAfter(5), False)
+
+        callback = StopAfter(100)
+        opt, value = self.minimize(quadratic, callback, True)
+
+        # the first five results are replayed, the remaining seven are evaluated
+        self.assertEqual(callback.replayed, [True] * 5 + [False] * 7)
+        self.assertEqual(opt.run_history.num_runs, 12)
+
+        events = read_event_log(self.event_log)
+        self.assertEqual((len(events['replayed']), int(events['replayed'].sum())), (17, 5))
+        db = RunHistoryDatabase(self.run_history_db)
+        runs = db.runs()
+        db.close()
+        self.assertEqual((len(runs), sum([r['replayed'] for r in runs])), (17, 5))
+
+        fresh = pysmac.SMAC_optimizer()
+        fresh.smac_options['backend'] = 'fake'
+        self.assertEqual(value, fresh.minimize(quadratic, 12, PARAMETERS, executor='thread')[0])
+
+    def test_rungs_are_replayed_with_successive_halving(self):
+        budgets = dict(min_budget=1, max_budget=9, eta=3)
+        self.minimize(quadratic_with_budget, StopAfter(5), False, **budgets)
+
+        callback = StopAfter(100)
+        opt, value = self.minimize(quadratic_with_budget, callback, True, **budgets)
+
+        self.assertEqual(callback.replayed, [True] * 5 + [False] * 7)
+        # every rung evaluated by the first call is replayed with its budget
+        events = read_event_log(self.event_log)
+        num_first = len(events['replayed']) - opt.run_history.num_runs
+        self.assertFalse(events['replayed'][:num_first].any())
+        self.assertEqual(int(events['replayed'][num_first:].sum()), num_first)
+        self.assertEqual(sorted(events['budget'][:num_first].tolist()),
+                         sorted(events['budget'][num_first:][events['replayed'][num_first:]].tolist()))
+        self.assertEqual(sorted(set(opt.run_history.budgets.tolist())), [1., 3., 9.])
+
+    def test_resume_requires_persistent_files(self):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        self.assertRaises(ValueError, opt.minimize, quadratic, 12, PARAMETERS, resume=True)
+
+    def test_resume_rejects_minimal_output(self):
+        opt = pysmac.SMAC_optimizer(working_directory=self.working_directory, persistent_files=True, output_level='minimal')
+        opt.smac_options['backend'] = 'fake'
+        self.assertRaises(ValueError, opt.minimize, quadratic, 12, PARAMETERS, resume=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
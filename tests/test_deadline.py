@@ -0,0 +1,30 @@
+from __future__ import print_function, division, absolute_import
+
+import time
+import unittest
+
+import pysmac
+
+
+def sleep(x):
+    time.sleep(x)
+    return(x)
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_partial_results_within_the_total_time_limit(self):
+        opt = pysmac.SMAC_optimizer(t_limit_total_s=3)
+        opt.smac_options['backend'] = 'fake'
+        start = time.time()
+        value, configuration = opt.minimize(sleep, 100, {'x': ('real', [0.2, 0.3], 0.25)}, num_runs=2, num_procs=2)
+
+        # both runs stop once the budget is exhausted, with the best result so far
+        self.assertTrue(time.time() - start < 10)
+        self.assertTrue(0 < opt.run_history.num_runs < 200)
+        self.assertEqual(value, min(opt.run_history.values))
+        self.assertEqual(float(configuration['x']), value)
+
+
+if __name__ == '__main__':
+    unittest.main()
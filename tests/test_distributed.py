@@ -0,0 +1,81 @@
+from __future__ import print_function, division, absolute_import
+
+import socket
+import threading
+import time
+import unittest
+
+import multiprocessing
+
+import pysmac
+from pysmac.distributed import BrokerClient, EvaluationBroker, run_worker
+
+
+def quadratic(x):
+    return(x**2)
+
+
+class TestDistributed(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = EvaluationBroker(handshake_timeout=1).start()
+
+    def tearDown(self):
+        self.broker.stop()
+
+    def start_worker(self):
+        worker = threading.Thread(target=run_worker, args=self.broker.address,
+                                  kwargs={'heartbeat_interval': 0.5, 'authkey': self.broker.authkey})
+        worker.daemon = True
+        worker.start()
+        return(worker)
+
+    def test_worker_evaluates_the_function(self):
+        self.start_worker()
+        client = BrokerClient(self.broker.address, self.broker.authkey)
+        try:
+            self.assertEqual(client.evaluate(quadratic, {'x': 3.}, None, None, None)['result'], 9.)
+            self.assertEqual(client.evaluate(quadratic, {'x': 2.}, None, None, None, time.time() + 30)['result'], 4.)
+        finally:
+            client.close()
+
+    def test_wrong_key_is_rejected(self):
+        self.assertRaises(multiprocessing.AuthenticationError, BrokerClient, self.broker.address, '00' * 32)
+
+    def test_silent_connection_does_not_block_others(self):
+        silent = socket.create_connection(self.broker.address)
+        try:
+            self.start_worker()
+            client = BrokerClient(self.broker.address, self.broker.authkey)
+            self.assertEqual(client.evaluate(quadratic, {'x': 3.}, None, None, None)['result'], 9.)
+            client.close()
+            # the broker closes the connection after the handshake timeout
+            silent.settimeout(10)
+            silent.recv(1024)
+            self.assertEqual(silent.recv(1024), b'')
+        finally:
+            silent.close()
+
+    def test_deadline_without_workers(self):
+        client = BrokerClient(self.broker.address, self.broker.authkey)
+        start = time.time()
+        evaluation = client.evaluate(quadratic, {'x': 3.}, None, None, None, time.time() + 1)
+        self.assertEqual(evaluation['result'], {'status': 'TIMEOUT'})
+        self.assertTrue(time.time() - start < 5)
+
+        # the client reconnects for the next evaluation
+        self.start_worker()
+        self.assertEqual(client.evaluate(quadratic, {'x': 2.}, None, None, None)['result'], 4.)
+        client.close()
+
+    def test_minimize(self):
+        self.start_worker()
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        value, configuration = opt.minimize(quadratic, 5, {'x': ('real', [-5, 5], 1)}, evaluation_broker=self.broker)
+        self.assertEqual(opt.run_history.num_runs, 5)
+        self.assertEqual(value, min(opt.run_history.values))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+from __future__ import print_function, division, absolute_import
+
+import threading
+import unittest
+
+import pysmac
+from pysmac.utils.callbacks import Callback
+from pysmac.utils.early_stopping import (IncumbentStoppingRule, IntermediateReporter, LearningCurves,
+                                         MedianStoppingRule, StopEvaluation, reporting_function)
+
+
+def train(x, reporter):
+    for epoch in range(5):
+        reporter.report((x - 1)**2 + 1. / (epoch + 1))
+    return((x - 1)**2)
+
+
+class Results(Callback):
+    def __init__(self):
+        self.results = []
+        self.lock = threading.Lock()
+
+    def after_evaluation(self, seed, config_dict, result_dict, timings):
+        with self.lock:
+            self.results.append(result_dict)
+
+
+class TestStoppingRules(unittest.TestCase):
+
+    def test_median_rule(self):
+        rule = MedianStoppingRule(grace_steps=2, min_curves=3)
+        curves = [[4., 2., 1.], [6., 4., 2.], [8., 6.], [1.]]
+        # the first step is within the grace period, the third has too few curves
+        self.assertEqual(rule.thresholds(curves, None), [None, 5., None])
+        self.assertTrue(rule.should_stop([5., 4.5], 4.))
+        self.assertFalse(rule.should_stop([5., 3.], 4.))
+
+    def test_incumbent_rule(self):
+        rule = IncumbentStoppingRule(grace_steps=2, tolerance=0.5)
+        self.assertEqual(rule.thresholds([], None), [])
+        self.assertEqual(rule.thresholds([], [4., -2., 1.]), [None, -1., 1.5])
+        self.assertTrue(rule.should_stop([0., 2.], 1.5))
+
+    def test_reporter_stops_above_the_threshold(self):
+        reporter = IntermediateReporter(IncumbentStoppingRule(), [None, 1.])
+        reporter.report(5.)
+        reporter.report(1.)
+        # there is no threshold beyond the second step
+        reporter.report(7.)
+        self.assertIsNone(reporter.stop_threshold)
+
+        reporter = IntermediateReporter(IncumbentStoppingRule(), [None, 1.])
+        reporter.report(5.)
+        self.assertRaises(StopEvaluation, reporter.report, 2.)
+        self.assertEqual(reporter.values, [5., 2.])
+        self.assertEqual(reporter.stop_threshold, 1.)
+
+
+class TestLearningCurves(unittest.TestCase):
+
+    def test_stopped_evaluation_is_censored(self):
+        wrapped = reporting_function(train, IncumbentStoppingRule(), [0.5])(x=3.)
+        self.assertTrue(wrapped['stopped'])
+        self.assertEqual(wrapped['curve'], [5.])
+        self.assertEqual(wrapped['result'], {'value': 0.5, 'status': 'TIMEOUT', 'stopped': True})
+
+    def test_only_finished_curves_are_used(self):
+        curves = LearningCurves(IncumbentStoppingRule())
+        self.assertEqual(curves.unwrap(None), (None, []))
+
+        curves.add([3., 2.], {'value': 2., 'status': 'SAT'})
+        curves.add([1., 0.], {'value': 2.**127, 'status': 'TIMEOUT', 'stopped': True})
+        curves.add([0.5], {'value': 2.**127, 'status': 'TIMEOUT'})
+        curves.add([0.1], {'value': 2.**127, 'status': 'CRASHED'})
+        self.assertEqual(curves.curves, [[3., 2.]])
+        self.assertEqual(curves.num_stopped, 1)
+        self.assertEqual(curves.incumbent, (2., [3., 2.]))
+
+        curves.add([2., 1.], {'value': 1., 'status': 'SAT'})
+        self.assertEqual(curves.incumbent, (1., [2., 1.]))
+        self.assertEqual(curves.wrap(train).thresholds, [2., 1.])
+
+
+class TestEarlyStopping(unittest.TestCase):
+
+    def test_stopped_evaluations_are_reported_as_timeouts(self):
+        results = Results()
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        value, configuration = opt.minimize(train, 30, {'x': ('real', [-5, 5], 1)}, callbacks=[results],
+                                            early_stopping=MedianStoppingRule(grace_steps=2), executor='thread')
+
+        stopped = [r for r in results.results if r.get('stopped', False)]
+        finished = [r for r in results.results if not r.get('stopped', False)]
+        self.assertEqual(len(results.results), 30)
+        self.assertTrue(len(stopped) > 0)
+        self.assertEqual(set([r['status'] for r in stopped]), set(['TIMEOUT']))
+        self.assertEqual(set([r['value'] for r in stopped]), set([opt.smac_options['timeout_quality']]))
+        self.assertEqual(set([r['status'] for r in finished]), set(['SAT']))
+
+        # the run history sees stopped evaluations as censored
+        self.assertEqual(int(opt.run_history.config_censored.sum()), len(stopped))
+        self.assertEqual(value, min([r['value'] for r in finished]))
+
+
+if __name__ == '__main__':
+    unittest.main()
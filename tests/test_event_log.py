@@ -0,0 +1,77 @@
+from __future__ import print_function, division, absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pysmac.utils.event_log import EventLogWriter, read_event_log
+
+
+def result(value, status='SAT', **kwargs):
+    result_dict = {'value': value, 'status': status, 'runtime': 0.5}
+    result_dict.update(kwargs)
+    return(result_dict)
+
+
+class TestEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fn = os.path.join(self.directory, 'events.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def num_lines(self):
+        with open(self.fn, 'r') as fh:
+            return(len(fh.readlines()))
+
+    def test_records_are_written_in_batches(self):
+        writer = EventLogWriter(self.fn, 1, buffer_size=2, flush_interval_s=3600)
+        writer.add(0, {'x': 1}, result(1.), {})
+        self.assertEqual(self.num_lines(), 0)
+        writer.add(1, {'x': 2}, result(2.), {})
+        self.assertEqual(self.num_lines(), 2)
+        writer.add(2, {'x': 3}, result(3.), {})
+        writer.close()
+        self.assertEqual(self.num_lines(), 3)
+
+    def test_runs_share_a_file(self):
+        writers = [EventLogWriter(self.fn, seed) for seed in (1, 2)]
+        writers[0].add(0, {'x': 1, 'instance': 3, 'seed': 4}, result(1.), {'function_wall_time': 0.25})
+        writers[1].add(0, {'x': 2.5, 'budget': 9.}, result(None, 'CRASHED', replayed=True), {})
+        writers[0].add(1, {'x': 3}, result(0.5, 'TIMEOUT', stopped=True), {})
+        for writer in writers:
+            writer.close()
+
+        events = read_event_log(self.fn)
+        order = np.argsort(events['run'], kind='mergesort')
+        self.assertEqual(events['run'][order].tolist(), [1, 1, 2])
+        self.assertEqual(events['iteration'][order].tolist(), [0, 1, 0])
+        self.assertEqual(events['status'][order].tolist(), ['SAT', 'TIMEOUT', 'CRASHED'])
+        self.assertEqual(events['replayed'][order].tolist(), [False, False, True])
+        self.assertEqual([events['configurations'][i] for i in order], [{'x': 1}, {'x': 3}, {'x': 2.5}])
+        # missing numbers are NaN
+        self.assertTrue(np.isnan(events['value'][order][2]))
+        self.assertTrue(np.isnan(events['budget'][order][0]))
+        self.assertEqual(events['budget'][order][2], 9.)
+        self.assertEqual(events['instance'][order][0], 3)
+        self.assertEqual(events['function_wall_time'][order][0], 0.25)
+        self.assertTrue(np.isnan(events['function_wall_time'][order][1]))
+
+    def test_an_incomplete_last_line_is_ignored(self):
+        writer = EventLogWriter(self.fn, 1)
+        writer.add(0, {'x': 1}, result(1.), {})
+        writer.close()
+        with open(self.fn, 'a') as fh:
+            fh.write(json.dumps({'run': 1, 'iteration': 1})[:10])
+        events = read_event_log(self.fn)
+        self.assertEqual(events['iteration'].tolist(), [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
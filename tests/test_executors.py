@@ -0,0 +1,60 @@
+from __future__ import print_function, division, absolute_import
+
+import unittest
+
+import pysmac
+from pysmac.utils.executors import (FuturesExecutor, ProcessExecutor, SubprocessExecutor,
+                                    ThreadExecutor, make_executor)
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1), 'y': ('integer', [-5, 5], 2)}
+
+
+def function(x, y):
+    return((x - 1)**2 + abs(y))
+
+
+def minimize(executor, **kwargs):
+    opt = pysmac.SMAC_optimizer()
+    opt.smac_options['backend'] = 'fake'
+    return(opt.minimize(function, 25, PARAMETERS, num_runs=3, num_procs=2, seed=1, executor=executor, **kwargs))
+
+
+class TestExecutors(unittest.TestCase):
+
+    def test_make_executor(self):
+        self.assertIsInstance(make_executor(None), ProcessExecutor)
+        self.assertIsInstance(make_executor('process'), ProcessExecutor)
+        self.assertIsInstance(make_executor('spawn'), ProcessExecutor)
+        self.assertIsInstance(make_executor('subprocess'), SubprocessExecutor)
+        thread_executor = make_executor('thread')
+        self.assertIsInstance(thread_executor, ThreadExecutor)
+        self.assertFalse(thread_executor.separate_processes)
+        self.assertIs(make_executor(thread_executor), thread_executor)
+        self.assertRaises(ValueError, make_executor, 'cluster')
+
+    def test_all_executors_find_the_same_result(self):
+        # the fake SMAC proposes the same configurations for the same seeds
+        expected = minimize('process')
+        for executor in ('thread', 'subprocess'):
+            self.assertEqual(minimize(executor), expected, executor)
+
+    def test_futures_executor(self):
+        try:
+            import concurrent.futures
+        except ImportError:
+            self.skipTest('concurrent.futures is not available')
+        expected = minimize('thread')
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            self.assertFalse(make_executor(executor).separate_processes)
+            self.assertEqual(minimize(executor), expected)
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            self.assertIsInstance(make_executor(executor), FuturesExecutor)
+            self.assertTrue(make_executor(executor).separate_processes)
+
+    def test_cpu_time_limit_requires_separate_processes(self):
+        self.assertRaises(ValueError, minimize, 'thread', t_limit_function_s=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import pysmac
+from pysmac.utils.callbacks import Callback
+from pysmac.utils.fake_smac import configuration_of, read_transcript, transcript_filename
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1), 'n': ('integer', [1, 10], 3), 'c': ('categorical', ['a', 'b'], 'a')}
+
+
+def function(x, n, c):
+    return(x**2 + n + (c == 'b'))
+
+
+class Recorder(Callback):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.evaluations = {}
+
+    def after_evaluation(self, seed, config_dict, result_dict, timings):
+        with self.lock:
+            self.evaluations.setdefault(seed, []).append((config_dict, result_dict['value']))
+
+
+class TestFakeSMAC(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.transcripts = os.path.join(self.directory, 'transcripts')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def minimize(self, max_evaluations, **smac_options):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        opt.smac_options.update(smac_options)
+        recorder = Recorder()
+        best = opt.minimize(function, max_evaluations, PARAMETERS, num_runs=2, num_procs=2, seed=3,
+                            callbacks=[recorder], executor='thread')
+        return(best, recorder.evaluations)
+
+    def test_configurations_are_within_the_parameter_space(self):
+        best, evaluations = self.minimize(20)
+        self.assertEqual(sorted(evaluations), [3, 4])
+        for seed in evaluations:
+            self.assertEqual(len(evaluations[seed]), 20)
+            # like SMAC, every run starts with the default
+            self.assertEqual(evaluations[seed][0][0], {'x': 1., 'n': 3, 'c': 'a'})
+            for config_dict, value in evaluations[seed]:
+                self.assertTrue(-5 <= config_dict['x'] <= 5)
+                self.assertIn(config_dict['n'], list(range(1, 11)))
+                self.assertIn(config_dict['c'], ['a', 'b'])
+        self.assertEqual(best[0], min([v for s in evaluations for c, v in evaluations[s]]))
+
+    def test_transcripts_are_replayed(self):
+        best, evaluations = self.minimize(12, transcript_directory=self.transcripts)
+        for seed in (3, 4):
+            pairs = read_transcript(transcript_filename(self.transcripts, seed))
+            self.assertEqual(len(pairs), 12)
+            self.assertEqual([dict(configuration_of(m))['c'] for m, r in pairs],
+                             [c['c'] for c, v in evaluations[seed]])
+            self.assertTrue(all([r.startswith('Result for SMAC: SAT') for m, r in pairs]))
+
+        replayed_best, replayed = self.minimize(100, fake_replay_directory=self.transcripts)
+        # the replay ends with the transcript
+        self.assertEqual(replayed, evaluations)
+        self.assertEqual(replayed_best, best)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import unittest
+
+import pysmac
+from pysmac.utils.java_helper import smac_classpath
+
+
+class TestJavaHelper(unittest.TestCase):
+
+    def test_classpath_points_into_the_installed_package(self):
+        classpath = smac_classpath()
+        package = os.path.dirname(os.path.abspath(pysmac.__file__))
+        entries = [e for e in classpath.split(os.pathsep) if e != '']
+        self.assertGreater(len(entries), 0)
+        for entry in entries:
+            self.assertTrue(os.path.abspath(entry).startswith(package), entry)
+        # computed once per process
+        self.assertIs(smac_classpath(), classpath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+from __future__ import print_function, division, absolute_import
+
+import subprocess
+import sys
+import time
+import unittest
+
+import pysmac
+import pysmac.utils.memory_budget
+from pysmac.utils.memory_budget import DEFAULT_JVM_RESERVATION_MB, MemoryBudget, process_tree_memory_mb, wait_for_memory
+
+
+def quadratic(x):
+    return(x**2)
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_admission(self):
+        # a single run is always admitted
+        self.assertTrue(MemoryBudget(10).can_admit(0))
+        budget = MemoryBudget(2 * (DEFAULT_JVM_RESERVATION_MB + 500) + 50, mem_limit_function_mb=500)
+        self.assertEqual(budget.run_reservation_mb, DEFAULT_JVM_RESERVATION_MB + 500)
+        # the reservations of two runs fit into the budget, three do not
+        self.assertTrue(budget.can_admit(0))
+        self.assertTrue(budget.can_admit(1))
+        self.assertFalse(budget.can_admit(2))
+
+    def test_process_tree(self):
+        child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(10)'])
+        try:
+            time.sleep(0.5)
+            self.assertTrue(process_tree_memory_mb() > 0)
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_wait_for_memory(self):
+        self.assertTrue(wait_for_memory(10, 1e6, timeout_s=1))
+        start = time.time()
+        self.assertFalse(wait_for_memory(10, 5, timeout_s=0.5, poll_interval_s=0.1))
+        self.assertTrue(time.time() - start < 5)
+
+    def test_run_without_memory_is_aborted(self):
+        child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(120)'])
+        try:
+            # the child alone uses more than the budget, so no evaluation fits
+            opt = pysmac.SMAC_optimizer(mem_limit_total_mb=1)
+            opt.smac_options['backend'] = 'fake'
+            timeout_s = pysmac.utils.memory_budget.MEMORY_TIMEOUT_S
+            pysmac.utils.memory_budget.MEMORY_TIMEOUT_S = 0.5
+            try:
+                opt.minimize(quadratic, 10, {'x': ('real', [-5, 5], 1)}, mem_limit_function_mb=1, executor='thread')
+            finally:
+                pysmac.utils.memory_budget.MEMORY_TIMEOUT_S = timeout_s
+        finally:
+            child.kill()
+            child.wait()
+        self.assertEqual(opt.run_history.num_runs, 1)
+        self.assertEqual(opt.run_history.statuses.tolist(), [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+from __future__ import print_function, division, absolute_import
+
+import re
+import time
+import unittest
+
+try:
+    from urllib2 import urlopen # Python 2 backward compatibility
+except ImportError:
+    from urllib.request import urlopen
+
+import pysmac
+from pysmac.metrics import MetricsReporter, MetricsServer
+
+
+PARAMETERS = {'x': ('real', [-5, 5], 1)}
+
+
+def quadratic(x):
+    return(x**2)
+
+
+def result(value, status='SAT', **kwargs):
+    result_dict = {'value': value, 'status': status, 'runtime': 0.5}
+    result_dict.update(kwargs)
+    return(result_dict)
+
+
+def samples(exposition):
+    """ :returns: dict -- the value of every sample line, keyed by the name with the labels"""
+    values = {}
+    for line in exposition.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return(values)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MetricsServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def wait_for(self, name, value, timeout=5.):
+        # the updates arrive asynchronously over UDP
+        end = time.time() + timeout
+        while time.time() < end:
+            if samples(self.server.exposition()).get(name) == value:
+                return
+            time.sleep(0.05)
+        self.fail('%s never reached %s:\n%s' % (name, value, self.server.exposition()))
+
+    def test_exposition_of_a_run(self):
+        reporter = MetricsReporter(self.server.address, 'branin', 3, interval_s=3600, max_batch_size=100)
+        reporter.add({'smac_think_time': 0.1, 'function_wall_time': 1., 'peak_rss_mb': 20.}, result(4.))
+        reporter.add({'smac_think_time': 0.3, 'function_wall_time': 2.}, result(1., replayed=True))
+        reporter.add({'function_wall_time': 3.}, result(0.5, 'TIMEOUT', stopped=True))
+        reporter.add({}, result(None, 'CRASHED'))
+        reporter.close()
+
+        labels = '{study="branin",run="3"}'
+        self.wait_for('pysmac_evaluations_total' + labels, 4.)
+        values = samples(self.server.exposition())
+        self.assertEqual(values['pysmac_replayed_evaluations_total' + labels], 1.)
+        self.assertEqual(values['pysmac_timeouts_total' + labels], 1.)
+        self.assertEqual(values['pysmac_crashes_total' + labels], 1.)
+        # neither the timeout nor the crash can become the incumbent
+        self.assertEqual(values['pysmac_incumbent_value' + labels], 1.)
+        self.assertEqual(values['pysmac_function_peak_rss_mb' + labels], 20.)
+        self.assertEqual(values['pysmac_function_time_seconds_sum' + labels], 6.)
+        self.assertEqual(values['pysmac_function_time_seconds_count' + labels], 3.)
+        self.assertEqual(values['pysmac_smac_think_time_seconds_count' + labels], 2.)
+        self.assertEqual(values['pysmac_function_time_seconds{study="branin",run="3",quantile="0.5"}'], 2.)
+        self.assertEqual(values['pysmac_smac_up' + labels], 0.)
+        self.assertGreater(values['pysmac_worker_rss_mb' + labels], 0.)
+
+    def test_http_endpoint(self):
+        body = urlopen(self.server.url).read().decode()
+        self.assertEqual(body.strip(), '')
+        reporter = MetricsReporter(self.server.address, 'a "quoted"\nstudy', 1)
+        reporter.close()
+        self.wait_for('pysmac_evaluations_total{study="a \\"quoted\\"\\nstudy",run="1"}', 0.)
+        body = urlopen(self.server.url).read().decode()
+        self.assertIn('# TYPE pysmac_evaluations_total counter', body)
+
+    def test_minimize_reports_every_evaluation(self):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        opt.minimize(quadratic, 15, PARAMETERS, num_runs=2, num_procs=2, seed=4,
+                     metrics_server=self.server, study='quadratic')
+        for run in (4, 5):
+            self.wait_for('pysmac_evaluations_total{study="quadratic",run="%i"}' % run, 15.)
+        values = samples(self.server.exposition())
+        self.assertEqual(values['pysmac_smac_up{study="quadratic",run="4"}'], 0.)
+        self.assertTrue(re.search(r'^pysmac_incumbent_value\{study="quadratic",run="5"\} ',
+                                  self.server.exposition(), re.MULTILINE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+from __future__ import print_function, division, absolute_import
+
+import unittest
+
+import pysmac
+
+
+def quadratic(x, y):
+    return((x - 1)**2 + (y - 2)**2)
+
+
+class TestNumpyBackend(unittest.TestCase):
+
+    def minimize(self, *args, **kwargs):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'numpy'
+        return(opt, opt.minimize(*args, **kwargs))
+
+    def test_finds_the_minimum(self):
+        parameters = {'x': ('real', [-5, 5], 0), 'y': ('integer', [-5, 5], 0)}
+        opt, (value, configuration) = self.minimize(quadratic, 30, parameters)
+        self.assertEqual(opt.run_history.num_runs, 30)
+        self.assertEqual(value, min(opt.run_history.values))
+        self.assertAlmostEqual(value, quadratic(float(configuration['x']), int(configuration['y'])))
+        self.assertTrue(value < 1.)
+
+    def test_unsupported_options(self):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'numpy'
+        self.assertRaises(ValueError, opt.minimize, quadratic, 5, {'x': ('real', [-5, 5], 0), 'y': ('real', [-5, 5], 0)},
+                          resume=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
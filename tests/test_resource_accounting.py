@@ -0,0 +1,44 @@
+from __future__ import print_function, division, absolute_import
+
+import unittest
+
+import numpy as np
+
+from pysmac.remote_smac import evaluate_with_limits
+from pysmac.utils.resource_accounting import child_usage, current_rss_mb, peak_rss_mb
+
+
+def allocate(mb):
+    memory = np.ones(int(mb * 1024 * 1024 / 8))
+    return(float(memory.sum()))
+
+
+def spin(n):
+    return(sum([i * i for i in range(int(n))]))
+
+
+class TestResourceAccounting(unittest.TestCase):
+
+    def test_current_and_peak(self):
+        self.assertTrue(0 < current_rss_mb() <= peak_rss_mb())
+        self.assertEqual(peak_rss_mb(1e9), 0.)
+
+    def test_inherited_memory_is_not_counted(self):
+        # the parent's memory is resident in the forked subprocess as well
+        inherited = np.ones(100 * 1024 * 1024 // 8)
+        small = evaluate_with_limits(allocate, {'mb': 0}, None, None, None)['peak_rss_mb']
+        large = evaluate_with_limits(allocate, {'mb': 200}, None, None, None)['peak_rss_mb']
+        self.assertTrue(small < 50, small)
+        self.assertTrue(190 < large < 250, large)
+        del inherited
+
+    def test_cpu_time_of_the_subprocess(self):
+        usage = child_usage()
+        evaluation = evaluate_with_limits(spin, {'n': 3e6}, None, None, None)
+        usage.stop()
+        self.assertTrue(evaluation['function_cpu_time'] > 0.05)
+        self.assertTrue(usage.cpu_time() >= evaluation['function_cpu_time'] * 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import pysmac
+from pysmac.utils.event_log import read_event_log
+from pysmac.utils.run_history import RunHistory
+from pysmac.utils.run_history_db import RunHistoryDatabase
+
+
+def result(value, status='SAT'):
+    return({'value': value, 'status': status, 'runtime': 1.})
+
+
+def quadratic_with_budget(x, budget):
+    return(x**2 + 1. / budget)
+
+
+class TestRunHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c = {'x': 1}, {'x': 2}, {'x': 3}
+        self.history = RunHistory(capacity=2)
+        self.history.add(self.a, result(0.1), budget=1)
+        self.history.add(self.a, result(5.), budget=9)
+        self.history.add(self.a, result(2.**127, 'TIMEOUT'), budget=9)
+        self.history.add(self.b, result(0.01), budget=3)
+        self.history.add(self.c, result(7.), budget=9)
+        self.history.add(self.a, result(0.), budget=1)
+
+    def test_columns(self):
+        self.assertEqual(self.history.num_runs, 6)
+        self.assertEqual(self.history.config_ids.tolist(), [0, 0, 0, 1, 2, 0])
+        self.assertEqual(self.history.budgets.tolist(), [1, 9, 9, 3, 9, 1])
+        self.assertEqual(self.history.statuses.tolist(), [0, 0, 2, 0, 0, 0])
+        self.assertEqual(self.history.runs_of_configuration(self.a).tolist(), [0, 1, 2, 5])
+        self.assertEqual(self.history.runs_of_configuration({'x': 4}).tolist(), [])
+
+    def test_aggregates_cover_the_highest_budget_only(self):
+        self.assertEqual(self.history.config_budgets.tolist(), [9, 3, 9])
+        self.assertEqual(self.history.config_counts.tolist(), [2, 1, 1])
+        self.assertEqual(self.history.config_censored.tolist(), [1, 0, 0])
+        # the timeout quality is not part of the mean
+        self.assertEqual(self.history.config_means.tolist(), [5., 0.01, 7.])
+
+    def test_best_configuration_reached_the_highest_budget(self):
+        self.assertEqual(self.history.best_configuration(), (5., self.a))
+        self.assertEqual(self.history.best_configuration(min_runs=2), (5., self.a))
+        self.assertIsNone(self.history.best_configuration(min_runs=3))
+
+    def test_without_budgets(self):
+        history = RunHistory()
+        history.add(self.a, result(1.))
+        history.add(self.a, result(3., 'CRASHED'))
+        history.add(self.b, result(None, 'CRASHED'))
+        self.assertTrue(np.isnan(history.config_budgets).all())
+        self.assertEqual(history.config_counts.tolist(), [2, 1])
+        self.assertEqual(history.config_means[0], 1.)
+        self.assertTrue(np.isnan(history.config_means[1]))
+        self.assertEqual(history.best_configuration(), (1., self.a))
+
+    def test_merge_and_pickle(self):
+        merged = RunHistory()
+        merged.merge(self.history)
+        merged.merge(pickle.loads(pickle.dumps(self.history)))
+        self.assertEqual(merged.num_runs, 12)
+        self.assertEqual(merged.num_configurations, 3)
+        self.assertEqual(merged.config_counts.tolist(), [4, 2, 2])
+        self.assertEqual(merged.config_censored.tolist(), [2, 0, 0])
+        self.assertEqual(merged.config_means.tolist(), [5., 0.01, 7.])
+        self.assertEqual(merged.best_configuration(), (5., self.a))
+
+
+class TestRungRecording(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.event_log = os.path.join(self.directory, 'events.jsonl')
+        self.run_history_db = os.path.join(self.directory, 'history.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_every_rung_is_recorded_with_its_budget(self):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        opt.minimize(quadratic_with_budget, 30, {'x': ('real', [-5, 5], 1)}, min_budget=1, max_budget=9, eta=3,
+                     event_log=self.event_log, run_history_db=self.run_history_db)
+
+        history = opt.run_history
+        budgets = history.budgets.tolist()
+        # every configuration starts on the smallest budget, and fewer reach the larger ones
+        self.assertEqual(history.num_configurations, 30)
+        self.assertEqual(budgets.count(1), 30)
+        self.assertTrue(30 > budgets.count(3) >= budgets.count(9) > 0)
+        self.assertEqual(sorted(set(budgets)), [1, 3, 9])
+        for row in range(history.num_runs):
+            x = float(history.configurations[history.config_ids[row]]['x'])
+            self.assertAlmostEqual(history.values[row], quadratic_with_budget(x, history.budgets[row]))
+
+        events = read_event_log(self.event_log)
+        self.assertEqual(sorted(events['budget'].tolist()), sorted(budgets))
+        db = RunHistoryDatabase(self.run_history_db)
+        runs = db.runs()
+        db.close()
+        self.assertEqual(sorted([r['budget'] for r in runs]), sorted(budgets))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pysmac.utils.run_history_db import RunHistoryDatabase, RunHistoryWriter
+
+
+def result(value, status='SAT', **kwargs):
+    result_dict = {'value': value, 'status': status, 'runtime': 0.5}
+    result_dict.update(kwargs)
+    return(result_dict)
+
+
+class TestRunHistoryDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fn = os.path.join(self.directory, 'history.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, study, seed, runs, **kwargs):
+        writer = RunHistoryWriter(self.fn, study, seed, **kwargs)
+        for config_dict, result_dict in runs:
+            writer.add(config_dict, result_dict)
+        writer.close()
+
+    def test_writer_buffers_until_the_batch_is_full(self):
+        writer = RunHistoryWriter(self.fn, 'a', 1, batch_size=3, flush_interval_s=3600)
+        db = RunHistoryDatabase(self.fn)
+        writer.add({'x': 1}, result(1.))
+        writer.add({'x': 2}, result(2.))
+        self.assertEqual(db.runs(), [])
+        writer.add({'x': 3}, result(3.))
+        self.assertEqual(len(db.runs()), 3)
+        writer.add({'x': 4}, result(4.))
+        writer.close()
+        self.assertEqual([r['configuration'] for r in db.runs()], [{'x': 1}, {'x': 2}, {'x': 3}, {'x': 4}])
+        db.close()
+
+    def test_columns_of_a_run(self):
+        self.write('a', 7, [({'x': 1, 'instance': 2, 'seed': 5, 'budget': 3.}, result(1.5, replayed=True))])
+        db = RunHistoryDatabase(self.fn)
+        run = db.runs()[0]
+        db.close()
+        self.assertEqual(run['configuration'], {'x': 1})
+        self.assertEqual((run['study'], run['seed'], run['instance'], run['instance_seed']), ('a', 7, 'id_2', 5))
+        self.assertEqual((run['budget'], run['value'], run['status'], run['runtime']), (3., 1.5, 'SAT', 0.5))
+        self.assertTrue(run['replayed'])
+
+    def test_queries_across_studies(self):
+        self.write('a', 1, [({'x': 1}, result(3.)), ({'x': 2}, result(-1., 'CRASHED'))])
+        self.write('a', 2, [({'x': 3}, result(2.))])
+        self.write('b', 1, [({'x': 1}, result(0.5)), ({'x': 4}, result(1.))])
+        db = RunHistoryDatabase(self.fn)
+        self.assertEqual(db.studies(), ['a', 'b'])
+        self.assertEqual(len(db.runs()), 5)
+        self.assertEqual(len(db.runs(study='a')), 3)
+        self.assertEqual(len(db.runs(study='a', seed=1)), 2)
+        self.assertEqual([r['study'] for r in db.runs(configuration={'x': 1})], ['a', 'b'])
+        # crashed runs are not considered for the best configuration
+        self.assertEqual(db.best_configuration(study='a'), (2., {'x': 3}))
+        self.assertEqual(db.best_configuration(study='a', seed=1), (3., {'x': 1}))
+        self.assertEqual(db.best_configuration(), (0.5, {'x': 1}))
+        self.assertIsNone(db.best_configuration(study='c'))
+        db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
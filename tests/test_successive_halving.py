@@ -0,0 +1,55 @@
+from __future__ import print_function, division, absolute_import
+
+import unittest
+
+from pysmac.utils.successive_halving import SuccessiveHalving
+
+
+def result(value, status='SAT', runtime=1.):
+    return({'value': value, 'status': status, 'runtime': runtime})
+
+
+class TestSuccessiveHalving(unittest.TestCase):
+
+    def test_budgets(self):
+        self.assertEqual(SuccessiveHalving(1, 9, 3).budgets, [1, 3, 9])
+        self.assertEqual(SuccessiveHalving(1, 10, 3).budgets, [1, 3, 10])
+        self.assertEqual(SuccessiveHalving(1., 4., 2).budgets, [1., 2., 4.])
+        self.assertRaises(ValueError, SuccessiveHalving, 0, 9)
+        self.assertRaises(ValueError, SuccessiveHalving, 1, 9, 1)
+
+    def test_promote(self):
+        sh = SuccessiveHalving(1, 9, 3)
+        # the first configuration on a budget is always promoted
+        self.assertTrue(sh.promote(0, result(5.)))
+        self.assertFalse(sh.promote(0, result(6.)))
+        self.assertTrue(sh.promote(0, result(1.)))
+        self.assertFalse(sh.promote(0, result(None, 'CRASHED')))
+        # nothing is promoted beyond the largest budget
+        self.assertFalse(sh.promote(2, result(0.)))
+        self.assertEqual(sh.rungs, [[5., 6., 1.], [], [0.]])
+
+    def test_combine(self):
+        sh = SuccessiveHalving(1, 9, 3)
+        for value in (4., 2.):
+            sh.promote(2, result(value))
+
+        # a fully evaluated configuration is reported with its value on the largest budget
+        full = sh.combine([result(1., runtime=1.), result(3., runtime=3.), result(3.5, runtime=9.)])
+        self.assertEqual(full, result(3.5, runtime=13.))
+
+        # an eliminated configuration is capped by the worst value on the largest budget
+        eliminated = sh.combine([result(0.5, runtime=1.), result(1., runtime=3.)])
+        self.assertEqual(eliminated, result(4., runtime=4.))
+        self.assertEqual(sh.combine([result(10.)]), result(10.))
+
+        # crashes and timeouts are reported as they are
+        self.assertEqual(sh.combine([result(2.**127, 'TIMEOUT')]), result(2.**127, 'TIMEOUT'))
+
+    def test_combine_before_any_full_evaluation(self):
+        sh = SuccessiveHalving(1, 9, 3)
+        self.assertEqual(sh.combine([result(0.5)]), result(0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+from __future__ import print_function, division, absolute_import
+
+import time
+import unittest
+
+import pysmac
+from pysmac.remote_smac import evaluate_with_limits, make_result_dict
+from pysmac.utils.timing_statistics import MEMORY_KEYS, TIMING_KEYS, TimingStatistics
+
+
+def quadratic(x):
+    return(x**2)
+
+
+def crash(x):
+    raise RuntimeError('the function crashed')
+
+
+def sleep(x):
+    time.sleep(x)
+    return(x)
+
+
+class TestMakeResultDict(unittest.TestCase):
+
+    def test_values_and_dicts(self):
+        self.assertEqual(make_result_dict(1.5, 0.1, 2.**127), {'value': 1.5, 'status': 'SAT', 'runtime': 0.1})
+        self.assertEqual(make_result_dict({'value': 1.5, 'status': b'UNSAT', 'runtime': 3.}, 0.1, 2.**127),
+                         {'value': 1.5, 'status': 'UNSAT', 'runtime': 3.})
+        self.assertEqual(make_result_dict(None, 0.1, 2.**127), {'value': 2.**127, 'status': 'CRASHED', 'runtime': 0.1})
+
+    def test_timeouts(self):
+        # the CPU time reached the limit
+        self.assertEqual(make_result_dict(1.5, 2., 2.**127, t_limit=2), {'value': 2.**127, 'status': 'TIMEOUT', 'runtime': 2.})
+        # the wall clock time reached ten times the limit
+        self.assertEqual(make_result_dict(None, 0.1, 2.**127, t_limit=2, wall_time=20.)['status'], 'TIMEOUT')
+        self.assertEqual(make_result_dict(1.5, 1., 2.**127, t_limit=2, wall_time=19.)['status'], 'SAT')
+        # without a timeout quality, the reported value is kept
+        self.assertEqual(make_result_dict({'value': 3., 'status': 'TIMEOUT'}, 1., None)['value'], 3.)
+
+
+class TestTimingStatistics(unittest.TestCase):
+
+    def test_add_and_merge(self):
+        first, second = TimingStatistics(), TimingStatistics()
+        first.add({'spawn_time': 1., 'function_wall_time': 2., 'peak_rss_mb': 10.})
+        first.add({'spawn_time': 3., 'function_wall_time': None})
+        second.add({'report_time': 0.5})
+        second.time_to_first_evaluation = 4.
+        first.merge(second)
+
+        self.assertEqual(first.num_evaluations, 3)
+        self.assertEqual(first.time_to_first_evaluation, 4.)
+        totals = first.totals()
+        self.assertEqual((totals['spawn_time'], totals['function_wall_time'], totals['report_time']), (4., 2., 0.5))
+        self.assertEqual(first.percentiles((50,))['spawn_time'], {50: 2.})
+        self.assertEqual(first.percentiles((50,))['smac_think_time'], {50: None})
+        self.assertEqual(sorted(first.histograms(2)), ['function_wall_time', 'peak_rss_mb', 'report_time', 'spawn_time'])
+
+
+class TestEvaluation(unittest.TestCase):
+
+    def test_timings_of_an_evaluation(self):
+        evaluation = evaluate_with_limits(sleep, {'x': 0.2}, None, None, None)
+        self.assertEqual(evaluation['result'], 0.2)
+        self.assertTrue(evaluation['function_wall_time'] >= 0.2)
+        self.assertTrue(evaluation['wall_time'] >= evaluation['function_wall_time'] + evaluation['spawn_time'])
+        # sleeping takes (almost) no CPU time
+        self.assertTrue(evaluation['function_cpu_time'] < 0.1)
+
+    def test_crash(self):
+        evaluation = evaluate_with_limits(crash, {'x': 0.}, None, None, None)
+        self.assertIsNone(evaluation['result'])
+        self.assertIsNone(evaluation['spawn_time'])
+
+    def test_minimize_records_every_evaluation(self):
+        opt = pysmac.SMAC_optimizer()
+        opt.smac_options['backend'] = 'fake'
+        opt.minimize(quadratic, 8, {'x': ('real', [-5, 5], 1)}, num_runs=2, num_procs=2)
+
+        stats = opt.timing_statistics
+        self.assertEqual(sorted([k for k in stats if k != 'all']), [0, 1])
+        self.assertEqual(stats['all'].num_evaluations, 16)
+        for k in TIMING_KEYS + MEMORY_KEYS:
+            self.assertEqual(len(stats['all'].timings[k]), 16, k)
+        self.assertTrue(stats['all'].time_to_first_evaluation > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
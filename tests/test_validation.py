@@ -0,0 +1,78 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import pysmac
+from pysmac.utils.smac_output_readers import read_validation_matrix, read_validationObjectiveMatrix_file
+from pysmac.utils.validation import validate, write_validation_matrix
+
+
+def distance(x, instance=0, seed=None):
+    return((x - instance)**2)
+
+
+class TestValidationMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fn = os.path.join(self.directory, 'validationObjectiveMatrix.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        values = np.random.RandomState(0).rand(50, 4)
+        values[0] = [2.**127, -1.5, 1e-300, 0.]
+        write_validation_matrix(self.fn, list(range(3, 53)), list(range(100, 150)), values)
+        instances, seeds, read_values = read_validation_matrix(self.fn)
+        self.assertEqual(instances.tolist(), list(range(3, 53)))
+        self.assertEqual(seeds.tolist(), list(range(100, 150)))
+        # the values are written with repr, so they are read back exactly
+        self.assertTrue(np.array_equal(read_values, values))
+
+    def test_single_instance_without_seeds(self):
+        write_validation_matrix(self.fn, [5], None, np.array([[1., 2., 3.]]))
+        instances, seeds, values = read_validation_matrix(self.fn)
+        self.assertEqual((instances.tolist(), seeds.tolist(), values.tolist()), ([5], [-1], [[1., 2., 3.]]))
+        self.assertEqual(read_validationObjectiveMatrix_file(self.fn), {5: [1., 2., 3.]})
+
+
+class TestValidation(unittest.TestCase):
+
+    def test_every_pair_is_evaluated(self):
+        configurations = [{'x': 0.}, {'x': 1.}]
+        values, statuses = validate(distance, configurations, [1, 2, 3], 2, instance_seeds=[7, 8, 9])
+        self.assertEqual(values.tolist(), [[1., 0.], [4., 1.], [9., 4.]])
+        self.assertEqual(statuses.tolist(), [['SAT'] * 2] * 3)
+
+    def test_parallel_validation_writes_the_matrix(self):
+        directory = tempfile.mkdtemp()
+        try:
+            opt = pysmac.SMAC_optimizer(working_directory=directory, persistent_files=True)
+            opt.smac_options['backend'] = 'fake'
+            opt.minimize(distance, 10, {'x': ('real', [-5, 5], 1)}, num_runs=2, num_procs=2,
+                         num_test_instances=3, parallel_validation=True, deterministic=False)
+            results = opt.validation_results
+            self.assertEqual(results['values'].shape, (3, len(results['configurations'])))
+            for column, config in enumerate(results['configurations']):
+                for row, instance in enumerate(results['instances']):
+                    self.assertAlmostEqual(results['values'][row, column], distance(float(config['x']), instance))
+
+            files = [os.path.join(d, fn) for d, _, fns in os.walk(directory) for fn in fns
+                     if fn == 'validationObjectiveMatrix-pysmac.csv']
+            self.assertEqual(len(files), 1)
+            instances, seeds, values = read_validation_matrix(files[0])
+            self.assertEqual(instances.tolist(), results['instances'])
+            self.assertEqual(seeds.tolist(), results['seeds'])
+            self.assertTrue(np.array_equal(values, results['values']))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from __future__ import print_function, division, absolute_import
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import pysmac
+import pysmac.utils.working_directory as working_directory
+from pysmac.utils.working_directory import OUTPUT_LEVELS, ram_disk_directory, remove_in_background
+
+
+class TestWorkingDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def wait_until_removed(self, path, timeout=10.):
+        end = time.time() + timeout
+        while os.path.exists(path) and (time.time() < end):
+            time.sleep(0.05)
+        return(not os.path.exists(path))
+
+    def test_ram_disk_directory(self):
+        candidates = working_directory.RAM_DISK_CANDIDATES
+        try:
+            working_directory.RAM_DISK_CANDIDATES = [os.path.join(self.directory, 'missing'), self.directory]
+            self.assertEqual(ram_disk_directory(), self.directory)
+            working_directory.RAM_DISK_CANDIDATES = [os.path.join(self.directory, 'missing')]
+            self.assertIsNone(ram_disk_directory())
+        finally:
+            working_directory.RAM_DISK_CANDIDATES = candidates
+
+    def test_remove_in_background(self):
+        tree = os.path.join(self.directory, 'tree')
+        os.makedirs(os.path.join(tree, 'a', 'b'))
+        with open(os.path.join(tree, 'a', 'b', 'file'), 'w') as fh:
+            fh.write('content')
+        remove_in_background(tree)
+        # the name can be reused right away
+        self.assertFalse(os.path.exists(tree))
+        os.makedirs(tree)
+        self.assertTrue(self.wait_until_removed(tree + '.deleted-%i' % os.getpid()))
+        self.assertTrue(os.path.isdir(tree))
+        # nothing happens for a directory that does not exist
+        remove_in_background(os.path.join(self.directory, 'missing'))
+
+    def test_output_levels(self):
+        for level, options in list(OUTPUT_LEVELS.items()):
+            opt = pysmac.SMAC_optimizer(working_directory=os.path.join(self.directory, level),
+                                        persistent_files=True, output_level=level)
+            for name, value in list(options.items()):
+                self.assertEqual(opt.smac_options[name], value)
+        self.assertRaises(ValueError, pysmac.SMAC_optimizer, output_level='none')
+
+    def test_temporary_directory_is_removed(self):
+        for background_cleanup in (True, False):
+            opt = pysmac.SMAC_optimizer(background_cleanup=background_cleanup)
+            directory = opt.working_directory
+            self.assertTrue(os.path.isdir(directory))
+            del opt
+            self.assertTrue(self.wait_until_removed(directory))
+
+    @unittest.skipIf(ram_disk_directory() is None, 'no memory backed filesystem')
+    def test_in_memory(self):
+        opt = pysmac.SMAC_optimizer(in_memory=True)
+        self.assertEqual(os.path.dirname(opt.working_directory), ram_disk_directory())
+
+
+if __name__ == '__main__':
+    unittest.main()